@@ -0,0 +1,107 @@
+# accounts/avatars.py
+"""
+URL รูปโปรไฟล์แบบไม่ต้องถาม storage (default_storage.exists) ทุกครั้งที่ render
+
+- สถานะไฟล์ต่อ path เก็บใน cache: "ok" | "missing"
+    * อัปโหลดรูปใหม่ → ok (storage เพิ่งเขียนไฟล์สำเร็จ)
+    * เปลี่ยน/ล้างรูป, ลบโปรไฟล์ → path เดิม missing
+- ตอน render: ok → URL ไฟล์, missing → รูป default
+  ไม่รู้สถานะ (cache หมดอายุ/ข้อมูลเก่า) → เชื่อ DB ไปก่อน แล้วจดไว้ในคิว avatars:pending
+  (ZADD NX: เข้าคิวครั้งเดียวด้วยเวลาแรกที่เห็น render ซ้ำไม่ดันไปท้ายคิว)
+- python manage.py check_avatars ตรวจไฟล์ในคิว (หรือทั้งหมดด้วย --all) บน storage จริง
+  ไฟล์หาย → ล้างฟิลด์ avatar ของโปรไฟล์นั้นให้กลับไปใช้รูป default
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+
+from forum import images
+from forum.zset import get_sorted_set
+
+DEFAULT_AVATAR = "img/avatar-default.png"
+STATE_TTL = 7 * 24 * 3600
+OK, MISSING = "ok", "missing"
+
+
+def default_url():
+    return static(DEFAULT_AVATAR)
+
+
+def _key(name):
+    return "avatar:state:" + hashlib.md5(name.encode()).hexdigest()
+
+
+def _pending():
+    return get_sorted_set("avatars:pending")
+
+
+def mark_ok(name):
+    if name:
+        cache.set(_key(name), OK, STATE_TTL)
+        _pending().remove(name)
+
+
+def mark_missing(name):
+    if name:
+        cache.set(_key(name), MISSING, STATE_TTL)
+
+
+def states(names):
+    """{name: "ok"|"missing"|None} ด้วย cache.get_many ครั้งเดียว"""
+    names = [n for n in names if n]
+    found = cache.get_many([_key(n) for n in names])
+    return {n: found.get(_key(n)) for n in names}
+
+
+def url_for(field, state=None, variants=None, width=128):
+    """
+    URL ของ ImageField (profile.avatar) โดยไม่แตะ storage
+    state: สถานะที่โหลดมาแล้ว (จาก states()) — ไม่ส่งมาจะอ่าน cache เอง
+    variants: Profile.avatar_variants — มีไฟล์ย่อแล้วจะใช้ขนาดที่พอดีกับ width แทนต้นฉบับ
+    """
+    name = getattr(field, "name", "") or ""
+    if not name:
+        return default_url()
+    if state is None:
+        state = cache.get(_key(name))
+    if state == MISSING:
+        return default_url()
+    if state is None:
+        _pending().add({name: time.time()}, nx=True)  # คงเวลาที่เข้าคิวครั้งแรก — ลำดับเก่าสุดก่อนยังมีความหมาย
+    return images.smallest_at_least(variants, width) or field.url
+
+
+# ===================== Background check =====================
+
+def check(names=None, limit=500):
+    """
+    ตรวจไฟล์บน storage จริง คืน (จำนวนที่ตรวจ, จำนวนที่หายและซ่อมแล้ว)
+    names=None → ตรวจตามคิว avatars:pending (เก่าสุดก่อน) ไม่เกิน limit รายการ
+    """
+    from .models import Profile
+    from . import people
+
+    if names is None:
+        names = _pending().bottom(limit)
+    checked = repaired = 0
+    for name in names:
+        checked += 1
+        if default_storage.exists(name):
+            mark_ok(name)
+            continue
+        mark_missing(name)
+        _pending().remove(name)
+        for profile in Profile.objects.filter(avatar=name):
+            profile.avatar = None
+            profile.save(update_fields=["avatar", "updated_at"])
+            people.forget(profile.user_id)
+            repaired += 1
+    return checked, repaired
+
+
+def all_avatar_names():
+    from .models import Profile
+    return Profile.objects.exclude(avatar="").exclude(avatar=None).values_list("avatar", flat=True)
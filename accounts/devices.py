@@ -0,0 +1,94 @@
+# accounts/devices.py
+"""
+อุปกรณ์ที่เข้าสู่ระบบ (UserSession) — ดัชนี session ต่อผู้ใช้
+
+- login → สร้างแถว (user, session_key, ip, user agent)
+- heartbeat จาก OnlineNowMiddleware → อัปเดต last_seen ไม่บ่อยกว่า HEARTBEAT_INTERVAL ต่อ session
+  key ที่ยังไม่มีแถว (เช่น ถูกหมุนตอนเปลี่ยนรหัสผ่าน) → ล้างแถวของผู้ใช้ที่ session หายไปแล้วก่อนสร้างใหม่
+- logout → ลบแถว
+- ยกเลิกอุปกรณ์ → ลบ session ผ่าน SessionStore ของ SESSION_ENGINE (ล้างทั้ง cache และ DB)
+ต้นทุนหน้าอุปกรณ์ = จำนวน session ของผู้ใช้คนเดียว ไม่ใช่ทั้งเว็บ
+"""
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import UserSession
+
+HEARTBEAT_INTERVAL = 300
+
+
+def _store_class():
+    return import_module(settings.SESSION_ENGINE).SessionStore
+
+
+def _client(request):
+    return {
+        "ip": request.META.get("REMOTE_ADDR") or None,
+        "user_agent": request.META.get("HTTP_USER_AGENT", "")[:255],
+    }
+
+
+def record_login(request, user):
+    key = request.session.session_key
+    if not key:
+        return
+    now = timezone.now()
+    UserSession.objects.update_or_create(
+        session_key=key,
+        defaults={"user": user, "login_at": now, "last_seen": now, **_client(request)},
+    )
+    cache.add(f"devices:beat:{key}", 1, HEARTBEAT_INTERVAL)
+
+
+def touch(request):
+    """อัปเดต last_seen ของ session นี้ (รวบเหลือครั้งเดียวต่อ HEARTBEAT_INTERVAL)"""
+    key = request.session.session_key
+    if not key or not cache.add(f"devices:beat:{key}", 1, HEARTBEAT_INTERVAL):
+        return
+    now = timezone.now()
+    updated = UserSession.objects.filter(session_key=key).update(last_seen=now, **_client(request))
+    if not updated:
+        # key ใหม่ของผู้ใช้นี้: session ที่ login ไว้ก่อนมีตารางนี้ หรือ key ถูกหมุน (cycle_key ตอนเปลี่ยน
+        # รหัสผ่าน) — แถวของ key เดิมที่ session หายไปแล้วต้องไม่ค้างเป็นอุปกรณ์ผี
+        _drop_dead(request.user)
+        UserSession.objects.create(user=request.user, session_key=key, last_seen=now, **_client(request))
+
+
+def _drop_dead(user):
+    store = _store_class()()
+    dead = [k for k in user.device_sessions.values_list("session_key", flat=True) if not store.exists(k)]
+    if dead:
+        UserSession.objects.filter(session_key__in=dead).delete()
+
+
+def forget(session_key):
+    if session_key:
+        UserSession.objects.filter(session_key=session_key).delete()
+        cache.delete(f"devices:beat:{session_key}")
+
+
+def for_user(user):
+    """session ที่ยังไม่หมดอายุของผู้ใช้ (ล่าสุดก่อน) — แถวที่เก่าเกินอายุ cookie ถูกล้างทิ้ง"""
+    cutoff = timezone.now() - timedelta(seconds=settings.SESSION_COOKIE_AGE)
+    user.device_sessions.filter(last_seen__lt=cutoff).delete()
+    return list(user.device_sessions.order_by("-last_seen"))
+
+
+def revoke(user, session_keys):
+    """ออกจากระบบ session ที่ระบุ (เฉพาะของ user) คืนจำนวนที่ยกเลิก"""
+    keys = list(user.device_sessions.filter(session_key__in=session_keys)
+                .values_list("session_key", flat=True))
+    store = _store_class()()
+    for key in keys:
+        store.delete(key)
+    UserSession.objects.filter(session_key__in=keys).delete()
+    return len(keys)
+
+
+def revoke_others(user, current_key):
+    keys = user.device_sessions.exclude(session_key=current_key).values_list("session_key", flat=True)
+    return revoke(user, list(keys))
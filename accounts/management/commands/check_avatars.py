@@ -0,0 +1,17 @@
+# accounts/management/commands/check_avatars.py
+from django.core.management.base import BaseCommand
+
+from accounts import avatars
+
+
+class Command(BaseCommand):
+    help = "ตรวจไฟล์รูปโปรไฟล์บน storage (ตามคิวที่ค้างตรวจ หรือทั้งหมด) และซ่อมโปรไฟล์ที่ไฟล์หาย — ตั้ง cron ไว้รันเป็นระยะ"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="ตรวจรูปของทุกโปรไฟล์ ไม่ใช่แค่คิว")
+        parser.add_argument("--limit", type=int, default=500, help="จำนวนสูงสุดต่อรอบเมื่อตรวจตามคิว")
+
+    def handle(self, *args, **options):
+        names = list(avatars.all_avatar_names()) if options["all"] else None
+        checked, repaired = avatars.check(names, limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"ตรวจแล้ว {checked} ไฟล์, ซ่อม {repaired} โปรไฟล์ที่ไฟล์หาย"))
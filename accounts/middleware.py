@@ -1,21 +1,63 @@
 # accounts/middleware.py
-from django.utils import timezone
-from django.core.cache import cache
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
-ONLINE_TIMEOUT = 300  # 5 นาที
+from . import devices, people, presence
+
+
+class _BothModes:
+    """middleware ที่ทำงานได้ทั้ง WSGI และ ASGI (async view ไม่ต้องกระโดด thread ผ่าน middleware นี้)"""
+    sync_capable = True
+    async_capable = True
 
-class OnlineNowMiddleware:
-    """
-    ติ๊กหัวใจให้ผู้ใช้ที่กำลัง active ทุกครั้งที่มี request
-    เก็บลง cache คีย์: online:<user_id> มีอายุ 5 นาที
-    """
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
 
+class OnlineNowMiddleware(_BothModes):
+    """
+    ติ๊กหัวใจให้ผู้ใช้ที่กำลัง active (accounts/presence.py) และ last_seen ของอุปกรณ์ (accounts/devices.py)
+    เขียนจริงเป็นระยะเท่านั้น — request อื่นในช่วงนั้นแค่ cache.add ที่ไม่สำเร็จ
+    """
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         response = self.get_response(request)
+        self.touch(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        await sync_to_async(self.touch)(request)
+        return response
+
+    @staticmethod
+    def touch(request):
         user = getattr(request, "user", None)
         if user and user.is_authenticated:
-            # เก็บ timestamp ก็ได้ แต่สำหรับเช็ค "ออนไลน์ไหม" เอาค่า True ก็พอ
-            cache.set(f"online:{user.pk}", True, ONLINE_TIMEOUT)
-        return response
+            presence.touch(user.pk)
+            devices.touch(request)
+
+
+class PeopleMiddleware(_BothModes):
+    """
+    ตั้ง resolver ชื่อ/รูปโปรไฟล์ (accounts/people.py) ใหม่ทุก request
+    ข้อมูลคนเดียวกันในหน้าเดียวจึงถูกโหลดแค่ครั้งเดียว และไม่รั่วข้าม request
+    """
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = people.activate()
+        try:
+            return self.get_response(request)
+        finally:
+            people.deactivate(token)
+
+    async def __acall__(self, request):
+        # ContextVar: sync_to_async คัดลอก context ไปยัง thread ที่ render/ยิง query ให้เอง
+        token = people.activate()
+        try:
+            return await self.get_response(request)
+        finally:
+            people.deactivate(token)
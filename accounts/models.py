@@ -1,7 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.templatetags.static import static   # <<< เพิ่มอันนี้
-from django.core.files.storage import default_storage  # <-- เพิ่ม
+from django.utils import timezone
 import os
 import uuid
 
@@ -14,10 +13,22 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     display_name = models.CharField(max_length=150, blank=True)
     avatar = models.ImageField(upload_to=avatar_upload, blank=True, null=True)
+    avatar_variants = models.JSONField(default=dict, blank=True)  # ไฟล์ย่อ (forum/images.py)
     bio = models.CharField(max_length=280, blank=True)
     social_link = models.URLField(blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    BACKGROUND_FIELDS = ("avatar_variants",)
+
+    def save(self, *args, **kwargs):
+        # avatar_variants ถูกเขียนจากงานเบื้องหลัง (forum/images.py) — save() ทั้งแถวห้ามเขียนค่าเก่าทับ
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.BACKGROUND_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return self.display_name or self.user.username
 
@@ -25,10 +36,30 @@ class Profile(models.Model):
     def avatar_url(self) -> str:
         """
         คืน URL รูปโปรไฟล์:
-        - ถ้าฟิลด์ avatar มีค่าและไฟล์มีอยู่จริง -> ใช้ไฟล์นั้น
-        - ถ้าไฟล์ไม่มี/หาย -> ใช้รูป default ใน static
+        - ถ้าฟิลด์ avatar มีค่าและไฟล์ไม่ได้ถูกบันทึกว่าหาย -> ใช้ไฟล์นั้น
+        - ถ้าไม่มีรูป/ไฟล์หาย -> ใช้รูป default ใน static
+        สถานะไฟล์อ่านจาก cache ไม่ถาม storage (ดู accounts/avatars.py)
         """
-        name = getattr(self.avatar, "name", "")
-        if name and default_storage.exists(name):
-            return self.avatar.url
-        return static("img/avatar-default.png")
+        from . import avatars
+        return avatars.url_for(self.avatar, variants=self.avatar_variants, width=256)
+
+
+class UserSession(models.Model):
+    """
+    ดัชนี session ต่อผู้ใช้ (หน้าอุปกรณ์ของฉัน) — ไม่ต้องไล่ decode ทุก Session ในระบบ
+    เขียนตอน login / heartbeat / logout ผ่าน accounts/devices.py
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="device_sessions")
+    session_key = models.CharField(max_length=40, unique=True)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    login_at = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-last_seen"], name="accounts_usersession_user_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}:{self.session_key[:8]}"
@@ -0,0 +1,106 @@
+# accounts/people.py
+"""
+ชื่อที่แสดง / รูปโปรไฟล์ของผู้ใช้ แบบไม่ยิง query ต่อคน
+
+- ถ้า user มาพร้อม profile แล้ว (select_related("author__profile")) → ใช้เลย ไม่แตะ DB/cache
+- ไม่งั้นถาม resolver ประจำ request (PeopleMiddleware ตั้งให้):
+    ความจำใน request → cache (people:card:<uid>) → DB ครั้งเดียวต่อชุด (prime)
+- แก้โปรไฟล์/ผู้ใช้ → accounts/signals.py ล้าง cache ของคนนั้น
+"""
+from contextvars import ContextVar
+
+from django.core.cache import cache
+
+from . import avatars
+
+CARD_CACHE_TTL = 600
+
+
+def _key(user_id):
+    return f"people:card:{user_id}"
+
+
+def forget(user_id):
+    cache.delete(_key(user_id))
+
+
+def profile_is_loaded(user) -> bool:
+    return "profile" in user._state.fields_cache
+
+
+def make_card(user, profile, avatar_state=None):
+    """{"name": ชื่อที่แสดง, "avatar": URL รูป} (fallback: ชื่อจริง > username, รูป default)"""
+    name = getattr(profile, "display_name", "") or user.get_full_name() or user.username
+    avatar = getattr(profile, "avatar", None)
+    return {
+        "name": name,
+        "avatar": avatars.url_for(avatar, avatar_state, getattr(profile, "avatar_variants", None))
+                  if avatar else avatars.default_url(),
+    }
+
+
+class PeopleResolver:
+    def __init__(self):
+        self._cards = {}
+
+    def prime(self, users):
+        """โหลดการ์ดของหลายคนพร้อมกัน: cache.get_many 1 ครั้ง + query DB 1 ครั้งสำหรับที่ยังขาด"""
+        from .models import Profile
+
+        todo, loaded = {}, {}
+        for u in users:
+            if u is None or u.pk in self._cards:
+                continue
+            if profile_is_loaded(u):
+                loaded[u.pk] = u
+            else:
+                todo[u.pk] = u
+        if loaded:
+            self._make_cards(loaded, {pk: getattr(u, "profile", None) for pk, u in loaded.items()})
+        if not todo:
+            return
+
+        hits = cache.get_many([_key(pk) for pk in todo])
+        for pk in list(todo):
+            card = hits.get(_key(pk))
+            if card is not None:
+                self._cards[pk] = card
+                del todo[pk]
+        if not todo:
+            return
+
+        profiles = {p.user_id: p for p in Profile.objects.filter(user_id__in=list(todo))}
+        fresh = self._make_cards(todo, profiles)
+        cache.set_many({_key(pk): card for pk, card in fresh.items()}, CARD_CACHE_TTL)
+
+    def _make_cards(self, users, profiles):
+        # สถานะไฟล์รูปของทั้งชุดอ่านด้วย get_many ครั้งเดียว
+        names = [getattr(getattr(p, "avatar", None), "name", "") for p in profiles.values() if p]
+        state = avatars.states(names)
+        made = {}
+        for pk, u in users.items():
+            p = profiles.get(pk)
+            name = getattr(getattr(p, "avatar", None), "name", "")
+            self._cards[pk] = made[pk] = make_card(u, p, state.get(name))
+        return made
+
+    def card(self, user):
+        if user.pk not in self._cards:
+            self.prime([user])
+        return self._cards[user.pk]
+
+
+_current = ContextVar("people_resolver", default=None)
+
+
+def resolver():
+    """resolver ของ request ปัจจุบัน (นอก request เช่น shell/command ได้ตัวใหม่ที่ไม่แชร์)"""
+    return _current.get() or PeopleResolver()
+
+
+def activate():
+    return _current.set(PeopleResolver())
+
+
+def deactivate(token):
+    _current.reset(token)
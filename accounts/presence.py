@@ -0,0 +1,60 @@
+# accounts/presence.py
+"""
+สถานะออนไลน์ของผู้ใช้ (presence) บน sorted set: user_id → เวลาที่เห็นล่าสุด (epoch วินาที)
+
+- "ใครออนไลน์" / "ออนไลน์กี่คน" = range query ช่วง [now - ONLINE_WINDOW, +inf]
+  ไม่ต้องไล่ decode ทุก Session ในตารางอีก
+- heartbeat ถูกรวบ: ผู้ใช้คนหนึ่งเขียนลง set อย่างมากครั้งละ HEARTBEAT_INTERVAL
+  (cache.add เป็นตัวกั้น — ใครได้ key ก่อนคนนั้นเขียน)
+- ตัดสมาชิกที่หมดเวลาออกเป็นระยะตอน heartbeat (ไม่ต้องมี cron)
+- backend ตาม forum/zset.py: Redis ZSET หรือ LocalSortedSet ใน process (เทสต์/dev)
+"""
+import random
+import time
+
+from django.core.cache import cache
+
+from forum.zset import get_sorted_set
+
+ONLINE_WINDOW = 300          # 5 นาที นับว่ายังออนไลน์
+HEARTBEAT_INTERVAL = 60      # เขียนเวลาใหม่ไม่บ่อยกว่านี้ต่อคน
+PRUNE_PROBABILITY = 0.05
+
+
+def _board():
+    return get_sorted_set("presence:online")
+
+
+def _since(now=None):
+    return (now or time.time()) - ONLINE_WINDOW
+
+
+def touch(user_id, now=None):
+    """บันทึกว่าเห็นผู้ใช้ตอนนี้ คืน True ถ้าเขียนจริง (ไม่โดนรวบ)"""
+    if not user_id or not cache.add(f"presence:beat:{user_id}", 1, HEARTBEAT_INTERVAL):
+        return False
+    now = now or time.time()
+    board = _board()
+    board.add({user_id: now})
+    if random.random() < PRUNE_PROBABILITY:
+        board.remove_by_score("-inf", _since(now))
+    return True
+
+
+def leave(user_id):
+    """ออกจากระบบ → หายจากรายชื่อทันที"""
+    cache.delete(f"presence:beat:{user_id}")
+    _board().remove(user_id)
+
+
+def is_online(user_id):
+    seen = _board().score(user_id) if user_id else None
+    return seen is not None and seen >= _since()
+
+
+def online_ids():
+    return [int(m) for m in _board().range_by_score(_since(), "+inf")]
+
+
+def online_count():
+    return _board().count(_since(), "+inf")
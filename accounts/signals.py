@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in, user_logged_out
 from .models import Profile
+from forum import cachetags, images
+
+from . import avatars, devices, people, presence
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -13,3 +17,53 @@ def save_user_profile(sender, instance, **kwargs):
     # มีโปรไฟล์แล้วค่อย save ป้องกันกรณียังไม่ถูกสร้าง
     if hasattr(instance, "profile"):
         instance.profile.save()
+
+
+# ชื่อ/รูปที่แคชไว้ (accounts/people.py) + แคชที่ผูก tag user:<id> ต้องล้างเมื่อโปรไฟล์หรือชื่อผู้ใช้เปลี่ยน
+@receiver(post_save, sender=Profile)
+def forget_profile_card(sender, instance, **kwargs):
+    people.forget(instance.user_id)
+    cachetags.invalidate(cachetags.user(instance.user_id), cachetags.card(instance.user_id))
+
+@receiver(post_save, sender=User)
+def forget_user_card(sender, instance, **kwargs):
+    people.forget(instance.pk)
+    cachetags.invalidate(cachetags.user(instance.pk), cachetags.card(instance.pk))
+
+
+# สถานะไฟล์รูปโปรไฟล์ (accounts/avatars.py): อัปโหลดใหม่ = ok, path เดิมที่เลิกใช้/ลบ = missing
+@receiver(post_init, sender=Profile)
+def remember_avatar(sender, instance, **kwargs):
+    raw = instance.__dict__.get("avatar")  # ยังเป็น str จนกว่าจะมีคนอ่านผ่าน descriptor
+    instance._loaded_avatar = getattr(raw, "name", raw) or ""
+
+@receiver(post_save, sender=Profile)
+def track_avatar(sender, instance, **kwargs):
+    new = getattr(instance.avatar, "name", "") or ""
+    old = getattr(instance, "_loaded_avatar", "")
+    if new != old:
+        avatars.mark_missing(old)
+        avatars.mark_ok(new)
+        rows = Profile.objects.filter(pk=instance.pk)
+        images.discard(rows.values_list("avatar_variants", flat=True).first())  # ไฟล์ย่อของรูปเดิม
+        rows.update(avatar_variants={})
+        instance.avatar_variants = {}
+        if new:
+            images.schedule(instance, field="avatar", variants_field="avatar_variants", kind="avatar")
+    instance._loaded_avatar = new
+
+@receiver(post_delete, sender=Profile)
+def forget_avatar(sender, instance, **kwargs):
+    avatars.mark_missing(getattr(instance.avatar, "name", ""))
+    images.discard(instance.__dict__.get("avatar_variants"))
+
+
+@receiver(user_logged_in)
+def record_device(sender, request, user, **kwargs):
+    devices.record_login(request, user)
+
+@receiver(user_logged_out)
+def leave_presence(sender, request, user, **kwargs):
+    if user is not None:
+        presence.leave(user.pk)
+    devices.forget(request.session.session_key)
@@ -1,12 +1,22 @@
 from django import template
 
+from accounts import people
+
 register = template.Library()
 
 @register.filter
 def display_name(user):
-    """คืนชื่อที่แสดงของผู้ใช้ (fallback: ชื่อจริง > username)"""
+    """คืนชื่อที่แสดงของผู้ใช้ (fallback: ชื่อจริง > username) — ไม่ยิง query ต่อคน (ดู accounts/people.py)"""
+    if not user:
+        return ""
+    if people.profile_is_loaded(user):
+        prof = getattr(user, "profile", None)
+        return getattr(prof, "display_name", "") or user.get_full_name() or user.username
+    return people.resolver().card(user)["name"]
+
+@register.filter
+def avatar_url(user):
+    """URL รูปโปรไฟล์ (ไม่มีรูป → รูป default)"""
     if not user:
         return ""
-    prof = getattr(user, "profile", None)
-    name = getattr(prof, "display_name", "") or user.get_full_name() or user.username
-    return name
+    return people.resolver().card(user)["avatar"]
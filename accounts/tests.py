@@ -1,3 +1,211 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from forum.models import Category, Comment, Thread
+from .models import Profile
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+QUIET_SLOW_MS = 60_000  # ไม่พ่น log "forum.slow" ลง console
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]  # เปลี่ยนรหัสผ่านในเทสต์ไม่ต้องรอ Argon2/PBKDF2
+
+
+@override_settings(CACHES=LOCMEM_CACHES, FORUM_SLOW_REQUEST_MS=QUIET_SLOW_MS)
+class ProfileDetailQueryTests(TestCase):
+    # owner+profile, นับกระทู้, นับกระทู้ที่ตอบ, หน้ากระทู้ (แต่ละแท็บ) — ตัวนับแคชไว้: ครั้งถัดไปเหลือ -2
+    QUERIES = {"overview": 5, "threads": 4, "replies": 4}
+    CACHED_COUNTS = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("dino", password="pw")
+        cls.owner.profile.display_name = "ไดโน"
+        cls.owner.profile.save()
+        cls.cat = Category.objects.create(name="ทั่วไป")
+
+    def add_activity(self, n):
+        start = Thread.objects.count()
+        for i in range(start, start + n):
+            other = User.objects.create(username=f"other{i}")
+            Thread.objects.create(category=self.cat, author=self.owner, title=f"mine {i}", content="x")
+            theirs = Thread.objects.create(category=self.cat, author=other, title=f"theirs {i}", content="x")
+            Comment.objects.create(thread=theirs, author=self.owner, content="ตอบ")
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        url = reverse("accounts:profile_detail", args=[self.owner.username])
+        for n in (1, 12):
+            self.add_activity(n)
+            for tab, expected in self.QUERIES.items():
+                cache.clear()
+                with self.subTest(n=n, tab=tab), self.assertNumQueries(expected):
+                    r = self.client.get(url, {"tab": tab})
+                self.assertContains(r, "ไดโน")
+                with self.subTest(n=n, tab=tab, cached=True), self.assertNumQueries(expected - self.CACHED_COUNTS):
+                    self.client.get(url, {"tab": tab})
+
+
+@override_settings(CACHES=LOCMEM_CACHES, FORUM_SLOW_REQUEST_MS=QUIET_SLOW_MS)
+class AvatarTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from forum import zset
+        cache.clear()
+        zset.reset_local()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create(username="dino")
+
+    def upload(self):
+        p = self.user.profile
+        p.avatar = SimpleUploadedFile("a.png", b"\x89PNG", content_type="image/png")
+        p.save()
+        return p
+
+    def test_render_makes_no_storage_calls(self):
+        p = self.upload()
+        cat = Category.objects.create(name="ทั่วไป")
+        t = Thread.objects.create(category=cat, author=self.user, title="t", content="x")
+        for _ in range(5):
+            Comment.objects.create(thread=t, author=self.user, content="x")
+        fresh = Profile.objects.get(pk=p.pk)
+        with mock.patch.object(default_storage, "exists", side_effect=AssertionError("storage call")):
+            self.assertEqual(fresh.avatar_url, fresh.avatar.url)
+            self.client.force_login(self.user)
+            self.client.get(reverse("forum:thread_detail", args=[t.id]))
+            self.client.get(reverse("accounts:profile_detail", args=["dino"]))
+
+    def test_missing_file_is_repaired_in_background(self):
+        p = self.upload()
+        name = p.avatar.name
+        stale = Profile.objects.get(pk=p.pk)
+        default_storage.delete(name)
+        from django.core.cache import cache
+        cache.clear()  # ไม่รู้สถานะ → เชื่อ DB ไปก่อนและเข้าคิวตรวจ
+        self.assertEqual(stale.avatar_url, stale.avatar.url)
+
+        call_command("check_avatars", stdout=StringIO())
+        p.refresh_from_db()
+        self.assertFalse(p.avatar)
+        self.assertIn("avatar-default", p.avatar_url)
+
+    def test_rerender_does_not_requeue_at_the_back(self):
+        from accounts import avatars
+        from django.core.cache import cache
+        old, new = mock.Mock(url="/m/old.png"), mock.Mock(url="/m/new.png")
+        old.name, new.name = "avatars/old.png", "avatars/new.png"
+        for field in (old, new, old):  # old render ซ้ำทีหลัง
+            cache.clear()
+            avatars.url_for(field)
+        self.assertEqual(avatars._pending().bottom(1), ["avatars/old.png"])
+        with mock.patch.object(default_storage, "exists", return_value=True):
+            self.assertEqual(avatars.check(limit=1), (1, 0))
+        self.assertEqual(avatars._pending().bottom(5), ["avatars/new.png"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, FORUM_SLOW_REQUEST_MS=QUIET_SLOW_MS)
+class PresenceTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from forum import zset
+        cache.clear()
+        zset.reset_local()
+        self.user = User.objects.create(username="dino")
+
+    def test_heartbeat_is_coalesced(self):
+        from . import presence
+        self.assertTrue(presence.touch(self.user.pk))
+        self.assertFalse(presence.touch(self.user.pk))
+        self.assertTrue(presence.is_online(self.user.pk))
+        self.assertEqual(presence.online_ids(), [self.user.pk])
+
+    def test_stale_entries_are_offline(self):
+        import time
+        from . import presence
+        presence.touch(self.user.pk, now=time.time() - presence.ONLINE_WINDOW - 1)
+        self.assertFalse(presence.is_online(self.user.pk))
+        self.assertEqual(presence.online_count(), 0)
+
+    def test_request_marks_online_and_logout_leaves(self):
+        from . import presence
+        self.client.force_login(self.user)
+        self.client.get(reverse("forum:home"))
+        self.assertEqual(presence.online_count(), 1)
+        self.client.logout()
+        self.assertFalse(presence.is_online(self.user.pk))
+
+    async def test_online_endpoint_over_asgi(self):
+        from . import presence
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.get(reverse("forum:home"))  # middleware แบบ async ติ๊กหัวใจ
+        self.assertTrue(presence.is_online(self.user.pk))
+        r = await self.async_client.get(reverse("accounts:online_now"))
+        self.assertEqual(r.json()["count"], 1)
+        self.assertEqual([u["username"] for u in r.json()["users"]], ["dino"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, FORUM_SLOW_REQUEST_MS=QUIET_SLOW_MS, PASSWORD_HASHERS=FAST_HASHERS)
+class DeviceSessionTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user("dino", password="pw")
+
+    def login(self, ua):
+        from django.test import Client
+        c = Client(HTTP_USER_AGENT=ua)
+        c.post(reverse("account_login"), {"login": "dino", "password": "pw"})
+        return c
+
+    def test_login_indexes_session_and_list_is_per_user(self):
+        phone = self.login("phone")
+        self.login("laptop")
+        other = User.objects.create_user("rex", password="pw")
+        self.client.force_login(other)
+        self.assertEqual(self.user.device_sessions.count(), 2)
+        # ไม่อ่านตาราง django_session (session ตัวเองมาจาก cache) — อ่านเฉพาะแถวของผู้ใช้นี้
+        with CaptureQueriesContext(connection) as ctx:
+            r = phone.get(reverse("accounts:devices_list"))
+        self.assertContains(r, "laptop")
+        self.assertNotIn("django_session", " ".join(q["sql"] for q in ctx.captured_queries))
+
+    def test_revoke_others_signs_out_other_devices(self):
+        phone = self.login("phone")
+        laptop = self.login("laptop")
+        phone.post(reverse("accounts:device_revoke_others"))
+        self.assertEqual(list(self.user.device_sessions.values_list("user_agent", flat=True)), ["phone"])
+        r = laptop.get(reverse("accounts:devices_list"))
+        self.assertEqual(r.status_code, 302)
+
+    def test_password_change_does_not_leave_ghost_device(self):
+        phone = self.login("phone")
+        old_key = phone.session.session_key
+        r = phone.post(reverse("account_change_password"),
+                       {"oldpassword": "pw", "password1": "new-pw-1234!", "password2": "new-pw-1234!"})
+        self.assertEqual(r.status_code, 302)
+        new_key = phone.session.session_key
+        self.assertNotEqual(old_key, new_key)  # update_session_auth_hash → cycle_key
+        r = phone.get(reverse("accounts:devices_list"))
+        self.assertEqual([s.session_key for s in r.context["sessions"]], [new_key])
+
+    def test_cannot_revoke_someone_elses_session(self):
+        self.login("phone")
+        key = self.user.device_sessions.get().session_key
+        other = User.objects.create_user("rex", password="pw")
+        self.client.force_login(other)
+        r = self.client.post(reverse("accounts:device_revoke", args=[key]))
+        self.assertEqual(r.status_code, 404)
+        self.assertTrue(self.user.device_sessions.exists())
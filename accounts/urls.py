@@ -9,6 +9,8 @@ urlpatterns = [
     path("edit/", views.profile_edit, name="profile_edit"),
     path("settings/", views.settings_home, name="settings_home"),
     path("devices/", views.devices_list, name="devices_list"),
+    path("devices/revoke-others/", views.device_revoke_others, name="device_revoke_others"),
     path("devices/<str:session_key>/revoke/", views.device_revoke, name="device_revoke"),
+    path("online/", views.online_now, name="online_now"),
     path("<str:username>/", views.profile_detail, name="profile_detail"),
 ]
@@ -1,23 +1,26 @@
 # accounts/views.py
+import asyncio
+
 from django.contrib.auth import get_user_model, login
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.contrib.sessions.models import Session
-from django.db.models import Count, Q
-from django.http import HttpResponseForbidden
-from django.shortcuts import render, get_object_or_404, redirect
-from django.utils import timezone
+from django.http import HttpResponseForbidden, JsonResponse
+from django.shortcuts import render, aget_object_or_404, get_object_or_404, redirect
 
 from allauth.account.views import LoginView, SignupView, LogoutView
 from django.apps import apps
-from django.core.paginator import Paginator
 
+from forum import aio, participants
 from forum.models import Thread
+from forum.pagination import akeyset_page
+from . import devices, people, presence
 from .models import Profile
 from .forms import ProfileForm, SignupForm
 
 User = get_user_model()
 
+ONLINE_LIST_LIMIT = 50
+
 
 # ----------------------- Auth Views -----------------------
 
@@ -34,18 +37,9 @@ class MyLogoutView(LogoutView):
 # ----------------------- Helpers -----------------------
 
 def _thread_base_qs():
-    qs = Thread.objects.all().select_related("author", "category")
-    # กรอง soft-delete ถ้ามี
-    if "is_deleted" in {f.name for f in Thread._meta.get_fields()}:
-        qs = qs.filter(is_deleted=False)
-    # (ถ้ามี status และคุณใช้) qs = qs.filter(status="published")
-    return qs
-
-def _with_live_comment_count(qs):
-    """annotate นับเฉพาะคอมเมนต์ที่ยังไม่ถูกลบ → alias: live_comment_count"""
-    return qs.annotate(
-        live_comment_count=Count("comments", filter=Q(comments__is_deleted=False))
-    )
+    # Thread.objects ไม่รวมกระทู้ที่ถูกลบอยู่แล้ว (LiveManager)
+    return Thread.objects.select_related("author__profile", "category")
+
 
 
 # ----------------------- โปรไฟล์ -----------------------
@@ -55,50 +49,63 @@ def profile_me(request):
     return redirect("accounts:profile_detail", username=request.user.username)
 
 
-def profile_detail(request, username):
-    owner = get_object_or_404(User, username=username)
+async def profile_detail(request, username):
+    owner = await aget_object_or_404(User.objects.select_related("profile"), username=username)
     profile = getattr(owner, "profile", None)
     joined = owner.date_joined
 
     tab = request.GET.get("tab", "overview")
-    page_number = request.GET.get("page", 1)
-
-    # กระทู้ที่เจ้าของตั้งเอง
-    threads_qs = (
-        _with_live_comment_count(
-            _thread_base_qs().filter(author=owner)
-        )
-        .order_by("-created_at")
-    )
+    cursor = request.GET.get("cursor")
 
-    # กระทู้ที่เจ้าของเคยไปตอบ (เอาเฉพาะที่คอมเมนต์ยังไม่ถูกลบ)
-    replied_qs = (
-        _with_live_comment_count(
-            _thread_base_qs().filter(
-                Q(comments__author=owner) & Q(comments__is_deleted=False)
-            ).distinct()
-        )
-        .order_by("-created_at")
-    )
+    # กระทู้ที่เจ้าของตั้งเอง — index (author, -created_at, -id) ของกระทู้ที่ยังไม่ถูกลบ
+    threads_qs = _thread_base_qs().filter(author=owner).order_by("-created_at")
+
+    # กระทู้ที่เจ้าของเคยไปตอบ เรียงตามที่ตอบล่าสุด — index (user, -last_reply_at, -id) ของ ThreadParticipant
+    replied_qs = participants.replied(owner)
+
+    async def replied_page():
+        page = await akeyset_page(replied_qs, cursor, per_page=10, field="last_reply_at")
+        page.object_list = participants.threads_of(page)
+        return page
+
+    async def replied_recent():
+        return participants.threads_of(await aio.alist(replied_qs.order_by("-last_reply_at", "-id")[:5]))
+
+    # ตัวนับ (แคช) กับรายการของแท็บยิงพร้อมกัน
+    if tab == "threads":
+        parts = {"page_obj": akeyset_page(threads_qs, cursor, per_page=10)}
+    elif tab == "replies":
+        parts = {"page_obj": replied_page()}
+    else:  # overview
+        parts = {"threads_recent": aio.alist(threads_qs[:5]), "replied_recent": replied_recent()}
+    counts, *values = await asyncio.gather(aio.run(participants.profile_counts, owner), *parts.values())
+    threads_count, replies_count = counts
 
     ctx = {
         "owner": owner,
         "profile": profile,
         "joined": joined,
         "tab": tab,
-        "threads_count": threads_qs.count(),
-        "replies_count": replied_qs.count(),
+        "threads_count": threads_count,
+        "replies_count": replies_count,
+        **dict(zip(parts, values)),
     }
+    return await aio.arender(request, "accounts/profile_detail.html", ctx)
 
-    if tab == "threads":
-        ctx["page_obj"] = Paginator(threads_qs, 10).get_page(page_number)
-    elif tab == "replies":
-        ctx["page_obj"] = Paginator(replied_qs, 10).get_page(page_number)
-    else:  # overview
-        ctx["threads_recent"] = list(threads_qs[:5])
-        ctx["replied_recent"] = list(replied_qs[:5])
 
-    return render(request, "accounts/profile_detail.html", ctx)
+async def online_now(request):
+    """
+    คนที่ออนไลน์อยู่ (JSON) ให้หน้าเว็บดึงเป็นระยะ — อ่านจาก presence (cache) + ผู้ใช้ใน query เดียว
+    ไม่ต้องล็อกอิน ไม่แตะ session ของผู้เรียก
+    """
+    ids, count = await asyncio.gather(aio.run(presence.online_ids), aio.run(presence.online_count))
+    users = await aio.alist(
+        User.objects.select_related("profile").filter(id__in=ids[:ONLINE_LIST_LIMIT]).order_by("username")
+    )
+    return JsonResponse({
+        "count": count,
+        "users": [{"username": u.username, **people.make_card(u, getattr(u, "profile", None))} for u in users],
+    })
 
 
 # ----------------------- แก้ไขโปรไฟล์ / สมัครสมาชิก -----------------------
@@ -152,19 +159,11 @@ def settings_home(request):
 
 @login_required
 def devices_list(request):
-    sessions = []
-    qs = Session.objects.filter(expire_date__gte=timezone.now()).order_by("-expire_date")
-    for s in qs:
-        data = s.get_decoded()
-        if data.get("_auth_user_id") == str(request.user.id):
-            sessions.append({
-                "key": s.session_key,
-                "expire": s.expire_date,
-                "ip": data.get("ip"),
-                "ua": data.get("ua"),
-                "login_at": data.get("login_at"),
-                "is_current": (s.session_key == request.session.session_key),
-            })
+    # ดัชนี UserSession ของผู้ใช้คนนี้ (accounts/devices.py) — ไม่ต้อง decode session ทั้งระบบ
+    current = request.session.session_key
+    sessions = devices.for_user(request.user)
+    for s in sessions:
+        s.is_current = s.session_key == current
     return render(request, "accounts/settings_devices.html", {"sessions": sessions})
 
 
@@ -172,10 +171,16 @@ def devices_list(request):
 def device_revoke(request, session_key: str):
     if request.method != "POST":
         return HttpResponseForbidden("POST only")
-    s = get_object_or_404(Session, session_key=session_key)
-    data = s.get_decoded()
-    if data.get("_auth_user_id") != str(request.user.id):
-        return HttpResponseForbidden("Not yours")
-    s.delete()
+    get_object_or_404(request.user.device_sessions, session_key=session_key)
+    devices.revoke(request.user, [session_key])
     messages.success(request, "ยกเลิกอุปกรณ์เรียบร้อยแล้ว")
     return redirect("accounts:devices_list")
+
+
+@login_required
+def device_revoke_others(request):
+    if request.method != "POST":
+        return HttpResponseForbidden("POST only")
+    n = devices.revoke_others(request.user, request.session.session_key)
+    messages.success(request, f"ออกจากระบบอุปกรณ์อื่นแล้ว {n} เครื่อง")
+    return redirect("accounts:devices_list")
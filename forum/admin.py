@@ -1,26 +1,49 @@
 from django.contrib import admin
-from .models import Category, Thread, Comment
+from .models import Category, Thread, Comment, Tag
+
+
+class AllObjectsAdmin(admin.ModelAdmin):
+    """แอดมินต้องเห็นแถวที่ถูก soft-delete ด้วย (manager เริ่มต้นซ่อนไว้)"""
+
+    def get_queryset(self, request):
+        qs = self.model.all_objects.all()
+        ordering = self.get_ordering(request)
+        return qs.order_by(*ordering) if ordering else qs
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug", "order")
+    list_display = ("name", "slug", "order", "thread_count")
     ordering = ("order", "name")
     # ไม่ให้กรอก slug เอง ให้ระบบสร้างให้
     fields = ("name", "order")          # หรือใช้ exclude = ("slug",)
 
 @admin.register(Thread)
-class ThreadAdmin(admin.ModelAdmin):
-    list_display = ("title", "category", "author", "created_at", "is_deleted")
+class ThreadAdmin(AllObjectsAdmin):
+    list_display = ("title", "category", "author", "created_at", "comment_count", "like_count", "is_deleted")
+    readonly_fields = ("comment_count", "like_count", "last_activity_at")
     list_filter = ("category", "is_deleted")
     search_fields = ("title", "content")
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(AllObjectsAdmin):
     list_display = ("thread", "author", "created_at", "is_deleted")
-from .models import Category, Thread, Comment, Report
+from .models import Category, Thread, Comment, ModerationJob, Report
 # … ของเดิม …
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
-    list_display = ("target_type", "target_id", "reporter", "status", "created_at")
+    list_display = ("target_type", "target_id", "thread", "target_author", "reporter", "status", "created_at")
+    raw_id_fields = ("thread", "target_author", "reporter")
     list_filter = ("status", "target_type")
     search_fields = ("reason",)
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ("name", "thread_count", "created_at")
+    readonly_fields = ("thread_count",)
+    search_fields = ("name",)
+
+@admin.register(ModerationJob)
+class ModerationJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "action", "target", "status", "processed", "total", "created_by", "created_at")
+    list_filter = ("status", "action", "target")
+    readonly_fields = ("total", "processed", "affected", "last_id", "started_at", "finished_at")
@@ -43,6 +43,16 @@ urlpatterns = [
     # users
     path("users/", pick("user_list"), name="user_list"),
     path("users/<int:uid>/role/", pick("user_role_toggle"), name="user_role_toggle"),
+    path("users/<int:uid>/content/", admin_views.user_content_job, name="user_content_job"),
+
+    # moderation jobs (งาน bulk เบื้องหลัง)
+    path("jobs/", admin_views.job_list, name="job_list"),
+    path("jobs/status/", admin_views.job_status, name="job_status"),
+    path("jobs/<int:job_id>/cancel/", admin_views.job_cancel, name="job_cancel"),
+
+    # performance (วัดต่อ request — forum/instrument.py)
+    path("perf/", admin_views.perf, name="perf"),
+    path("perf/reset/", admin_views.perf_reset, name="perf_reset"),
 
     # reports (ใช้ชื่อสำรองได้: admin_reports หรือ report_list)
     path("reports/", pick("admin_reports", alt="report_list"), name="admin_reports"),
@@ -50,6 +60,10 @@ urlpatterns = [
     path("reports/<int:rid>/resolve/", pick("report_resolve"), name="report_resolve"),
     path("reports/<int:rid>/delete-target/", pick("report_delete_target"), name="report_delete_target"),
     path("reports/<int:rid>/delete-target/", admin_views.report_delete_target, name="report_delete_target"),
+    path("reports/<str:target_type>/<int:target_id>/resolve/", admin_views.report_target_resolve,
+         name="report_target_resolve"),
+    path("reports/<str:target_type>/<int:target_id>/delete-target/", admin_views.report_target_delete,
+         name="report_target_delete"),
 
     
 ]
@@ -1,22 +1,22 @@
 # forum/admin_views.py
-from datetime import timedelta
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.http import require_POST
 from django.utils import timezone
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.core.paginator import Paginator
-from django.core.cache import cache
-from django.db.models import (
-    Q, Count, Case, When, Value, IntegerField, F, OuterRef, Subquery
-)
+from django.db.models import Q
 
-from .models import Category, Thread, Comment, Report
+from .models import Category, Thread, Comment, ModerationJob, Report
 from .forms import CategoryForm, UserRoleForm
-from .views import TRENDING_CACHE_KEY
+from .counters import set_threads_deleted, set_comments_deleted
+from . import instrument, moderation, reports, rollups
 
 User = get_user_model()
 
@@ -29,34 +29,9 @@ is_staff_required = user_passes_test(lambda u: u.is_authenticated and u.is_staff
 def admin_reports(request):
     q = (request.GET.get("q") or "").strip()
 
-    # หา thread_id ให้ทุก report (ถ้าเป็น comment จะดึง thread_id ของคอมเมนต์นั้น)
-    comment_thread_sq = (
-        Comment.objects.filter(pk=OuterRef("target_id"))
-        .values("thread_id")[:1]
-    )
-
-    qs = (
-        Report.objects.select_related("reporter")
-        .annotate(
-            thread_id=Case(
-                When(target_type="thread", then=F("target_id")),
-                When(target_type="comment", then=Subquery(comment_thread_sq)),
-                default=Value(None),
-                output_field=IntegerField(),
-            )
-        )
-        .order_by("-id")
-    )
-
-    if q:
-        qs = qs.filter(
-            Q(reason__icontains=q)
-            | Q(target_type__icontains=q)
-            | Q(target_id__icontains=q)
-            | Q(reporter__username__icontains=q)
-        )
-
-    page_obj = Paginator(qs, 20).get_page(request.GET.get("page"))
+    # 1 แถวต่อเป้าหมาย เรียงตามความรุนแรง — thread_id/เจ้าของถูกจดไว้ตอนรายงาน (forum/reports.py)
+    page_obj = Paginator(reports.open_targets(q), 20).get_page(request.GET.get("page"))
+    page_obj.object_list = reports.attach_reasons(page_obj.object_list)
 
     return render(
         request,
@@ -64,79 +39,122 @@ def admin_reports(request):
         {"page_obj": page_obj, "q": q},
     )
 
+def _close_reports(request, target_type, target_id):
+    n = reports.close_target(target_type, target_id)
+    if n:
+        messages.success(request, f"ปิดรายงานแล้ว {n} รายการ")
+    else:
+        messages.info(request, "รายงานของเป้าหมายนี้ถูกปิดไว้แล้ว")
+
+def _delete_target(request, target_type, target_id):
+    """
+    ลบ/ซ่อนเป้าหมายที่ถูกรายงาน แล้วปิดรายงานทั้งหมดของเป้าหมายนั้น:
+      - thread  -> soft-delete (is_deleted=True) + ปรับตัวนับหมวด
+      - comment -> soft-delete + ปรับ comment_count ของ thread นั้น
+    (แคชที่เกี่ยวข้องถูกล้างตาม tag ใน forum/signals.py ผ่าน events.bulk_soft_deleted)
+    """
+    if target_type == "thread":
+        changed = set_threads_deleted(Thread.objects.filter(pk=target_id), True)
+        msg = "ลบกระทู้แล้ว" if changed else "ไม่พบกระทู้ (อาจถูกลบไปแล้ว)"
+    elif target_type == "comment":
+        changed = set_comments_deleted(Comment.objects.filter(pk=target_id), True)
+        msg = "ลบคอมเมนต์แล้ว" if changed else "ไม่พบคอมเมนต์ (อาจถูกลบไปแล้ว)"
+    else:
+        messages.error(request, "ชนิดเป้าหมายไม่รองรับ")
+        return
+    reports.close_target(target_type, target_id)
+    messages.success(request, msg)
+
+@staff_member_required
+@require_POST
+def report_target_resolve(request, target_type: str, target_id: int):
+    """ปิดรายงานทั้งหมดของเป้าหมายโดยไม่ลบเป้าหมาย"""
+    _close_reports(request, target_type, target_id)
+    return redirect(request.POST.get("next") or "adminpanel:report_list")
+
+@staff_member_required
+@require_POST
+def report_target_delete(request, target_type: str, target_id: int):
+    _delete_target(request, target_type, target_id)
+    return redirect(request.POST.get("next") or "adminpanel:report_list")
+
+# ลิงก์เดิมที่อ้างรายงานทีละแถว → ทำกับทั้งเป้าหมายของรายงานนั้น
+
 @staff_member_required
 @require_POST
 def report_resolve(request, rid: int):
-    """ปิดรายงานโดยไม่ลบเป้าหมาย"""
     rep = get_object_or_404(Report, id=rid)
-    if not rep.resolved:
-        rep.resolved = True
-        rep.save(update_fields=["resolved"])
-        messages.success(request, "ปิดรายงานแล้ว")
-    else:
-        messages.info(request, "รายงานนี้ถูกปิดไว้แล้ว")
+    _close_reports(request, rep.target_type, rep.target_id)
     return redirect(request.POST.get("next") or "adminpanel:report_list")
 
 @staff_member_required
 @require_POST
 def report_delete_target(request, rid: int):
-    """
-    ลบ/ซ่อนเป้าหมายที่ถูกรายงาน:
-      - thread  -> soft-delete (is_deleted=True) + ล้าง cache มาแรง
-      - comment -> soft-delete + ล้าง cache ตัวนับคอมเมนต์ของ thread นั้น + ล้าง cache มาแรง
-    ปิดรายงานโดยการลบแถวรายงาน (ไม่มีฟิลด์ resolved)
-    """
     rep = get_object_or_404(Report, id=rid)
-
-    msg = "ชนิดเป้าหมายไม่รองรับ"
-    if rep.target_type == "thread":
-        changed = Thread.objects.filter(pk=rep.target_id).update(is_deleted=True)
-        cache.delete(TRENDING_CACHE_KEY)
-        msg = "ลบกระทู้แล้ว" if changed else "ไม่พบกระทู้ (อาจถูกลบไปแล้ว)"
-
-    elif rep.target_type == "comment":
-        # หา thread_id ของคอมเมนต์เพื่อเคลียร์ cache ตัวนับให้ถูกกระทู้
-        tid = Comment.objects.filter(pk=rep.target_id).values_list("thread_id", flat=True).first()
-        changed = Comment.objects.filter(pk=rep.target_id).update(is_deleted=True)
-        if tid:
-            cache.delete(f"thread:{tid}:comment_count")
-        cache.delete(TRENDING_CACHE_KEY)
-        msg = "ลบคอมเมนต์แล้ว" if changed else "ไม่พบคอมเมนต์ (อาจถูกลบไปแล้ว)"
-
-    # ปิดรายงานโดยลบแถวรายงานออก
-    rep.delete()
-
-    messages.success(request, msg)
+    _delete_target(request, rep.target_type, rep.target_id)
     return redirect(request.POST.get("next") or "adminpanel:report_list")
 
 # ==================== Dashboard ====================
 
 @is_staff_required
 def dashboard(request):
-    now = timezone.now()
-    week = now - timedelta(days=7)
+    today = timezone.localdate()
+    week = today - timedelta(days=6)
+
+    # ยอดรวม/7 วันจาก rollup (forum/rollups.py) ใน query เดียว — ไม่ COUNT ตารางกระทู้/คอมเมนต์
+    sums = rollups.totals(since=week)
+
+    # กราฟแนวโน้ม: ช่วงวันที่เลือกได้ (ค่าเริ่มต้น 30 วันล่าสุด) + กรองหมวด
+    end = _parse_day(request.GET.get("end")) or today
+    start = _parse_day(request.GET.get("start")) or end - timedelta(days=29)
+    if start > end:
+        start, end = end, start
+    start = max(start, end - timedelta(days=MAX_CHART_DAYS - 1))
+    cat = request.GET.get("cat") or ""
+    cat = cat if cat.isdigit() else ""
+    rows = rollups.series(start, end, category_id=cat or None)
+
+    metrics = [("threads", "กระทู้"), ("comments", "ความคิดเห็น"), ("likes", "ไลก์")]
+    if not cat:
+        metrics += [("new_users", "ผู้ใช้ใหม่"), ("reports", "รายงาน")]
+    charts = []
+    for field, label in metrics:
+        values = [r[field] for r in rows]
+        peak = max(values + [1])
+        charts.append({
+            "label": label,
+            "total": sum(values),
+            "bars": [{"day": r["day"], "n": r[field], "pct": round(100 * max(r[field], 0) / peak)} for r in rows],
+        })
 
     ctx = {
-        "total_users": User.objects.count(),
-        "new_users_7d": User.objects.filter(date_joined__gte=week).count(),
+        "total_users": sums["new_users"],
+        "new_users_7d": sums["new_users_recent"],
+        "total_threads": sums["threads"],
+        "threads_7d": sums["threads_recent"],
+        # นับเฉพาะคอมเมนต์ที่ยังไม่ถูกลบ และอยู่ในกระทู้ที่ยังไม่ถูกลบ
+        "total_comments": sums["comments"],
+        "comments_7d": sums["comments_recent"],
+        "reports_open": sums["reports"],
 
-        "total_threads": Thread.objects.filter(is_deleted=False).count(),
-        "threads_7d": Thread.objects.filter(is_deleted=False, created_at__gte=week).count(),
+        "charts": charts,
+        "start": start, "end": end, "cat": cat,
+        "cats": Category.objects.only("id", "name").order_by("order", "name"),
 
-        # นับเฉพาะคอมเมนต์ที่ยังไม่ถูกลบ และอยู่ในกระทู้ที่ยังไม่ถูกลบ
-        "total_comments": Comment.objects.filter(
-            is_deleted=False, thread__is_deleted=False
-        ).count(),
-        "comments_7d": Comment.objects.filter(
-            is_deleted=False, thread__is_deleted=False, created_at__gte=week
-        ).count(),
-
-        "reports_open": Report.objects.count(),
-        "latest_threads": Thread.objects.filter(is_deleted=False).order_by("-created_at")[:5],
+        "latest_threads": Thread.objects.order_by("-created_at")[:5],
         "latest_reports": Report.objects.order_by("-id")[:5],
     }
     return render(request, "adminpanel/dashboard.html", ctx)
 
+
+MAX_CHART_DAYS = 366 * 3
+
+def _parse_day(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
 # ==================== Categories ====================
 
 @is_staff_required
@@ -205,3 +223,70 @@ def user_role_toggle(request, uid):
     else:
         form = UserRoleForm(instance=u)
     return render(request, "adminpanel/user_role_form.html", {"form": form, "target": u})
+
+@is_staff_required
+@require_POST
+def user_content_job(request, uid):
+    """เนื้อหาทั้งหมดของผู้ใช้ (กระทู้ + คอมเมนต์) → งานเบื้องหลัง 2 งาน"""
+    u = get_object_or_404(User, pk=uid)
+    action = request.POST.get("action")
+    if action not in moderation.ACTIONS["comment"]:
+        messages.warning(request, "ไม่รู้จักคำสั่งที่ส่งมา")
+        return redirect("adminpanel:user_list")
+    jobs = [moderation.enqueue(target, action, {"author_id": u.pk}, user=request.user)
+            for target in ("thread", "comment")]
+    messages.success(request, f"สร้างงานสำหรับเนื้อหาของ {u.username} แล้ว "
+                              f"({jobs[0].total} กระทู้, {jobs[1].total} คอมเมนต์)")
+    return redirect("adminpanel:job_list")
+
+# ==================== Moderation Jobs (งานเบื้องหลัง) ====================
+
+def _job_json(job):
+    return {
+        "id": job.pk, "status": job.status, "status_label": job.get_status_display(),
+        "total": job.total, "processed": job.processed, "affected": job.affected,
+        "percent": job.percent, "error": job.error,
+    }
+
+@staff_member_required
+def job_list(request):
+    page_obj = Paginator(ModerationJob.objects.select_related("created_by", "category"), 20).get_page(request.GET.get("page"))
+    return render(request, "adminpanel/job_list.html", {
+        "page_obj": page_obj,
+        "has_active": any(j.status in moderation.ACTIVE for j in page_obj.object_list),
+    })
+
+@staff_member_required
+def job_status(request):
+    """ความคืบหน้าของงานตาม ?id=..&id=.. สำหรับ polling จากหน้า job_list"""
+    ids = [int(i) for i in request.GET.getlist("id") if i.isdigit()]
+    return JsonResponse({"jobs": [_job_json(j) for j in ModerationJob.objects.filter(pk__in=ids)]})
+
+@staff_member_required
+@require_POST
+def job_cancel(request, job_id: int):
+    if moderation.cancel(job_id):
+        messages.success(request, f"ยกเลิกงาน #{job_id} แล้ว (ส่วนที่ทำไปแล้วไม่ย้อนกลับ)")
+    else:
+        messages.warning(request, "งานนี้จบไปแล้ว")
+    return redirect("adminpanel:job_list")
+
+# ==================== Performance (forum/instrument.py) ====================
+
+@staff_member_required
+def perf(request):
+    """สรุปต้นทุนต่อ route ของ process นี้ + request ที่ช้าล่าสุด (?format=json ได้)"""
+    snap = instrument.stats.snapshot()
+    if request.GET.get("format") == "json":
+        return JsonResponse(snap)
+    return render(request, "adminpanel/perf.html", {
+        "snap": snap, "since": datetime.fromtimestamp(snap["since"], tz=dt_timezone.utc),
+        "slow_ms": getattr(settings, "FORUM_SLOW_REQUEST_MS", instrument.SLOW_MS),
+    })
+
+@staff_member_required
+@require_POST
+def perf_reset(request):
+    instrument.stats.reset()
+    messages.success(request, "ล้างสถิติของ process นี้แล้ว")
+    return redirect("adminpanel:perf")
@@ -0,0 +1,38 @@
+# forum/aio.py
+"""
+ตัวช่วยของ async view (home, thread_detail, profile_detail, ไลก์, คนออนไลน์)
+
+- อ่าน DB ผ่าน async ORM (aget / ain_bulk / aexists / async for) และ cache ผ่าน aget_many / aset
+  ส่วนที่ยังเป็น sync ล้วน (ค้นหา, prefetch แท็ก, มาแรง, เขียนข้อมูล + signals) → sync_to_async
+- query ที่ไม่ขึ้นต่อกันยิงพร้อมกันด้วย asyncio.gather
+  หมายเหตุ: Django ส่ง query ของ async ORM เข้า thread เดียวของ request (thread_sensitive)
+  ตัว SQL จึงยังวิ่งทีละตัว — สิ่งที่ได้คือ event loop ไม่ถูกบล็อกระหว่างรอ DB/cache/ไคลเอนต์ช้า
+  รับ request อื่นต่อได้ และจุดไหนเป็น I/O จริง (Redis/เครือข่าย) ก็ซ้อนกันได้จริง
+- render template ใน sync_to_async: template / context processor ยังแตะ DB แบบ sync
+- รันแบบ ASGI: ดู README (uvicorn) — WSGI (runserver/gunicorn) ยังใช้ได้ Django แปลง view ให้เอง
+"""
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+
+def run(fn, *args, **kwargs):
+    """เรียกฟังก์ชัน sync จาก async view (thread ของ request เดียวกับ ORM)"""
+    return sync_to_async(fn)(*args, **kwargs)
+
+
+async def auser(request):
+    """
+    โหลดผู้ใช้ของ request ครั้งเดียว แล้วผูกกลับที่ request.user
+    (request.user กับ request.auser() แคชแยกกัน — ถ้าไม่ผูก template จะโหลดผู้ใช้ซ้ำอีก query)
+    """
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+async def alist(qs):
+    return [obj async for obj in qs]
+
+
+async def arender(request, template_name, context=None, **kwargs):
+    return await sync_to_async(render)(request, template_name, context, **kwargs)
@@ -6,4 +6,8 @@ class ForumConfig(AppConfig):
     name = "forum"
 
     def ready(self):
-        from . import signals  # โหลดสัญญาณ
+        from django.db.backends.signals import connection_created
+
+        from . import instrument, signals  # โหลดสัญญาณ
+        connection_created.connect(instrument.install_db_wrapper, dispatch_uid="forum.instrument")
+        instrument.install_cache_wrapper()
@@ -0,0 +1,146 @@
+# forum/benchmark.py
+"""
+วัดหน้าที่ถูกเรียกบ่อย (python manage.py bench_forum) — ใช้คู่กับข้อมูลจำลองจาก seed_forum
+
+- ต่อหน้า: latency p50/p95/p99 (ms), จำนวน SQL, ขนาด HTML ที่ render (bytes), status
+  ยิงผ่าน django.test.Client ใน process (ไม่มีเครือข่าย) — ดูต้นทุนของ view/ORM/template ล้วน ๆ
+- หน้าสาธารณะยิงในนามผู้ใช้ที่ล็อกอิน (ข้ามแคชทั้งหน้า = งานจริง) + home_anon วัดทางที่โดนแคช
+- ผลเป็น JSON เก็บเป็น baseline ได้ แล้วเทียบรอบถัดไป:
+    latency / bytes เกิน baseline เกิน tolerance → ถดถอย, จำนวน query เพิ่มแม้ 1 → ถดถอย
+    (query ไม่ขึ้นกับเครื่อง จึงเข้มกว่า latency ที่แกว่งตามเครื่อง)
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import Category, Comment, Thread
+from .pagination import at_cursor
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """nearest-rank บนลิสต์ที่เรียงแล้ว"""
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def client_host():
+    """host ที่ ALLOWED_HOSTS ยอมรับ (Client ปกติส่ง testserver ซึ่งนอกเทสต์ไม่ผ่าน)"""
+    for host in settings.ALLOWED_HOSTS:
+        if host == "*" or not host.startswith("."):
+            return "localhost" if host == "*" else host
+    return "localhost"
+
+
+def make_client(user=None):
+    client = Client(HTTP_HOST=client_host())
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+# ===================== Scenarios =====================
+
+def _url(name, *args, **params):
+    url = reverse(name, args=args)
+    return f"{url}?{urlencode(params)}" if params else url
+
+
+def scenarios(viewer=None, staff=None, query="ฟอสซิล"):
+    """[(ชื่อ, URL, ผู้ใช้ที่ยิง)] จากข้อมูลใน DB ตอนนี้ — หน้าไหนไม่มีข้อมูล/ผู้ใช้ที่ต้องใช้ก็ข้าม"""
+    out = []
+    cat = Category.objects.order_by("-thread_count").first()
+    big = Thread.objects.order_by("-comment_count", "-id").first()
+    author = (User.objects.filter(is_staff=False).annotate(n=Count("threads")).order_by("-n", "id").first())
+    if viewer is not None:
+        out += [
+            ("home", _url("forum:home"), viewer),
+            ("home_q", _url("forum:home", q=query), viewer),
+        ]
+        if cat:
+            out.append(("home_cat", _url("forum:home", cat=cat.pk), viewer))
+        if big:
+            out.append(("thread_detail_big", _url("forum:thread_detail", big.pk), viewer))
+            last = Comment.objects.filter(thread=big).order_by("-created_at", "-id").first()
+            if last:  # หน้าท้ายของกระทู้ยาว (permalink ไปคอมเมนต์ล่าสุด)
+                out.append(("thread_detail_big_tail",
+                            _url("forum:thread_detail", big.pk, cursor=at_cursor(last)), viewer))
+        if author:
+            out += [
+                ("profile_detail", _url("accounts:profile_detail", author.username), viewer),
+                ("profile_detail_replies", _url("accounts:profile_detail", author.username, tab="replies"), viewer),
+            ]
+    out.append(("home_anon", _url("forum:home"), None))
+    if staff is not None:
+        out += [
+            ("admin_threads", _url("adminpanel:admin_threads"), staff),
+            ("admin_reports", _url("adminpanel:admin_reports"), staff),
+            ("dashboard", _url("adminpanel:dashboard"), staff),
+        ]
+    return out
+
+
+# ===================== Measure =====================
+
+def measure(client, url, iterations=20, warmup=2):
+    for _ in range(warmup):
+        client.get(url)
+    timings, queries, size, status = [], 0, 0, 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+        queries, size, status = len(ctx.captured_queries), len(response.content), response.status_code
+    timings.sort()
+    result = {f"p{p}_ms": round(percentile(timings, p) * 1000, 2) for p in PERCENTILES}
+    result.update(mean_ms=round(statistics.fmean(timings) * 1000, 2), queries=queries, bytes=size, status=status)
+    return result
+
+
+def run(plan, iterations=20, warmup=2, only=None):
+    """{ชื่อ: ผลของ measure()} ตามลำดับใน plan"""
+    clients = {}
+    results = {}
+    for name, url, user in plan:
+        if only and name not in only:
+            continue
+        key = user.pk if user is not None else None
+        if key not in clients:
+            clients[key] = make_client(user)
+        results[name] = {"url": url, **measure(clients[key], url, iterations, warmup)}
+    return results
+
+
+# ===================== Compare =====================
+
+def compare(results, baseline, tolerance=0.25, slack_ms=5.0):
+    """
+    [(หน้า, ตัววัด, baseline, ตอนนี้)] ของที่ถดถอย — หน้าที่ไม่มีใน baseline ไม่นับ
+    latency ต้องเกินทั้งสัดส่วน tolerance และ slack_ms (หน้าที่เร็วมากแกว่งเป็นสัดส่วนได้เยอะ)
+    """
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if now["queries"] > before["queries"]:
+            regressions.append((name, "queries", before["queries"], now["queries"]))
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance) and now["p95_ms"] - before["p95_ms"] > slack_ms:
+            regressions.append((name, "p95_ms", before["p95_ms"], now["p95_ms"]))
+        if now["bytes"] > before["bytes"] * (1 + tolerance):
+            regressions.append((name, "bytes", before["bytes"], now["bytes"]))
+        if now["status"] != before["status"]:
+            regressions.append((name, "status", before["status"], now["status"]))
+    return regressions
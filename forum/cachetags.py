@@ -0,0 +1,172 @@
+# forum/cachetags.py
+"""
+แคชที่ผูกกับ dependency tag — invalidate ตาม tag จากที่เดียว (forum/signals.py)
+
+- ค่าที่แคชประกาศ tag ที่ตัวเองขึ้นกับ เช่น thread:<id>, category:<id>, user:<id>, trending
+- แต่ละ tag มีเลขเวอร์ชันใน cache (tagver:<tag>) — invalidate = incr เลขนั้น ไม่ต้องไล่หา key
+- ค่าเก็บคู่กับเวอร์ชันของ tag ตอนคำนวณ ตอนอ่านใช้ get_many ครั้งเดียว (ค่า + เวอร์ชันปัจจุบัน)
+  เวอร์ชันไม่ตรง = ค่าเก่า → miss (ไม่ต้องลบ ปล่อยหมดอายุเอง)
+- เวอร์ชันอ่านก่อนคำนวณค่า: ถ้ามีการเขียนระหว่างคำนวณ ค่าที่เก็บจะถือเวอร์ชันเก่าและไม่ถูกใช้
+- นับ hit/miss ต่อตระกูล key (family) ใน process — ดูได้จาก stats() และลง Recorder ของ request (forum/instrument.py)
+- async view ใช้ alookup / aget_or_set (cache.aget_many / aset_many) — key และเวอร์ชันชุดเดียวกัน
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+from . import instrument
+
+DEFAULT_TIMEOUT = 300
+
+# tag ส่วนกลาง
+ALL = "all"              # ฟีดรวม (กระทู้ใดก็ได้เปลี่ยน)
+TRENDING = "trending"    # กล่องมาแรง (กระทู้ถูกลบ/กู้คืน/ย้ายหมวด/แก้ไข)
+TAGS = "tags"            # tag cloud
+
+
+def thread(thread_id):
+    return f"thread:{thread_id}"
+
+
+def category(category_id):
+    return f"category:{category_id}"
+
+
+def user(user_id):
+    return f"user:{user_id}"
+
+
+# user:/category: ถูกบีบทุกครั้งที่มีกิจกรรม — หน้าที่แค่แสดงชื่อ/รูปใช้ tag แคบกว่านี้
+
+def card(user_id):
+    """ชื่อที่แสดง/รูปของผู้ใช้ (บันทึก Profile/User เท่านั้น)"""
+    return f"card:{user_id}"
+
+
+def category_info(category_id):
+    """ชื่อ/slug ของหมวด (บันทึก/ลบ Category เท่านั้น)"""
+    return f"catinfo:{category_id}"
+
+
+# ===================== Versions =====================
+
+def _ver_key(tag):
+    return f"tagver:{tag}"
+
+
+def _fresh_version():
+    # ค่าเริ่มต้นจากเวลา: ถ้าเลขถูก evict แล้วเริ่มใหม่ จะไม่ชนเลขเดิมที่เคยใช้
+    return int(time.time() * 1000)
+
+
+def _missing(tags, found):
+    return {_ver_key(t): _fresh_version() for t in tags if _ver_key(t) not in found}
+
+
+def _pick(tags, found, missing):
+    return tuple(found.get(_ver_key(t), missing.get(_ver_key(t))) for t in tags)
+
+
+def _versions(tags, found):
+    """เวอร์ชันของ tags จากผล get_many (ที่ยังไม่มีจะถูกตั้งค่าเริ่มต้น)"""
+    missing = _missing(tags, found)
+    if missing:
+        cache.set_many(missing, None)
+    return _pick(tags, found, missing)
+
+
+async def _aversions(tags, found):
+    missing = _missing(tags, found)
+    if missing:
+        await cache.aset_many(missing, None)
+    return _pick(tags, found, missing)
+
+
+def invalidate(*tags):
+    for tag in set(tags):
+        key = _ver_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+# ===================== Hit / miss =====================
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _count(family, outcome):
+    with _stats_lock:
+        row = _stats.setdefault(family, {"hit": 0, "miss": 0})
+        row[outcome] += 1
+    rec = instrument.current()
+    if rec is not None:
+        rec.cache_op(family, outcome)
+
+
+def stats():
+    """{family: {"hit": n, "miss": n}} ของ process นี้"""
+    with _stats_lock:
+        return {f: dict(row) for f, row in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ===================== Read / write =====================
+
+class Lookup:
+    """ผลการอ่าน: .hit, .value และเวอร์ชันของ tag ที่ใช้ตอน store()"""
+
+    def __init__(self, family, key, tags, hit, value, versions):
+        self.family, self.key, self.tags = family, key, tags
+        self.hit, self.value, self.versions = hit, value, versions
+
+    def store(self, value, timeout=DEFAULT_TIMEOUT):
+        cache.set(self.key, (self.versions, value), timeout)
+        return value
+
+    async def astore(self, value, timeout=DEFAULT_TIMEOUT):
+        await cache.aset(self.key, (self.versions, value), timeout)
+        return value
+
+
+def _hit(family, key, tags, found, versions):
+    entry = found.get(key)
+    hit = entry is not None and entry[0] == versions
+    _count(family, "hit" if hit else "miss")
+    return Lookup(family, key, tags, hit, entry[1] if hit else None, versions)
+
+
+def lookup(family, key, tags):
+    key = f"c:{family}:{key}"
+    tags = tuple(tags)
+    found = cache.get_many([key] + [_ver_key(t) for t in tags])
+    return _hit(family, key, tags, found, _versions(tags, found))
+
+
+async def alookup(family, key, tags):
+    key = f"c:{family}:{key}"
+    tags = tuple(tags)
+    found = await cache.aget_many([key] + [_ver_key(t) for t in tags])
+    return _hit(family, key, tags, found, await _aversions(tags, found))
+
+
+def get_or_set(family, key, compute, tags, timeout=DEFAULT_TIMEOUT):
+    found = lookup(family, key, tags)
+    if found.hit:
+        return found.value
+    return found.store(compute(), timeout)
+
+
+async def aget_or_set(family, key, compute, tags, timeout=DEFAULT_TIMEOUT):
+    """compute เป็น async function (ไม่มีอาร์กิวเมนต์)"""
+    found = await alookup(family, key, tags)
+    if found.hit:
+        return found.value
+    return await found.astore(await compute(), timeout)
@@ -0,0 +1,169 @@
+# forum/counters.py
+"""
+ตัวนับ denormalized ของ Thread / Category
+
+- Thread.comment_count / like_count / last_activity_at, Category.thread_count และ Tag.thread_count
+- อัปเดตด้วย F() ใน UPDATE เดียว (atomic ระดับแถว ไม่ต้องอ่านค่ามาบวกเอง)
+- save()/delete() รายตัว → เรียกจาก forum/signals.py
+- QuerySet.update() แบบ bulk (signals ไม่ทำงาน) → ใช้ set_threads_deleted / set_comments_deleted / move_threads
+  ซึ่งส่ง events.bulk_soft_deleted / bulk_moved ต่อให้ระบบอื่น (ค้นหา, มาแรง, สถิติ, แคช)
+- ค่าเพี้ยน (เช่นแก้ DB ตรง ๆ) → python manage.py reconcile_counters
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .events import bulk_moved, bulk_soft_deleted
+from .models import Category, Comment, Tag, Thread, ThreadLike
+
+
+def _shift(field, delta):
+    # ลดค่าไม่ให้ต่ำกว่า 0 (PositiveIntegerField มี CHECK >= 0)
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, Value(0))
+
+
+def bump_thread(thread_id, comments=0, likes=0, activity_at=None):
+    fields = {}
+    if comments:
+        fields["comment_count"] = _shift("comment_count", comments)
+    if likes:
+        fields["like_count"] = _shift("like_count", likes)
+    if activity_at is not None:
+        fields["last_activity_at"] = activity_at
+    if thread_id and fields:
+        Thread.all_objects.filter(pk=thread_id).update(**fields)
+
+
+def bump_categories(deltas):
+    """deltas: {category_id: +n/-n}"""
+    for cat_id, delta in deltas.items():
+        if cat_id and delta:
+            Category.objects.filter(pk=cat_id).update(thread_count=_shift("thread_count", delta))
+
+
+def bump_tags(deltas):
+    """deltas: {tag_id: +n/-n}"""
+    for tag_id, delta in deltas.items():
+        if delta:
+            Tag.objects.filter(pk=tag_id).update(thread_count=_shift("thread_count", delta))
+
+
+def _group_count(qs, field):
+    # order_by() ล้าง ordering เริ่มต้น ไม่งั้น GROUP BY จะติด created_at ไปด้วย
+    return dict(qs.order_by().values_list(field).annotate(n=Count("id")))
+
+
+def _flip_deleted(model, qs, deleted, group_field):
+    """เปลี่ยน is_deleted เฉพาะแถวที่สถานะต่างจริง คืน (ids, {group_id: จำนวน})"""
+    rows = list(qs.filter(is_deleted=not deleted).order_by().values_list("id", group_field))
+    ids = [pk for pk, _ in rows]
+    groups = {}
+    for _, gid in rows:
+        groups[gid] = groups.get(gid, 0) + 1
+    if ids:
+        model.all_objects.filter(id__in=ids).update(is_deleted=deleted)
+    return ids, groups
+
+
+def set_threads_deleted(qs, deleted: bool) -> int:
+    """soft-delete / กู้คืนกระทู้แบบ bulk พร้อมปรับ Category.thread_count"""
+    with transaction.atomic():
+        ids, per_cat = _flip_deleted(Thread, qs, deleted, "category_id")
+        sign = -1 if deleted else 1
+        bump_categories({cid: sign * k for cid, k in per_cat.items()})
+        if ids:
+            bulk_soft_deleted.send(sender=Thread, ids=ids, deleted=deleted)
+    return len(ids)
+
+
+def set_comments_deleted(qs, deleted: bool) -> int:
+    """soft-delete / กู้คืนคอมเมนต์แบบ bulk พร้อมปรับ Thread.comment_count"""
+    with transaction.atomic():
+        ids, per_thread = _flip_deleted(Comment, qs, deleted, "thread_id")
+        sign = -1 if deleted else 1
+        for tid, k in per_thread.items():
+            bump_thread(tid, comments=sign * k)
+        if ids:
+            bulk_soft_deleted.send(sender=Comment, ids=ids, deleted=deleted)
+    return len(ids)
+
+
+def move_threads(qs, category_id) -> int:
+    """ย้ายหมวดแบบ bulk พร้อมปรับ Category.thread_count (นับเฉพาะกระทู้ที่ยังไม่ถูกลบ)"""
+    with transaction.atomic():
+        rows = list(qs.exclude(category_id=category_id).order_by().values_list("id", "category_id", "is_deleted"))
+        if not rows:
+            return 0
+        Thread.all_objects.filter(id__in=[pk for pk, _, _ in rows]).update(category_id=category_id)
+        deltas = {}
+        for _, old, deleted in rows:
+            if not deleted:
+                deltas[old] = deltas.get(old, 0) - 1
+                deltas[category_id] = deltas.get(category_id, 0) + 1
+        bump_categories(deltas)
+        bulk_moved.send(sender=Thread, moves={pk: old for pk, old, _ in rows}, category_id=category_id)
+    return len(rows)
+
+
+# ===================== Reconcile =====================
+
+def _count_sq(qs):
+    return Coalesce(
+        Subquery(qs.order_by().values("thread").annotate(n=Count("id")).values("n")[:1]),
+        Value(0),
+    )
+
+
+def reconcile(dry_run=False, batch_size=500):
+    """
+    คำนวณตัวนับจากตารางจริงแล้วแก้เฉพาะแถวที่เพี้ยน
+    คืนค่า (จำนวนกระทู้ที่แก้, จำนวนหมวดที่แก้)
+    """
+    last_comment = (
+        Comment.all_objects.filter(thread=OuterRef("pk"))
+        .order_by("-created_at")
+        .values("created_at")[:1]
+    )
+    drift = (
+        Thread.all_objects
+        .annotate(
+            real_comments=_count_sq(Comment.objects.filter(thread=OuterRef("pk"))),
+            real_likes=_count_sq(ThreadLike.objects.filter(thread=OuterRef("pk"))),
+            real_last=Coalesce(Subquery(last_comment), F("created_at")),
+        )
+        .exclude(
+            comment_count=F("real_comments"),
+            like_count=F("real_likes"),
+            last_activity_at=F("real_last"),
+        )
+        .order_by()
+        .values_list("pk", "real_comments", "real_likes", "real_last")
+    )
+
+    fixed_threads = 0
+    batch = []
+    for pk, n_comments, n_likes, last in drift.iterator(chunk_size=batch_size):
+        batch.append(Thread(pk=pk, comment_count=n_comments, like_count=n_likes, last_activity_at=last))
+        if len(batch) >= batch_size:
+            fixed_threads += _flush(batch, dry_run)
+            batch = []
+    fixed_threads += _flush(batch, dry_run)
+
+    live = _group_count(Thread.objects.all(), "category_id")
+    fixed_cats = 0
+    for cat in Category.objects.only("id", "thread_count"):
+        real = live.get(cat.id, 0)
+        if cat.thread_count != real:
+            fixed_cats += 1
+            if not dry_run:
+                Category.objects.filter(pk=cat.id).update(thread_count=real)
+
+    return fixed_threads, fixed_cats
+
+
+def _flush(batch, dry_run):
+    if batch and not dry_run:
+        Thread.all_objects.bulk_update(batch, ["comment_count", "like_count", "last_activity_at"])
+    return len(batch)
@@ -0,0 +1,12 @@
+# forum/events.py
+"""
+สัญญาณของ forum สำหรับเส้นทางที่ model signals ไม่ทำงาน (QuerySet.update() แบบ bulk)
+receiver อยู่ใน forum/signals.py เหมือน post_save/post_delete
+"""
+from django.dispatch import Signal
+
+# ส่งหลัง soft-delete/กู้คืนแบบ bulk — sender=Thread|Comment, ids=[...], deleted=True|False
+bulk_soft_deleted = Signal()
+
+# ส่งหลังย้ายหมวดแบบ bulk — sender=Thread, moves={thread_id: หมวดเดิม}, category_id=หมวดใหม่
+bulk_moved = Signal()
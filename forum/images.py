@@ -0,0 +1,144 @@
+# forum/images.py
+"""
+ไฟล์ย่อส่วน (derivatives) ของรูปกระทู้ / คอมเมนต์ / รูปโปรไฟล์
+
+- บันทึกรูปใหม่ → signals เรียก schedule() → สร้างไฟล์ย่อหลัง transaction commit
+  บน thread pool ของ process (ไม่อยู่ในเวลาตอบ request)
+- แต่ละความกว้างใน WIDTHS สร้างทั้ง WebP และ JPEG (ไม่ขยายเกินขนาดจริง)
+  เก็บไว้ข้างไฟล์ต้นฉบับ: <dir>/_v/<ชื่อไฟล์>-<w>.<ext>
+- ผลลัพธ์บันทึกลงฟิลด์ JSON ของโมเดล เช่น Thread.image_variants:
+    {"w": 4032, "h": 3024, "webp": {"320": "threads/1/_v/a-320.webp", ...}, "jpeg": {...}}
+  ฟิลด์ว่าง = ยังไม่เสร็จ → template ใช้ไฟล์ต้นฉบับไปก่อน ({% responsive_img %})
+- settings.FORUM_IMAGE_PIPELINE = "thread" (ค่าเริ่มต้น) | "sync" (ทำทันทีหลัง commit) | "off"
+- รูปถูกเปลี่ยน/แถวถูกลบ → signals เรียก discard() ลบไฟล์ย่อชุดเดิมหลัง commit
+- ไฟล์เก่า/สร้างไม่สำเร็จ → python manage.py build_image_variants
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+log = logging.getLogger(__name__)
+
+# ความกว้าง (px) ต่อชนิดรูป — เลือกตามขนาดที่ template แสดงจริง (x1, x2)
+WIDTHS = {
+    "thread": (240, 480, 960),
+    "comment": (320, 640),
+    "avatar": (64, 128, 256),
+}
+FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-variants")
+    return _executor
+
+
+def variant_name(name, width, fmt):
+    folder, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return f"{folder}/_v/{stem}-{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def render_variants(name, widths):
+    """อ่านต้นฉบับจาก storage แล้วเขียนไฟล์ย่อทุกขนาด คืน dict สำหรับเก็บลงฟิลด์ variants"""
+    with default_storage.open(name, "rb") as fh:
+        img = Image.open(fh)
+        img = ImageOps.exif_transpose(img)  # รูปจากมือถือที่หมุนด้วย EXIF
+        img.load()
+    if img.mode not in ("RGB", "L"):
+        # JPEG ไม่มี alpha → วางบนพื้นขาว
+        base = Image.new("RGB", img.size, "white")
+        base.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+        img = base
+
+    variants = {"w": img.width, "h": img.height}
+    targets = sorted({min(w, img.width) for w in widths})
+    for fmt, (pil_format, options) in FORMATS.items():
+        variants[fmt] = {}
+        for w in targets:
+            h = max(1, round(img.height * w / img.width))
+            resized = img if w == img.width else img.resize((w, h), Image.LANCZOS)
+            buf = BytesIO()
+            resized.save(buf, pil_format, **options)
+            out = variant_name(name, w, fmt)
+            if default_storage.exists(out):
+                default_storage.delete(out)
+            variants[fmt][str(w)] = default_storage.save(out, ContentFile(buf.getvalue()))
+    return variants
+
+
+def build(model, pk, field, variants_field, kind):
+    """สร้างไฟล์ย่อของแถวเดียวแล้วบันทึก (ข้ามถ้ารูปถูกเปลี่ยนไประหว่างนั้น)"""
+    row = model._base_manager.filter(pk=pk).values_list(field, flat=True).first()
+    if not row:
+        return None
+    try:
+        variants = render_variants(row, WIDTHS[kind])
+    except Exception:
+        log.exception("สร้างไฟล์ย่อไม่สำเร็จ: %s", row)
+        return None
+    if not model._base_manager.filter(pk=pk, **{field: row}).update(**{variants_field: variants}):
+        discard(variants)  # รูปถูกเปลี่ยน/แถวถูกลบไประหว่างสร้าง — ไม่มีใครอ้างถึงไฟล์ชุดนี้
+        return None
+    return variants
+
+
+def schedule(instance, field="image", variants_field="image_variants", kind="thread"):
+    """เรียกจาก signals เมื่อรูปของ instance เปลี่ยน"""
+    mode = getattr(settings, "FORUM_IMAGE_PIPELINE", "thread")
+    if mode == "off":
+        return
+    args = (type(instance), instance.pk, field, variants_field, kind)
+
+    def run():
+        if mode == "sync":
+            build(*args)
+        else:
+            _pool().submit(build, *args)
+
+    transaction.on_commit(run)
+
+
+def discard(variants):
+    """ลบไฟล์ย่อทุกไฟล์ใน dict ของฟิลด์ variants หลัง commit (rollback → ไฟล์ยังถูกใช้อยู่ ไม่ลบ)"""
+    names = [name for fmt in FORMATS for name in (variants or {}).get(fmt, {}).values()]
+    if not names:
+        return
+
+    def run():
+        for name in names:
+            try:
+                default_storage.delete(name)
+            except Exception:
+                log.warning("ลบไฟล์ย่อไม่สำเร็จ: %s", name, exc_info=True)
+
+    transaction.on_commit(run)
+
+
+# ===================== Template helpers =====================
+
+def srcset(variants, fmt):
+    items = sorted((variants or {}).get(fmt, {}).items(), key=lambda kv: int(kv[0]))
+    return ", ".join(f"{default_storage.url(name)} {w}w" for w, name in items)
+
+
+def smallest_at_least(variants, width, fmt="jpeg"):
+    """URL ของไฟล์ย่อที่เล็กที่สุดแต่กว้าง >= width (ไม่มี → ใหญ่สุดที่มี, ไม่มีเลย → None)"""
+    items = sorted((int(w), name) for w, name in (variants or {}).get(fmt, {}).items())
+    if not items:
+        return None
+    for w, name in items:
+        if w >= width:
+            return default_storage.url(name)
+    return default_storage.url(items[-1][1])
@@ -0,0 +1,387 @@
+# forum/instrument.py
+"""
+วัดต้นทุนต่อ request: SQL / cache / render template — ตอบว่า "หน้าช้าเพราะอะไร"
+
+- InstrumentMiddleware (ตัวนอกสุดใน MIDDLEWARE) เปิด Recorder ของ request ไว้ใน ContextVar
+  hook ทุกตัวบันทึกลง Recorder ของ request ปัจจุบัน — ไม่มี Recorder (งานเบื้องหลัง/คำสั่ง) = ผ่านตรง ๆ
+  ContextVar ตามไปใน sync_to_async ด้วย async view จึงถูกนับครบ
+    DB     → connection.execute_wrappers (ติดทุก connection ตอนสร้าง ผ่าน signal connection_created)
+    cache  → ห่อเมธอดของ cache backend ทุกตัวที่ถูกสร้าง (แบบเดียวกับ django-debug-toolbar)
+             hit/miss ต่อ family ของ key (ส่วนก่อน ":" ตัวแรก) ส่วนแคชของ forum/cachetags.py รายงานเอง
+             ต่อ family จริง (ค่าเก่าจากเวอร์ชัน tag ที่ไม่ตรง = miss ซึ่ง backend มองไม่เห็น)
+    render → template backend ของเราเอง (settings TEMPLATES: forum.instrument.DjangoTemplates)
+             นับเฉพาะ render ชั้นนอกสุด (include อยู่ในเวลาของหน้านั้นแล้ว)
+- ตอบกลับพร้อม header Server-Timing (db / cache / tpl / total) — DevTools แท็บ Network แสดงให้เลย
+  settings.FORUM_SERVER_TIMING = "all" | "staff" | "off" (ค่าเริ่มต้น: all ตอน DEBUG ไม่งั้น staff)
+- request ที่ช้ากว่า FORUM_SLOW_REQUEST_MS → log "forum.slow" พร้อม query ที่ช้าที่สุด + เก็บไว้ดูในแผงแอดมิน
+- สรุปต่อ route (url name) สะสมใน process นี้ → /adminpanel/perf/ (แต่ละ worker มีตัวเลขของตัวเอง)
+  ส่วน time series รวมทุก worker → /metrics (forum/metrics.py)
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from . import metrics
+
+log = logging.getLogger("forum.slow")
+
+SLOW_MS = 500
+SLOWEST_QUERIES = 3
+RECENT_SLOW = 50
+SQL_PREVIEW = 300
+
+_current = ContextVar("forum_instrument_recorder", default=None)
+
+
+def current():
+    return _current.get()
+
+
+# ===================== Recorder (ต่อ request) =====================
+
+class Recorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = []          # [(วินาที, sql)]
+        self.cache_time = 0.0
+        self.cache = {}            # family → {"hit": n, "miss": n, "write": n}
+        self.render_time = 0.0
+        self._render_depth = 0
+        self._lock = threading.Lock()
+
+    def query(self, sql, seconds):
+        with self._lock:
+            self.db_time += seconds
+            self.queries.append((seconds, sql))
+
+    def cache_op(self, family, outcome, seconds=0.0, n=1):
+        with self._lock:
+            self.cache_time += seconds
+            row = self.cache.setdefault(family, {"hit": 0, "miss": 0, "write": 0})
+            row[outcome] += n
+
+    def cache_timed(self, seconds):
+        with self._lock:
+            self.cache_time += seconds
+
+    def cache_hits(self):
+        return sum(r["hit"] for r in self.cache.values()), sum(r["miss"] for r in self.cache.values())
+
+    def slowest(self, n=SLOWEST_QUERIES):
+        return sorted(self.queries, key=lambda q: q[0], reverse=True)[:n]
+
+    def server_timing(self, total):
+        hits, misses = self.cache_hits()
+        parts = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{len(self.queries)} queries"',
+            f'cache;dur={self.cache_time * 1000:.1f};desc="{hits} hit {misses} miss"',
+            f"tpl;dur={self.render_time * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ]
+        return ", ".join(parts)
+
+
+# ===================== DB =====================
+
+def _db_wrapper(execute, sql, params, many, context):
+    rec = _current.get()
+    if rec is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        rec.query(sql, time.perf_counter() - start)
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    """receiver ของ connection_created"""
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+# ===================== Cache =====================
+
+def key_family(key):
+    key = str(key)
+    if key.startswith("django.contrib.sessions"):
+        return "session"
+    if key.startswith("c:"):  # c:<family>:<key> ของ cachetags
+        return key.split(":", 2)[1]
+    return key.split(":", 1)[0]
+
+
+def _own(key):
+    # key ของ cachetags รายงานเองใน _count() (family จริง + hit ที่เช็กเวอร์ชันแล้ว)
+    return str(key).startswith(("c:", "tagver:"))
+
+
+def _timed_get(original):
+    def get(key, *args, **kwargs):
+        rec = _current.get()
+        if rec is None:
+            return original(key, *args, **kwargs)
+        start = time.perf_counter()
+        value = original(key, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if _own(key):
+            rec.cache_timed(elapsed)
+        else:
+            default = args[0] if args else kwargs.get("default")
+            rec.cache_op(key_family(key), "hit" if value is not default else "miss", elapsed)
+        return value
+    return get
+
+
+def _timed_get_many(original):
+    def get_many(keys, *args, **kwargs):
+        rec = _current.get()
+        if rec is None:
+            return original(keys, *args, **kwargs)
+        keys = list(keys)
+        start = time.perf_counter()
+        found = original(keys, *args, **kwargs)
+        rec.cache_timed(time.perf_counter() - start)
+        for key in keys:
+            if not _own(key):
+                rec.cache_op(key_family(key), "hit" if key in found else "miss")
+        return found
+    return get_many
+
+
+def _timed_write(original):
+    def write(key, *args, **kwargs):
+        rec = _current.get()
+        if rec is None:
+            return original(key, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return original(key, *args, **kwargs)
+        finally:
+            family = key_family(next(iter(key), "-") if isinstance(key, (dict, list, tuple)) else key)
+            rec.cache_op(family, "write", time.perf_counter() - start)
+    return write
+
+
+def _timed_add(original):
+    """add ที่ไม่สำเร็จ = key มีอยู่แล้ว → hit (ตัวกั้น heartbeat ของ presence/devices ใช้แบบนี้)"""
+    def add(key, *args, **kwargs):
+        rec = _current.get()
+        if rec is None:
+            return original(key, *args, **kwargs)
+        start = time.perf_counter()
+        added = original(key, *args, **kwargs)
+        rec.cache_op(key_family(key), "miss" if added else "hit", time.perf_counter() - start)
+        return added
+    return add
+
+
+_CACHE_WRAPPERS = {
+    "get": _timed_get,
+    "get_many": _timed_get_many,
+    "add": _timed_add,
+    **{name: _timed_write for name in ("set", "set_many", "delete", "delete_many", "incr", "decr", "touch")},
+}
+
+
+def wrap_cache(backend):
+    """ห่อเมธอด sync ของ backend ตัวนี้ (เมธอด async ของ BaseCache เรียกเมธอด sync ต่ออยู่แล้ว)"""
+    if getattr(backend, "_forum_instrumented", False):
+        return backend
+    for name, make in _CACHE_WRAPPERS.items():
+        setattr(backend, name, make(getattr(backend, name)))
+    backend._forum_instrumented = True
+    return backend
+
+
+def install_cache_wrapper():
+    from django.core.cache import caches
+    create = caches.create_connection
+    if getattr(create, "_forum_instrumented", False):
+        return
+
+    def create_connection(alias):
+        return wrap_cache(create(alias))
+    create_connection._forum_instrumented = True
+    caches.create_connection = create_connection
+
+
+# ===================== Template =====================
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        rec = _current.get()
+        if rec is None:
+            return super().render(context, request)
+        rec._render_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            rec._render_depth -= 1
+            if not rec._render_depth:
+                rec.render_time += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """DjangoTemplates ที่จับเวลา render (ใช้แทน backend เดิมใน settings.TEMPLATES)"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+# ===================== Aggregate (ต่อ process) =====================
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.since = time.time()
+            self.routes = {}
+            self.families = {}
+            self.slow = deque(maxlen=RECENT_SLOW)
+
+    def add(self, route, rec, total, slow=None):
+        hits, misses = rec.cache_hits()
+        with self._lock:
+            row = self.routes.setdefault(route, {
+                "count": 0, "total": 0.0, "max": 0.0, "db": 0.0, "queries": 0,
+                "render": 0.0, "cache": 0.0, "hits": 0, "misses": 0,
+            })
+            row["count"] += 1
+            row["total"] += total
+            row["max"] = max(row["max"], total)
+            row["db"] += rec.db_time
+            row["queries"] += len(rec.queries)
+            row["render"] += rec.render_time
+            row["cache"] += rec.cache_time
+            row["hits"] += hits
+            row["misses"] += misses
+            for family, counts in rec.cache.items():
+                agg = self.families.setdefault(family, {"hit": 0, "miss": 0, "write": 0})
+                for k, n in counts.items():
+                    agg[k] += n
+            if slow:
+                self.slow.appendleft(slow)
+
+    def snapshot(self):
+        """ข้อมูลสำหรับหน้าแอดมิน (ค่าเฉลี่ยเป็น ms)"""
+        with self._lock:
+            routes = []
+            for route, r in self.routes.items():
+                n = r["count"]
+                looked = r["hits"] + r["misses"]
+                routes.append({
+                    "route": route, "count": n,
+                    "avg_ms": r["total"] / n * 1000, "max_ms": r["max"] * 1000,
+                    "db_ms": r["db"] / n * 1000, "queries": r["queries"] / n,
+                    "render_ms": r["render"] / n * 1000, "cache_ms": r["cache"] / n * 1000,
+                    "hit_ratio": r["hits"] / looked if looked else None,
+                })
+            routes.sort(key=lambda r: r["avg_ms"] * r["count"], reverse=True)
+            families = [
+                {"family": f, **c, "hit_ratio": c["hit"] / (c["hit"] + c["miss"]) if c["hit"] + c["miss"] else None}
+                for f, c in sorted(self.families.items())
+            ]
+            return {"pid": os.getpid(), "since": self.since, "routes": routes,
+                    "families": families, "slow": list(self.slow)}
+
+
+stats = Stats()
+
+
+# ===================== Middleware =====================
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "-"
+
+
+def _mode():
+    return getattr(settings, "FORUM_SERVER_TIMING", "all" if settings.DEBUG else "staff")
+
+
+def _expose(request):
+    mode = _mode()
+    if mode == "all":
+        return True
+    if mode == "staff":
+        user = getattr(request, "user", None)
+        return bool(user is not None and user.is_staff)
+    return False
+
+
+class InstrumentMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rec = Recorder()
+        token = _current.set(rec)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, rec, _expose(request))
+
+    async def __acall__(self, request):
+        rec = Recorder()
+        token = _current.set(rec)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        if _mode() == "staff" and hasattr(request, "auser"):
+            request.user = await request.auser()  # ส่วนมากโหลดแล้ว — _expose อ่าน is_staff ได้โดยไม่แตะ DB ใน loop
+        return self.finish(request, response, rec, _expose(request))
+
+    def finish(self, request, response, rec, expose):
+        if getattr(response, "streaming", False):
+            return response  # SSE/ดาวน์โหลด: เวลาจนถึง header ไม่มีความหมาย
+        total = time.perf_counter() - rec.started
+        if expose:
+            response["Server-Timing"] = rec.server_timing(total)
+        route = _route(request)
+        slow = None
+        if total * 1000 >= getattr(settings, "FORUM_SLOW_REQUEST_MS", SLOW_MS):
+            slow = {
+                "at": time.time(), "method": request.method, "path": request.get_full_path()[:200],
+                "route": route, "status": response.status_code,
+                "total_ms": total * 1000, "db_ms": rec.db_time * 1000, "queries": len(rec.queries),
+                "render_ms": rec.render_time * 1000,
+                "slowest": [(s * 1000, sql[:SQL_PREVIEW]) for s, sql in rec.slowest()],
+            }
+            log.warning(
+                "ช้า %s %s %.0fms (db %.0fms/%d queries, tpl %.0fms, cache %.0fms)%s",
+                request.method, slow["path"], slow["total_ms"], slow["db_ms"], slow["queries"],
+                slow["render_ms"], rec.cache_time * 1000,
+                "".join(f"\n  {ms:.1f}ms {sql}" for ms, sql in slow["slowest"]),
+            )
+        stats.add(route, rec, total, slow)
+        metrics.request_finished(request, route, response.status_code, total, rec)
+        return response
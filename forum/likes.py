@@ -0,0 +1,55 @@
+# forum/likes.py
+"""
+กด/ยกเลิกไลก์แบบ atomic
+
+- ทุกอย่างอยู่ใน transaction เดียว: ตัดสินจากผลของการเขียน ไม่ใช่จากสิ่งที่อ่านมาก่อน
+  (SELECT ... FOR UPDATE ไม่มีผลบน SQLite — สอง request อ่านเจอแถวเดียวกันได้)
+  - ไลก์: INSERT ใน savepoint — ฝั่งที่ช้ากว่าเจอ IntegrityError ของ unique (thread, user) = ไลก์อยู่แล้ว
+  - เลิกไลก์: DELETE ตรง ๆ แล้วดูจำนวนแถว — ส่ง post_delete เฉพาะเมื่อลบได้จริง 1 แถว
+    (instance.delete() ส่ง post_delete แม้ DELETE ไม่เจอแถว → ยอด/มาแรง/สถิติรายวันลดซ้ำ)
+  ไม่มี 500 และตัวนับไม่บวก/ลบซ้ำ
+- signals ยังเป็นที่เดียวที่ปรับ like_count / มาแรง / สถิติ / แคช (forum/signals.py)
+- verb: "like" / "unlike" (idempotent — สั่งซ้ำได้ผลเหมือนเดิม) หรือ "toggle"
+- ยอดเปลี่ยน → push ยอดใหม่ให้ผู้ที่เปิดกระทู้อยู่ (forum/live.py) หลัง commit
+"""
+from django.db import IntegrityError, router, transaction
+from django.db.models.signals import post_delete
+
+from . import live
+from .models import Thread, ThreadLike
+
+VERBS = ("like", "unlike", "toggle")
+
+
+def _delete(like):
+    """ลบแถวไลก์ด้วย DELETE เดียว — True ถ้า request นี้เป็นฝั่งที่ลบได้จริง"""
+    using = router.db_for_write(ThreadLike, instance=like)
+    deleted = ThreadLike.objects.filter(pk=like.pk)._raw_delete(using)
+    if deleted:
+        post_delete.send(sender=ThreadLike, instance=like, using=using, origin=like)
+    return bool(deleted)
+
+
+def set_like(thread, user, verb="toggle"):
+    """คืน (liked, like_count) หลังทำรายการ"""
+    if verb not in VERBS:
+        raise ValueError(f"unknown verb: {verb}")
+    with transaction.atomic():
+        like = ThreadLike.objects.select_for_update().filter(thread=thread, user=user).first()
+        liked = like is not None
+        want = (not liked) if verb == "toggle" else verb == "like"
+        changed = False
+        if liked and not want:
+            like.thread = thread  # signals อ่าน thread.category_id โดยไม่ query ซ้ำ
+            changed = _delete(like)  # False = อีก request ลบไปก่อนแล้ว — ผลลัพธ์เดียวกัน
+        elif want and not liked:
+            try:
+                with transaction.atomic():
+                    ThreadLike.objects.create(thread=thread, user=user)
+                changed = True
+            except IntegrityError:
+                pass  # อีก request ไลก์ไปก่อนแล้ว — ผลลัพธ์เดียวกัน
+    count = Thread.objects.filter(pk=thread.pk).values_list("like_count", flat=True).first() or 0
+    if changed:
+        live.likes_changed(thread.pk, count)
+    return want, count
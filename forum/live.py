@@ -0,0 +1,77 @@
+# forum/live.py
+"""
+อัปเดตสดของหน้ากระทู้ (คอมเมนต์ใหม่ / ยอดไลก์) ผ่าน Server-Sent Events
+
+- channel ต่อกระทู้: thread:<id> บน forum/pubsub.py
+- เหตุการณ์ (ส่งหลัง commit เท่านั้น — ไม่มีใครเห็นของที่ rollback):
+    comment  {"id", "number", "url"}  url = fragment คอมเมนต์ที่เริ่มที่อันนี้ (ไคลเอนต์ดึงเอง
+             เพราะปุ่มแก้ไข/ลบต่างกันตามผู้ชม — ผู้ไม่ล็อกอินได้จากแคชทั้งหน้าตัวเดียวกัน)
+    removed  {"id"}                   คอมเมนต์ถูกลบ
+    likes    {"count"}                ยอดไลก์ล่าสุด (coalesce: ผู้ฟังที่ช้าได้แค่ค่าล่าสุด)
+    resync   {}                       ผู้ฟังตามไม่ทัน — ไคลเอนต์โหลดหน้าใหม่
+- stream มีอายุจำกัด (MAX_AGE) แล้วจบเอง EventSource ต่อใหม่ตาม retry — ไม่มี connection ค้างตลอดไป
+  ระหว่างเงียบส่ง comment line ทุก HEARTBEAT วินาที (proxy ไม่ตัด + รู้ว่าไคลเอนต์หลุด)
+- ต้องรันแบบ ASGI (README): ใต้ WSGI หนึ่ง stream = หนึ่ง thread ค้าง endpoint จึงตอบ 204 (EventSource หยุดต่อ)
+"""
+import json
+import time
+
+from django.db import transaction
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from . import pubsub
+from .pagination import at_cursor
+
+HEARTBEAT = 15      # วินาที
+MAX_AGE = 300       # วินาทีต่อ stream
+RETRY_MS = 3000     # ให้ EventSource รอก่อนต่อใหม่
+
+
+def channel(thread_id):
+    return f"thread:{thread_id}"
+
+
+# ===================== Publish (sync, จาก signals / likes) =====================
+
+def _after_commit(thread_id, event):
+    transaction.on_commit(lambda: pubsub.publish(channel(thread_id), event))
+
+
+def comment_added(comment):
+    url = reverse("forum:thread_comments", kwargs={"thread_id": comment.thread_id})
+    _after_commit(comment.thread_id, {
+        "type": "comment", "id": comment.pk, "number": comment.number,
+        "url": f"{url}?{urlencode({'cursor': at_cursor(comment)})}",
+    })
+
+
+def comment_removed(comment):
+    _after_commit(comment.thread_id, {"type": "removed", "id": comment.pk})
+
+
+def likes_changed(thread_id, count):
+    _after_commit(thread_id, {"type": "likes", "count": count, "coalesce": "likes"})
+
+
+# ===================== Stream (async) =====================
+
+def sse(event):
+    event = {k: v for k, v in event.items() if k != "coalesce"}
+    kind = event.pop("type")
+    return f"event: {kind}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def stream(sub, heartbeat=HEARTBEAT, max_age=MAX_AGE):
+    """async generator ของ StreamingHttpResponse — ปิดผู้ฟังเสมอเมื่อจบ/ไคลเอนต์หลุด"""
+    deadline = time.monotonic() + max_age
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while (left := deadline - time.monotonic()) > 0:
+            events = await sub.next(min(heartbeat, left))
+            if not events:
+                yield ": ping\n\n"
+                continue
+            yield "".join(sse(e) for e in events)
+    finally:
+        sub.close()
@@ -0,0 +1,76 @@
+# forum/management/commands/bench_forum.py
+import json
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from forum import benchmark
+from forum.models import Comment, Thread
+
+
+class Command(BaseCommand):
+    help = ("วัด latency (p50/p95/p99), จำนวน SQL และขนาด HTML ของหน้าหลัก/กระทู้/โปรไฟล์/แผงแอดมิน "
+            "เขียนผลเป็น JSON และเทียบกับ baseline (ถดถอย → exit code ไม่เป็น 0)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--user", help="ผู้ชมที่ล็อกอิน (ค่าเริ่มต้น: ผู้ใช้ seed_ คนแรก)")
+        parser.add_argument("--staff", help="ผู้ใช้ staff สำหรับหน้าแอดมิน (ค่าเริ่มต้น: staff คนแรก)")
+        parser.add_argument("--only", action="append", help="วัดเฉพาะหน้านี้ (ใส่ซ้ำได้)")
+        parser.add_argument("--query", default="ฟอสซิล", help="คำค้นของ home_q")
+        parser.add_argument("--output", help="ไฟล์ JSON ที่จะเขียนผล")
+        parser.add_argument("--baseline", help="ไฟล์ JSON ผลรอบก่อนที่จะเทียบ")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="สัดส่วนที่ latency/bytes โตได้")
+        parser.add_argument("--slack-ms", type=float, default=5.0, help="p95 ต้องช้าลงเกินกี่ ms ถึงนับว่าถดถอย")
+
+    def _user(self, username, **default):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"ไม่พบผู้ใช้ {username}")
+            return user
+        qs = User.objects.filter(is_active=True, **default)
+        return qs.filter(username__startswith="seed_").order_by("id").first() or qs.order_by("id").first()
+
+    def handle(self, *args, **o):
+        viewer = self._user(o["user"], is_staff=False)
+        staff = self._user(o["staff"], is_staff=True)
+        if staff is None:
+            self.stdout.write(self.style.WARNING("ไม่มีผู้ใช้ staff — ข้ามหน้าแอดมิน"))
+
+        plan = benchmark.scenarios(viewer, staff, query=o["query"])
+        results = benchmark.run(plan, iterations=o["iterations"], warmup=o["warmup"], only=o["only"])
+
+        self.stdout.write(f"{'page':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'bytes':>10}  status")
+        for name, r in results.items():
+            self.stdout.write(f"{name:<24}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                              f"{r['queries']:>9}{r['bytes']:>10}  {r['status']}")
+
+        report = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "vendor": connection.vendor,
+                "iterations": o["iterations"],
+                "threads": Thread.all_objects.count(),
+                "comments": Comment.all_objects.count(),
+                "users": User.objects.count(),
+            },
+            "results": results,
+        }
+        if o["output"]:
+            Path(o["output"]).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(f"เขียนผลที่ {o['output']}")
+
+        if o["baseline"]:
+            baseline = json.loads(Path(o["baseline"]).read_text(encoding="utf-8"))
+            regressions = benchmark.compare(results, baseline["results"], tolerance=o["tolerance"],
+                                            slack_ms=o["slack_ms"])
+            if regressions:
+                for name, metric, before, now in regressions:
+                    self.stderr.write(f"ถดถอย {name}.{metric}: {before} → {now}")
+                raise CommandError(f"ช้าลง/หนักขึ้น {len(regressions)} จุดเมื่อเทียบกับ {o['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"ไม่มีจุดถดถอยเมื่อเทียบกับ {o['baseline']}"))
@@ -0,0 +1,98 @@
+# forum/management/commands/bench_handlers.py
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient
+
+from forum.benchmark import client_host, make_client, percentile
+
+
+def _summary(label, latencies, elapsed, errors):
+    lat = sorted(latencies)
+    ms = lambda v: f"{v * 1000:.1f}ms"
+    return (f"{label:<5} {len(lat) / elapsed:8.1f} req/s  p50 {ms(percentile(lat, 50))}  "
+            f"p95 {ms(percentile(lat, 95))}  mean {ms(statistics.fmean(lat) if lat else 0)}  "
+            f"errors {errors}")
+
+
+class Command(BaseCommand):
+    help = ("เทียบ throughput ของ view เดียวกันผ่าน handler แบบ WSGI (thread pool) กับ ASGI (event loop) "
+            "ใน process เดียว ไม่ผ่านเครือข่าย — ดูว่า async view ช่วยเมื่อมี request พร้อมกันแค่ไหน")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", action="append", dest="paths",
+                            help="URL ที่ยิง (ใส่ซ้ำได้, ค่าเริ่มต้น /)")
+        parser.add_argument("--requests", type=int, default=200, help="จำนวน request ต่อโหมด")
+        parser.add_argument("--concurrency", type=int, default=8, help="request ที่ค้างพร้อมกัน")
+        parser.add_argument("--user", help="ล็อกอินเป็นผู้ใช้นี้ (ข้ามแคชทั้งหน้าของผู้ไม่ล็อกอิน)")
+        parser.add_argument("--mode", choices=("both", "wsgi", "asgi"), default="both")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or ["/"]
+        total, concurrency = options["requests"], max(1, options["concurrency"])
+        user = None
+        if options["user"]:
+            user = get_user_model().objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"ไม่พบผู้ใช้ {options['user']}")
+        plan = [paths[i % len(paths)] for i in range(total)]
+
+        self.stdout.write(f"{total} requests, concurrency {concurrency}, paths {', '.join(paths)}"
+                          + (f", user {user.username}" if user else ""))
+        if options["mode"] in ("both", "wsgi"):
+            self.stdout.write(_summary("wsgi", *self.run_wsgi(plan, concurrency, user)))
+        if options["mode"] in ("both", "asgi"):
+            self.stdout.write(_summary("asgi", *async_to_sync(self.run_asgi)(plan, concurrency, user)))
+
+    # ===================== WSGI =====================
+
+    def run_wsgi(self, plan, concurrency, user):
+        """worker thread ละ 1 client (= 1 connection DB) แบบ gunicorn --threads"""
+        lanes = [plan[i::concurrency] for i in range(concurrency)]
+
+        def lane(paths):
+            client = make_client(user)
+            out, errors = [], 0
+            try:
+                for path in paths:
+                    start = time.perf_counter()
+                    status = client.get(path).status_code
+                    out.append(time.perf_counter() - start)
+                    errors += status >= 400
+            finally:
+                connections.close_all()
+            return out, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lane, lanes))
+        elapsed = time.perf_counter() - start
+        return [v for out, _ in results for v in out], elapsed, sum(e for _, e in results)
+
+    # ===================== ASGI =====================
+
+    async def run_asgi(self, plan, concurrency, user):
+        """event loop เดียว request ค้างพร้อมกันไม่เกิน concurrency แบบ uvicorn worker หนึ่งตัว"""
+        client = AsyncClient(headers={"host": client_host()})
+        if user:
+            await client.aforce_login(user)
+        gate = asyncio.Semaphore(concurrency)
+        latencies, errors = [], 0
+
+        async def one(path):
+            nonlocal errors
+            async with gate:
+                start = time.perf_counter()
+                status = (await client.get(path)).status_code
+                latencies.append(time.perf_counter() - start)
+                errors += status >= 400
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(path) for path in plan))
+        return latencies, time.perf_counter() - start, errors
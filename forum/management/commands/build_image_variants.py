@@ -0,0 +1,34 @@
+# forum/management/commands/build_image_variants.py
+from django.core.management.base import BaseCommand
+
+from accounts.models import Profile
+from forum import images
+from forum.models import Comment, Thread
+
+TARGETS = [
+    # (โมเดล, ฟิลด์รูป, ฟิลด์ไฟล์ย่อ, ชนิด)
+    (Thread, "image", "image_variants", "thread"),
+    (Comment, "image", "image_variants", "comment"),
+    (Profile, "avatar", "avatar_variants", "avatar"),
+]
+
+
+class Command(BaseCommand):
+    help = "สร้างไฟล์ย่อ (WebP/JPEG หลายความกว้าง) ให้รูปที่ยังไม่มี หรือทั้งหมดด้วย --all"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="สร้างใหม่แม้มีไฟล์ย่ออยู่แล้ว")
+
+    def handle(self, *args, **options):
+        total = failed = 0
+        for model, field, variants_field, kind in TARGETS:
+            qs = model._base_manager.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            if not options["all"]:
+                qs = qs.filter(**{variants_field: {}})
+            for pk in qs.values_list("pk", flat=True).iterator():
+                total += 1
+                if images.build(model, pk, field, variants_field, kind) is None:
+                    failed += 1
+        self.stdout.write(self.style.SUCCESS(f"สร้างไฟล์ย่อแล้ว {total - failed}/{total} รูป"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"ไม่สำเร็จ {failed} รูป (ดู log)"))
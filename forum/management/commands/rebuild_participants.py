@@ -0,0 +1,12 @@
+# forum/management/commands/rebuild_participants.py
+from django.core.management.base import BaseCommand
+
+from forum.participants import rebuild
+
+
+class Command(BaseCommand):
+    help = "สร้างตารางผู้ตอบกระทู้ (ThreadParticipant) ใหม่ทั้งหมดจากคอมเมนต์"
+
+    def handle(self, *args, **options):
+        n = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"สร้างแถวผู้ตอบใหม่แล้ว ({n} แถว)"))
@@ -0,0 +1,15 @@
+# forum/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from forum.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "สร้างดัชนีค้นหา (SearchDocument + FTS5/GIN) ใหม่ทั้งหมดจากกระทู้และคอมเมนต์"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, batch_size=500, **options):
+        total = rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"สร้างดัชนีค้นหาแล้ว {total} เอกสาร"))
@@ -0,0 +1,12 @@
+# forum/management/commands/rebuild_stats.py
+from django.core.management.base import BaseCommand
+
+from forum.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "คำนวณสถิติรายวัน (DailyStat) ของแดชบอร์ดใหม่ทั้งหมดจากตารางจริง"
+
+    def handle(self, *args, **options):
+        n = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"สร้างสถิติรายวันใหม่แล้ว ({n} แถว)"))
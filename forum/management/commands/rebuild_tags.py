@@ -0,0 +1,15 @@
+# forum/management/commands/rebuild_tags.py
+from django.core.management.base import BaseCommand
+
+from forum.tags import rebuild
+
+
+class Command(BaseCommand):
+    help = "ดึงแท็กจากกระทู้ทั้งหมดใหม่ (Tag/ThreadTag) และคำนวณ Tag.thread_count จากตาราง"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, batch_size=500, **options):
+        n = rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"สร้างแท็กใหม่แล้ว ({n} กระทู้มีแท็ก)"))
@@ -0,0 +1,15 @@
+# forum/management/commands/rebuild_trending.py
+from django.core.management.base import BaseCommand
+
+from forum.trending import rebuild
+
+
+class Command(BaseCommand):
+    help = "สร้าง leaderboard กระทู้มาแรง (รวม + รายหมวด) ใหม่จากกระทู้/คอมเมนต์/ไลก์ใน DB"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=14, help="ย้อนหลังกี่วัน (ค่าเริ่มต้น 14)")
+
+    def handle(self, *args, days=14, **options):
+        n = rebuild(window_days=days)
+        self.stdout.write(self.style.SUCCESS(f"สร้าง leaderboard มาแรงใหม่แล้ว ({n} กระทู้)"))
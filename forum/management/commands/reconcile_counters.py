@@ -0,0 +1,17 @@
+# forum/management/commands/reconcile_counters.py
+from django.core.management.base import BaseCommand
+
+from forum.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "คำนวณตัวนับของกระทู้/หมวด (comment_count, like_count, last_activity_at, thread_count) ใหม่จากตารางจริง แล้วแก้เฉพาะแถวที่เพี้ยน"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="แค่รายงานจำนวนแถวที่เพี้ยน ไม่เขียน DB")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, dry_run=False, batch_size=500, **options):
+        threads, cats = reconcile(dry_run=dry_run, batch_size=batch_size)
+        verb = "พบ" if dry_run else "แก้"
+        self.stdout.write(self.style.SUCCESS(f"{verb}ตัวนับเพี้ยน: กระทู้ {threads} แถว, หมวด {cats} แถว"))
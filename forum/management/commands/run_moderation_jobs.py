@@ -0,0 +1,24 @@
+# forum/management/commands/run_moderation_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from forum import moderation
+
+
+class Command(BaseCommand):
+    help = "รันงานจัดการเนื้อหาแบบ bulk ที่รอคิว (ใช้คู่กับ FORUM_MODERATION_RUNNER = \"worker\")"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="ทำงานต่อเนื่อง รอรับงานใหม่")
+        parser.add_argument("--interval", type=float, default=5.0, help="วินาทีที่รอเมื่อไม่มีงาน (--loop)")
+
+    def handle(self, *args, **options):
+        while True:
+            for job_id, stale in moderation.runnable_ids():
+                status = moderation.run(job_id, stale=stale)
+                if status:
+                    self.stdout.write(f"งาน #{job_id}: {status}")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,194 @@
+# forum/management/commands/seed_forum.py
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile
+from forum.models import Category, Comment, Report, Thread, ThreadLike
+
+PREFIX = "seed_"
+BATCH = 1000
+
+CATEGORY_NAMES = ["ทั่วไป", "ฟอสซิล", "ไดโนเสาร์กินพืช", "ไดโนเสาร์กินเนื้อ", "Paleontology",
+                  "Museums", "ของสะสม", "ข่าววิทยาศาสตร์", "Off-topic", "ถาม-ตอบ"]
+TH_WORDS = ["ไดโนเสาร์", "ฟอสซิล", "กระดูก", "ยุคจูราสสิก", "ครีเทเชียส", "นักบรรพชีวิน", "ขุดค้น", "พิพิธภัณฑ์",
+            "ที", "เร็กซ์", "ไทรเซอราท็อปส์", "สเตโกซอรัส", "ขนาดใหญ่", "กินพืช", "กินเนื้อ", "ค้นพบ", "ใหม่",
+            "ที่", "ประเทศไทย", "ภูเวียง", "ขอนแก่น", "ฟัน", "กะโหลก", "รอยเท้า", "ไข่", "หิน", "ตะกอน", "ล้านปี"]
+EN_WORDS = ["dinosaur", "fossil", "bone", "jurassic", "cretaceous", "dig", "museum", "tyrannosaurus", "raptor",
+            "sauropod", "skull", "tooth", "footprint", "egg", "sediment", "million", "years", "found", "new",
+            "species", "feathers", "cast", "replica", "field", "trip", "question", "about", "the", "a", "of"]
+TAGS = ["ฟอสซิล", "ภูเวียง", "trex", "jurassic", "พิพิธภัณฑ์", "ถามตอบ", "news", "ของสะสม", "ไข่ไดโนเสาร์", "diy"]
+
+
+def _sentence(rng, words=None, n=None):
+    words = words or (TH_WORDS if rng.random() < 0.6 else EN_WORDS)
+    n = n or rng.randint(5, 18)
+    sep = "" if words is TH_WORDS and rng.random() < 0.5 else " "  # ภาษาไทยมักไม่เว้นวรรคระหว่างคำ
+    return sep.join(rng.choice(words) for _ in range(n))
+
+
+def _text(rng, sentences):
+    return "\n".join(_sentence(rng) for _ in range(sentences))
+
+
+def _count(rng, mean):
+    """หางยาว: ส่วนใหญ่น้อย บางอันเยอะมาก (ค่าเฉลี่ยประมาณ mean)"""
+    return int(rng.expovariate(1 / mean)) if mean > 0 else 0
+
+
+@contextmanager
+def _explicit_dates(*models):
+    """ให้ bulk_create ใช้ created_at ที่กำหนดเอง (ปิด auto_now_add ชั่วคราว — คำสั่งนี้เท่านั้น)"""
+    fields = [f for m in models for f in m._meta.concrete_fields if getattr(f, "auto_now_add", False)]
+    for f in fields:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f in fields:
+            f.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ("สร้างฟอรัมจำลองสำหรับวัดประสิทธิภาพ (ผู้ใช้/กระทู้/คอมเมนต์/ไลก์/รายงาน/รูป ภาษาไทย+อังกฤษ) ด้วย bulk_create "
+            "แล้วคำนวณตัวนับ/ดัชนี/สถิติใหม่ — ผู้ใช้ทั้งหมดขึ้นต้นด้วย seed_ (ลบได้ด้วย --clear)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--categories", type=int, default=6, help="จำนวนหมวด (ใช้หมวดที่มีอยู่ก่อน)")
+        parser.add_argument("--threads-per-category", type=int, default=50)
+        parser.add_argument("--comments", type=float, default=8, help="คอมเมนต์เฉลี่ยต่อกระทู้")
+        parser.add_argument("--likes", type=float, default=4, help="ไลก์เฉลี่ยต่อกระทู้")
+        parser.add_argument("--big-thread", type=int, default=2000, help="คอมเมนต์ของกระทู้ยักษ์ 1 กระทู้ (0 = ไม่สร้าง)")
+        parser.add_argument("--reports", type=int, default=100)
+        parser.add_argument("--images", type=float, default=0.1, help="สัดส่วนกระทู้ที่มีรูป")
+        parser.add_argument("--days", type=int, default=60, help="กระจายเวลาสร้างย้อนหลังกี่วัน")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--clear", action="store_true", help="ลบข้อมูลจำลองเดิมก่อน")
+        parser.add_argument("--no-rebuild", action="store_true", help="ไม่คำนวณตัวนับ/ดัชนี/สถิติใหม่")
+
+    def handle(self, *args, **o):
+        rng = random.Random(o["seed"])
+        if o["clear"]:
+            n = User.objects.filter(username__startswith=PREFIX).delete()[0]
+            self.stdout.write(f"ลบข้อมูลจำลองเดิม {n} แถว")
+
+        now = timezone.now()
+        start = now - timedelta(days=o["days"])
+
+        def when(after=start):
+            return after + (now - after) * rng.random()
+
+        with transaction.atomic(), _explicit_dates(User, Thread, Comment, ThreadLike, Report):
+            users = self.seed_users(o["users"], rng, when)
+            cats = self.seed_categories(o["categories"])
+            images = self.seed_images(rng) if o["images"] > 0 else []
+            threads = self.seed_threads(users, cats, o["threads_per_category"], o["images"], images, rng, when)
+            if o["big_thread"]:
+                big = Thread(category=cats[0], author=users[0], title=f"กระทู้ยักษ์ #ทดสอบ {_sentence(rng, n=4)}",
+                             content=_text(rng, 3), created_at=start)
+                Thread.objects.bulk_create([big])
+                threads.append(big)
+            comments = self.seed_comments(threads, users, o["comments"], o["big_thread"], rng, when)
+            likes = self.seed_likes(threads, users, o["likes"], rng, when)
+            reports = self.seed_reports(threads, users, o["reports"], rng, when)
+
+        self.stdout.write(f"ผู้ใช้ {len(users)}, หมวด {len(cats)}, กระทู้ {len(threads)}, "
+                          f"คอมเมนต์ {comments}, ไลก์ {likes}, รายงาน {reports}")
+        if not o["no_rebuild"]:
+            for command in ("reconcile_counters", "rebuild_search_index", "rebuild_tags", "rebuild_trending",
+                            "rebuild_participants", "rebuild_stats"):
+                call_command(command, stdout=self.stdout)
+        if images:
+            self.stdout.write("รูปย่อ: python manage.py build_image_variants")
+
+    # ===================== Rows =====================
+
+    def seed_users(self, n, rng, when):
+        taken = User.objects.filter(username__startswith=PREFIX).count()
+        users = [User(username=f"{PREFIX}{taken + i}", password="!", date_joined=when()) for i in range(n)]
+        users = User.objects.bulk_create(users, batch_size=BATCH)
+        Profile.objects.bulk_create(
+            [Profile(user=u, display_name=_sentence(rng, n=2)[:150]) for u in users], batch_size=BATCH,
+        )
+        return users
+
+    def seed_categories(self, n):
+        cats = list(Category.objects.order_by("order", "id")[:n])
+        names = [c for c in CATEGORY_NAMES if not Category.objects.filter(name=c).exists()]
+        for i in range(len(cats), n):
+            name = names.pop(0) if names else f"หมวดจำลอง {i}"
+            cats.append(Category.objects.create(name=name, order=i))  # save() ตั้ง slug ให้
+        return cats
+
+    def seed_images(self, rng, n=5):
+        from PIL import Image
+        names = []
+        for i in range(n):
+            buf = BytesIO()
+            Image.new("RGB", (1600, 1200), tuple(rng.randrange(256) for _ in range(3))).save(buf, "JPEG", quality=85)
+            names.append(default_storage.save(f"threads/seed/seed_{i}.jpg", ContentFile(buf.getvalue())))
+        return names
+
+    def seed_threads(self, users, cats, per_category, image_ratio, images, rng, when):
+        rows = []
+        for cat in cats:
+            for _ in range(per_category):
+                tags = " ".join(f"#{t}" for t in rng.sample(TAGS, rng.randint(0, 2)))
+                created = when()
+                rows.append(Thread(
+                    category=cat, author=rng.choice(users),
+                    title=f"{_sentence(rng, n=rng.randint(3, 8))} {tags}".strip()[:160],
+                    content=_text(rng, rng.randint(1, 6)),
+                    image=rng.choice(images) if images and rng.random() < image_ratio else None,
+                    is_deleted=rng.random() < 0.03,
+                    created_at=created, last_activity_at=created,
+                ))
+        return Thread.objects.bulk_create(rows, batch_size=BATCH)
+
+    def seed_comments(self, threads, users, mean, big, rng, when):
+        total = 0
+        batch = []
+        for t in threads:
+            n = big if big and t is threads[-1] else _count(rng, mean)
+            stamps = sorted(when(t.created_at) for _ in range(n))
+            for number, at in enumerate(stamps, 1):
+                batch.append(Comment(thread=t, author=rng.choice(users), content=_text(rng, rng.randint(1, 3)),
+                                     is_deleted=rng.random() < 0.02, created_at=at, number=number))
+            t.comment_seq = n
+            total += n
+            if len(batch) >= BATCH:
+                Comment.objects.bulk_create(batch, batch_size=BATCH)
+                batch = []
+        Comment.objects.bulk_create(batch, batch_size=BATCH)
+        Thread.all_objects.bulk_update(threads, ["comment_seq"], batch_size=BATCH)
+        return total
+
+    def seed_likes(self, threads, users, mean, rng, when):
+        rows = []
+        for t in threads:
+            for u in rng.sample(users, min(len(users), _count(rng, mean))):
+                rows.append(ThreadLike(thread=t, user=u, created_at=when(t.created_at)))
+        ThreadLike.objects.bulk_create(rows, batch_size=BATCH)
+        return len(rows)
+
+    def seed_reports(self, threads, users, n, rng, when):
+        rows = []
+        # รายงานกระจุกที่กระทู้ไม่กี่กระทู้ (คิวแอดมินรวมตามเป้าหมาย)
+        targets = rng.sample(threads, min(len(threads), max(1, n // 5)))
+        for _ in range(n):
+            t = rng.choice(targets)
+            rows.append(Report(target_type="thread", target_id=t.pk, thread=t, target_author_id=t.author_id,
+                               reporter=rng.choice(users), reason=_sentence(rng, n=4)[:255],
+                               status="open" if rng.random() < 0.8 else "closed", created_at=when(t.created_at)))
+        Report.objects.bulk_create(rows, batch_size=BATCH)
+        return len(rows)
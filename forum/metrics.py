@@ -0,0 +1,227 @@
+# forum/metrics.py
+"""
+ตัววัดแบบ Prometheus (GET /metrics, text format 0.0.4) — time series สำหรับวางแผน capacity
+
+- ตัววัด (label view = url name ไม่ใช่ path จริง — จำนวน series จำกัดเสมอ):
+    forum_http_request_duration_seconds    histogram {view, method, status}   status = 2xx/3xx/4xx/5xx
+    forum_db_queries_total                 counter   {view}
+    forum_db_query_duration_seconds_total  counter   {view}
+    forum_cache_requests_total             counter   {family, result}   result = hit | miss
+                                           family ตาม forum/instrument.py เช่น trending, page:thread_detail,
+                                           presence (heartbeat ออนไลน์: add ไม่สำเร็จ = hit)
+    forum_ratelimit_rejections_total       counter   {group}            ตอบ 429 (forum/ratelimit.py)
+    forum_upload_bytes                     histogram {view}             ไฟล์ที่อัปโหลดมา (รวมที่ถูกปฏิเสธ)
+  ค่าต่อ request มาจาก Recorder ของ InstrumentMiddleware ตอนจบ request — ไม่วัดซ้ำ
+  (response แบบ streaming เช่น SSE ไม่นับ: เวลาจนถึง header ไม่ใช่ latency)
+- รวมข้าม worker (gunicorn หลาย process): บวกสะสมในหน่วยความจำของ process ก่อน แล้ว flush ทุก
+  FLUSH_INTERVAL วินาทีเป็น HINCRBYFLOAT ใน pipeline เดียวลง hash ของ Redis ตัวเดียวกับ cache
+  /metrics อ่าน hash เดียว = ผลรวมทุก worker, worker restart ไม่ทำให้ counter รีเซ็ต
+  Redis ล่ม → เก็บค่าไว้ใน process แล้วลองใหม่รอบหน้า (request ไม่พังเพราะตัววัด)
+  backend ตาม settings.FORUM_METRICS_BACKEND = "redis" | "local" ไม่ตั้ง → แบบเดียวกับ forum/zset.py
+- สิทธิ์: settings.FORUM_METRICS_TOKEN → ต้องส่ง Authorization: Bearer <token> (ตั้งใน scrape config)
+  ไม่ตั้ง → staff เท่านั้น
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+KEY = "forum:metrics"
+FLUSH_INTERVAL = 1.0   # วินาที — round trip ไป Redis อย่างมากครั้งละเท่านี้ต่อ worker
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPLOAD_BUCKETS = tuple(kb * 1024 for kb in (16, 64, 256, 1024, 2048, 5120, 10240))
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# name → (type, help, buckets)
+METRICS = {
+    "forum_http_request_duration_seconds": ("histogram", "เวลาตอบต่อ request ตาม url name", LATENCY_BUCKETS),
+    "forum_db_queries_total": ("counter", "จำนวน SQL ที่รันตาม url name", None),
+    "forum_db_query_duration_seconds_total": ("counter", "เวลารวมใน SQL ตาม url name", None),
+    "forum_cache_requests_total": ("counter", "การอ่าน cache ตาม family และผล hit/miss", None),
+    "forum_ratelimit_rejections_total": ("counter", "request ที่ถูกตอบ 429 ตามกลุ่มของ rate limit", None),
+    "forum_upload_bytes": ("histogram", "ขนาดไฟล์ที่อัปโหลดตาม url name", UPLOAD_BUCKETS),
+}
+
+
+def _num(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+
+
+# ===================== Stores =====================
+
+class LocalStore:
+    """ค่าใน process (เทสต์/dev ที่มี process เดียว)"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def push(self, values):
+        with self._lock:
+            for field, amount in values.items():
+                self._data[field] = self._data.get(field, 0.0) + amount
+
+    def read(self):
+        with self._lock:
+            return dict(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStore:
+    def __init__(self, client):
+        self.client = client
+
+    def push(self, values):
+        pipe = self.client.pipeline(transaction=False)
+        for field, amount in values.items():
+            pipe.hincrbyfloat(KEY, field, amount)
+        pipe.execute()
+
+    def read(self):
+        return {
+            (f.decode() if isinstance(f, bytes) else f): float(v)
+            for f, v in self.client.hgetall(KEY).items()
+        }
+
+    def clear(self):
+        self.client.delete(KEY)
+
+
+_local = LocalStore()
+
+
+def backend_name():
+    name = getattr(settings, "FORUM_METRICS_BACKEND", None)
+    if name:
+        return name
+    cache_backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    return "redis" if cache_backend.startswith("django_redis") else "local"
+
+
+def store():
+    if backend_name() == "redis":
+        from django_redis import get_redis_connection
+        return RedisStore(get_redis_connection("default"))
+    return _local
+
+
+# ===================== Record =====================
+
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _add(field, amount):
+    with _pending_lock:
+        _pending[field] = _pending.get(field, 0.0) + amount
+
+
+def inc(name, amount=1, **labels):
+    if amount:
+        _add(f"{name}\t{_labels(labels)}\t", amount)
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    base = f"{name}\t{_labels(labels)}\t"
+    le = next((b for b in buckets if value <= b), None)
+    if le is not None:  # เก็บแบบไม่สะสม รวมเป็น cumulative ตอน render
+        _add(f"{base}bucket:{_num(le)}", 1)
+    _add(f"{base}sum", value)
+    _add(f"{base}count", 1)
+
+
+def flush():
+    global _last_flush
+    with _pending_lock:
+        values = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not values:
+        return
+    try:
+        store().push(values)
+    except Exception:  # ตัววัดต้องไม่ทำให้ request พัง
+        log.warning("flush metrics ไม่สำเร็จ จะลองใหม่รอบหน้า", exc_info=True)
+        for field, amount in values.items():
+            _add(field, amount)
+
+
+def maybe_flush():
+    if backend_name() == "local" or time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+
+atexit.register(flush)  # worker ปิดตัวปกติ: ส่งค่าที่ค้างก่อนออก
+
+
+def request_finished(request, route, status, total, rec):
+    """เรียกจาก InstrumentMiddleware.finish ทุก request ที่ไม่ใช่ streaming"""
+    method = request.method if request.method in METHODS else "other"
+    observe("forum_http_request_duration_seconds", total, view=route, method=method, status=f"{status // 100}xx")
+    inc("forum_db_queries_total", len(rec.queries), view=route)
+    inc("forum_db_query_duration_seconds_total", rec.db_time, view=route)
+    for family, counts in rec.cache.items():
+        for result in ("hit", "miss"):
+            inc("forum_cache_requests_total", counts[result], family=family, result=result)
+    files = request.__dict__.get("_files")  # เฉพาะเมื่อ view อ่าน request.FILES แล้ว — ไม่ parse เพิ่มเอง
+    if files:
+        for _, uploads in files.lists():
+            for f in uploads:
+                observe("forum_upload_bytes", f.size, view=route)
+    maybe_flush()
+
+
+def reset():
+    """ล้างทั้งค่าที่ค้างและ store (เทสต์)"""
+    with _pending_lock:
+        _pending.clear()
+    store().clear()
+
+
+# ===================== Render =====================
+
+def render():
+    """ข้อความ text format ของทุก worker (flush ของ process นี้ก่อน)"""
+    flush()
+    series = {}  # name → {labels: {suffix: value}}
+    for field, value in store().read().items():
+        name, labels, suffix = field.split("\t")
+        series.setdefault(name, {}).setdefault(labels, {})[suffix] = value
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, values in sorted(series.get(name, {}).items()):
+            if kind == "counter":
+                lines.append(f"{name}{{{labels}}} {_num(values.get('', 0))}")
+                continue
+            prefix = f"{labels}," if labels else ""
+            running = 0.0
+            for le in buckets:
+                running += values.get(f"bucket:{_num(le)}", 0)
+                lines.append(f'{name}_bucket{{{prefix}le="{_num(le)}"}} {_num(running)}')
+            count = values.get("count", 0)
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {_num(count)}')
+            lines.append(f"{name}_sum{{{labels}}} {_num(values.get('sum', 0))}")
+            lines.append(f"{name}_count{{{labels}}} {_num(count)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,64 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Thread = apps.get_model("forum", "Thread")
+    Comment = apps.get_model("forum", "Comment")
+    ThreadLike = apps.get_model("forum", "ThreadLike")
+    Category = apps.get_model("forum", "Category")
+
+    def count_sq(qs):
+        return Coalesce(
+            Subquery(qs.order_by().values("thread").annotate(n=Count("id")).values("n")[:1]),
+            Value(0),
+        )
+
+    last_comment = Comment.objects.filter(thread=OuterRef("pk")).order_by("-created_at").values("created_at")[:1]
+    Thread.objects.update(
+        comment_count=count_sq(Comment.objects.filter(thread=OuterRef("pk"), is_deleted=False)),
+        like_count=count_sq(ThreadLike.objects.filter(thread=OuterRef("pk"))),
+        last_activity_at=Coalesce(Subquery(last_comment), "created_at"),
+    )
+    live = (
+        Thread.objects.filter(category=OuterRef("pk"), is_deleted=False)
+        .order_by().values("category").annotate(n=Count("id")).values("n")[:1]
+    )
+    Category.objects.update(thread_count=Coalesce(Subquery(live), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0011_rename_categories_thread_extra_categories_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='thread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['-created_at'], name='forum_thread_created_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
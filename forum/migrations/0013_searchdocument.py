@@ -0,0 +1,143 @@
+import html
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# ดัชนีค้นหาระดับ DB — ต้องตรงกับ forum/search.py (FTS_TABLE, _PG_VECTOR)
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE forum_search_fts USING fts5(
+        title, body, author,
+        content='forum_searchdocument', content_rowid='id', tokenize='ascii'
+    )
+    """,
+    # title สำคัญสุด รองลงมาผู้เขียน แล้วเนื้อหา
+    "INSERT INTO forum_search_fts(forum_search_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0)')",
+    """
+    CREATE TRIGGER forum_searchdocument_ai AFTER INSERT ON forum_searchdocument BEGIN
+        INSERT INTO forum_search_fts(rowid, title, body, author)
+        VALUES (new.id, new.title, new.body, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER forum_searchdocument_ad AFTER DELETE ON forum_searchdocument BEGIN
+        INSERT INTO forum_search_fts(forum_search_fts, rowid, title, body, author)
+        VALUES ('delete', old.id, old.title, old.body, old.author);
+    END
+    """,
+    """
+    CREATE TRIGGER forum_searchdocument_au AFTER UPDATE ON forum_searchdocument BEGIN
+        INSERT INTO forum_search_fts(forum_search_fts, rowid, title, body, author)
+        VALUES ('delete', old.id, old.title, old.body, old.author);
+        INSERT INTO forum_search_fts(rowid, title, body, author)
+        VALUES (new.id, new.title, new.body, new.author);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS forum_searchdocument_au",
+    "DROP TRIGGER IF EXISTS forum_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS forum_searchdocument_ai",
+    "DROP TABLE IF EXISTS forum_search_fts",
+]
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX forum_search_gin ON forum_searchdocument USING GIN ((
+        setweight(to_tsvector('simple', title), 'A')
+        || setweight(to_tsvector('simple', author), 'B')
+        || setweight(to_tsvector('simple', body), 'C')
+    ))
+    """,
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS forum_search_gin"]
+
+
+def _run(statements):
+    def apply(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, ()):
+            schema_editor.execute(sql)
+    return apply
+
+
+# สำเนาตัวตัดคำของ forum/search.py ณ migration นี้ — ห้ามแก้ตามโค้ดปัจจุบัน
+# (ตัวตัดคำเปลี่ยนภายหลัง → เขียน migration ใหม่ที่ index ซ้ำ ไม่ใช่เปลี่ยนผลของอันนี้)
+_THAI_RUN = re.compile(r"[\u0E00-\u0E7F]+")
+_WORD = re.compile(r"[\u0E00-\u0E7F]+|\w+")
+
+
+def segment(text):
+    out = []
+    for w in _WORD.findall(html.unescape(strip_tags(text or "")).lower()):
+        if _THAI_RUN.fullmatch(w) and len(w) > 1:
+            out += [w[i:i + 2] for i in range(len(w) - 1)]
+        else:
+            out.append(w)
+    return " ".join(out)
+
+
+BATCH_SIZE = 500
+
+
+def _bulk_create(model, docs):
+    """สร้างทีละ BATCH_SIZE แถว — หน่วยความจำไม่โตตามขนาดของทั้งฟอรั่ม"""
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def backfill(apps, schema_editor):
+    Thread = apps.get_model("forum", "Thread")
+    Comment = apps.get_model("forum", "Comment")
+    SearchDocument = apps.get_model("forum", "SearchDocument")
+
+    threads = Thread.objects.order_by("id").values_list("id", "title", "content", "author__username")
+    _bulk_create(SearchDocument, (
+        SearchDocument(kind="thread", obj_id=pk, thread_id=pk, title=segment(title),
+                       body=segment(content), author=segment(username))
+        for pk, title, content, username in threads.iterator(chunk_size=BATCH_SIZE)
+    ))
+    comments = (Comment.objects.filter(is_deleted=False).order_by("id")
+                .values_list("id", "thread_id", "content", "author__username"))
+    _bulk_create(SearchDocument, (
+        SearchDocument(kind="comment", obj_id=pk, thread_id=thread_id, title="",
+                       body=segment(content), author=segment(username))
+        for pk, thread_id, content, username in comments.iterator(chunk_size=BATCH_SIZE)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0012_thread_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('thread', 'Thread'), ('comment', 'Comment')], max_length=10)),
+                ('obj_id', models.PositiveIntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('author', models.TextField(blank=True)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forum.thread')),
+            ],
+            options={
+                'unique_together': {('kind', 'obj_id')},
+            },
+        ),
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
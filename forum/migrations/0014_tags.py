@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    from forum.tags import extract
+
+    Thread = apps.get_model("forum", "Thread")
+    Tag = apps.get_model("forum", "Tag")
+    ThreadTag = apps.get_model("forum", "ThreadTag")
+
+    pairs = []
+    for t in Thread.objects.order_by("id").iterator():
+        pairs += [(t, name) for name in extract(t.title, t.content)]
+    names = {name for _, name in pairs}
+    Tag.objects.bulk_create([Tag(name=n) for n in names], ignore_conflicts=True)
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+
+    ThreadTag.objects.bulk_create(
+        [ThreadTag(thread=t, tag=tags[n], thread_created_at=t.created_at) for t, n in pairs],
+        batch_size=500,
+    )
+    live = {}
+    for t, n in pairs:
+        if not t.is_deleted:
+            live[n] = live.get(n, 0) + 1
+    for n, count in live.items():
+        Tag.objects.filter(pk=tags[n].pk).update(thread_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0013_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('thread_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-thread_count'], name='forum_tag_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ThreadTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('thread_created_at', models.DateTimeField()),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_tags', to='forum.tag')),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_tags', to='forum.thread')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['tag', '-thread_created_at', '-id'], name='forum_threadtag_feed_idx')],
+                'unique_together': {('thread', 'tag')},
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+def backfill_numbers(apps, schema_editor):
+    Thread = apps.get_model("forum", "Thread")
+    Comment = apps.get_model("forum", "Comment")
+
+    for thread_id in Thread.objects.order_by().values_list("id", flat=True).iterator():
+        ids = list(
+            Comment.objects.filter(thread_id=thread_id).order_by("created_at", "id").values_list("id", flat=True)
+        )
+        Comment.objects.bulk_update(
+            [Comment(id=pk, number=i) for i, pk in enumerate(ids, start=1)], ["number"], batch_size=500
+        )
+        if ids:
+            Thread.objects.filter(id=thread_id).update(comment_seq=len(ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0014_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='comment_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='number',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread', 'created_at', 'id'], name='forum_comment_seek_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread', 'number'], name='forum_comment_number_idx'),
+        ),
+        migrations.RunPython(backfill_numbers, migrations.RunPython.noop),
+    ]
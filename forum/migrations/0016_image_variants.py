@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0015_comment_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0016_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('new_users', models.IntegerField(default=0)),
+                ('threads', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('reports', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forum.category')),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('day', 'category'), name='forum_dailystat_day_cat_uniq'),
+                    models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('day',), name='forum_dailystat_day_site_uniq'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_targets(apps, schema_editor):
+    """รายงานเดิม: เติม thread / target_author จากเป้าหมาย"""
+    Report = apps.get_model("forum", "Report")
+    Thread = apps.get_model("forum", "Thread")
+    Comment = apps.get_model("forum", "Comment")
+    sources = {"thread": Thread, "comment": Comment}
+    for target_type, model in sources.items():
+        ids = set(Report.objects.filter(target_type=target_type).values_list("target_id", flat=True))
+        fields = ("id", "author_id") if target_type == "thread" else ("id", "thread_id", "author_id")
+        for row in model.objects.filter(id__in=ids).values_list(*fields):
+            thread_id = row[0] if target_type == "thread" else row[1]
+            Report.objects.filter(target_type=target_type, target_id=row[0]).update(
+                thread_id=thread_id, target_author_id=row[-1],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0017_dailystat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='thread',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='forum.thread'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='target_author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', 'target_type', 'target_id'], name='forum_report_open_idx'),
+        ),
+        migrations.RunPython(fill_targets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0019_moderationjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # index เต็มตารางเดิม → partial index เฉพาะแถวที่ยังไม่ถูกลบ (ตามเส้นทางที่ query จริง)
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='forum_comment_seek_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='thread',
+            name='forum_threa_categor_f73386_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='thread',
+            name='forum_thread_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['thread', 'created_at', 'id'], name='forum_comment_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', '-id'], name='forum_thread_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['category', '-created_at', '-id'], name='forum_thread_cat_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['author', '-created_at', '-id'], name='forum_thread_author_live_idx'),
+        ),
+        # index เดี่ยวของ user ถูกแทนด้วย (user, thread)
+        migrations.AlterField(
+            model_name='threadlike',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='thread_likes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='threadlike',
+            index=models.Index(fields=['user', 'thread'], name='forum_threadlike_user_idx'),
+        ),
+    ]
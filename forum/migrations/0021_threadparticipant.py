@@ -0,0 +1,47 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def fill_participants(apps, schema_editor):
+    """สร้างแถวผู้ตอบจากคอมเมนต์ที่มีอยู่ (เหมือน python manage.py rebuild_participants)"""
+    Comment = apps.get_model("forum", "Comment")
+    ThreadParticipant = apps.get_model("forum", "ThreadParticipant")
+    rows = (
+        Comment.objects.filter(is_deleted=False).order_by()
+        .values_list("author_id", "thread_id")
+        .annotate(n=Count("id"), first=Min("created_at"), last=Max("created_at"))
+    )
+    ThreadParticipant.objects.bulk_create(
+        [ThreadParticipant(user_id=u, thread_id=t, reply_count=n, first_reply_at=first, last_reply_at=last)
+         for u, t, n, first, last in rows.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0020_live_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThreadParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reply_count', models.PositiveIntegerField(default=0)),
+                ('first_reply_at', models.DateTimeField()),
+                ('last_reply_at', models.DateTimeField()),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='forum.thread')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='participations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'thread'), name='forum_participant_uniq')],
+                'indexes': [models.Index(fields=['user', '-last_reply_at', '-id'], name='forum_participant_user_idx')],
+            },
+        ),
+        migrations.RunPython(fill_participants, migrations.RunPython.noop),
+    ]
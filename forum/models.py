@@ -1,6 +1,7 @@
 # forum/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.text import slugify
 from django.conf import settings  # ✅ ต้องมี (ใช้กับ ThreadLike.user)
 
@@ -14,11 +15,38 @@ def comment_image_upload(instance, filename):
     return f"comments/{instance.author_id}/{filename}"
 
 
+# ---------- managers ----------
+class SoftDeleteQuerySet(models.QuerySet):
+    def live(self):
+        return self.filter(is_deleted=False)
+
+    def deleted(self):
+        return self.filter(is_deleted=True)
+
+
+class LiveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    manager เริ่มต้นของ Thread/Comment: ซ่อนแถวที่ถูก soft-delete
+    ต้องการทุกแถว (หน้าแอดมิน, กู้คืน, งานซ่อมข้อมูล) ใช้ Model.all_objects
+    FK / refresh_from_db / save() ใช้ base manager ของ Django (ไม่กรอง) จึงยังเห็นแถวที่ถูกลบ
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+AllObjectsManager = models.Manager.from_queryset(SoftDeleteQuerySet)
+
+# partial index ใช้เงื่อนไขเดียวกับ LiveManager — query ต้องมี is_deleted=False ตรง ๆ ถึงจะใช้ index ได้
+LIVE = models.Q(is_deleted=False)
+
+
 # ---------- models ----------
 class Category(models.Model):
     name  = models.CharField(max_length=100, unique=True)
     slug  = models.SlugField(unique=True, blank=True)
     order = models.PositiveIntegerField(default=0)
+    # ตัวนับ denormalized: จำนวนกระทู้ที่ยังไม่ถูกลบในหมวด (ดูแลโดย forum/counters.py)
+    thread_count = models.PositiveIntegerField(default=0)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -45,19 +73,37 @@ class Thread(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # ---- ตัวนับ denormalized (ดูแลด้วย F() ใน forum/counters.py, ซ่อมด้วย reconcile_counters) ----
+    comment_count    = models.PositiveIntegerField(default=0)  # เฉพาะคอมเมนต์ที่ยังไม่ถูกลบ
+    like_count       = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    # เลขลำดับคอมเมนต์ล่าสุดที่แจกไป (นับรวมที่ถูกลบ — เลข #N ของคอมเมนต์ไม่เปลี่ยนตามการลบ)
+    comment_seq      = models.PositiveIntegerField(default=0)
+    # ไฟล์ย่อของ image (สร้างเบื้องหลังโดย forum/images.py) — {} = ยังไม่มี ใช้ต้นฉบับ
+    image_variants   = models.JSONField(default=dict, blank=True)
 
-    @property
-    def comment_count(self) -> int:
-        """จำนวนคอมเมนต์ที่ยังไม่ถูกลบของกระทู้นี้"""
-        return self.comments.filter(is_deleted=False).count()
-
-
-
+    objects     = LiveManager()        # ค่าเริ่มต้น: เฉพาะที่ยังไม่ถูกลบ
+    all_objects = AllObjectsManager()  # รวมที่ถูกลบ (staff / กู้คืน / ซ่อมข้อมูล)
 
     # ✅ เมธอดต้องอยู่ในคลาส (เยื้อง 4 ช่อง)
     @property
     def likes_count(self):
-        return self.likes.count()
+        # ชื่อเดิม เก็บไว้ให้ template/โค้ดเก่า — อ่านจากคอลัมน์ ไม่ยิง query
+        return self.like_count
+
+    COUNTER_FIELDS = ("comment_count", "like_count", "last_activity_at", "comment_seq")
+    BACKGROUND_FIELDS = ("image_variants",)
+
+    def save(self, *args, **kwargs):
+        # ตัวนับถูกบวก/ลบด้วย F() จากที่อื่น และไฟล์ย่อถูกเขียนจากงานเบื้องหลัง
+        # save() ทั้งแถวจะเขียนค่าเก่าในหน่วยความจำทับ จึงตัดคอลัมน์เหล่านี้ออก เว้นแต่ผู้เรียกระบุ update_fields เอง
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            skip = self.COUNTER_FIELDS + self.BACKGROUND_FIELDS
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in skip
+            ]
+        super().save(*args, **kwargs)
 
     def is_liked_by(self, user):
         return user.is_authenticated and self.likes.filter(user=user).exists()
@@ -65,29 +111,30 @@ class Thread(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["title"]),
-            models.Index(fields=["category", "-created_at"]),
+            # ฟีด keyset (created_at, id) เฉพาะกระทู้ที่ยังไม่ถูกลบ: หน้าแรก / รายหมวด / โปรไฟล์ผู้เขียน
+            models.Index(fields=["-created_at", "-id"], condition=LIVE, name="forum_thread_live_idx"),
+            models.Index(fields=["category", "-created_at", "-id"], condition=LIVE, name="forum_thread_cat_live_idx"),
+            models.Index(fields=["author", "-created_at", "-id"], condition=LIVE, name="forum_thread_author_live_idx"),
         ]
         ordering = ["-created_at"]
 
     def __str__(self):
         return self.title
 
-    # -------- tag_list (ชั่วคราว, set/get ได้) --------
+    # -------- tag_list (set/get ได้) --------
     @property
     def tag_list(self):
         """
-        คืนลิสต์แท็กจากแคชชั่วคราว (_tag_list) ถ้ามี
-        ถ้าไม่มีจะพยายามอ่านจากฟิลด์ 'tags' (ถ้ามีใน DB) ไม่งั้นคืน []
-        - จุดประสงค์หลัก: ให้ view ใส่ t.tag_list = [...] ได้โดยไม่ error
+        คืนลิสต์ชื่อแท็กของกระทู้ (ดึงจาก ThreadTag ที่บันทึกไว้ตอน save — ไม่ใช้ regex ตอน render)
+        - ถ้า view ใส่ t.tag_list = [...] ไว้ จะคืนค่านั้น
+        - ควร prefetch_related("thread_tags__tag") เมื่อแสดงหลายกระทู้
         """
         cached = getattr(self, "_tag_list", None)
         if cached is not None:
             return cached
-
-        tags = getattr(self, "tags", "")
-        if isinstance(tags, str) and tags.strip():
-            return [s.strip() for s in tags.split(",") if s.strip()]
-        return []
+        if self.pk is None:
+            return []
+        return [tt.tag.name for tt in self.thread_tags.all()]
 
     @tag_list.setter
     def tag_list(self, value):
@@ -101,9 +148,38 @@ class Comment(models.Model):
     image      = models.ImageField(upload_to=comment_image_upload, blank=True, null=True)
     is_deleted = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # ลำดับที่ในกระทู้ (#1, #2, ...) สำหรับลิงก์ "ไปที่ความเห็น #N" — ค้นด้วย index (thread, number)
+    number     = models.PositiveIntegerField(default=0)
+    image_variants = models.JSONField(default=dict, blank=True)  # ดู forum/images.py
+
+    objects     = LiveManager()
+    all_objects = AllObjectsManager()
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # เพจจิเนชันแบบ seek ในกระทู้: WHERE thread_id = ? AND NOT is_deleted AND (created_at, id) > (?, ?)
+            models.Index(fields=["thread", "created_at", "id"], condition=LIVE, name="forum_comment_live_idx"),
+            models.Index(fields=["thread", "number"], name="forum_comment_number_idx"),
+        ]
+
+    BACKGROUND_FIELDS = ("image_variants",)
+
+    def save(self, *args, **kwargs):
+        # ไฟล์ย่อถูกเขียนจากงานเบื้องหลัง — save() ทั้งแถว (เช่น form.save() ตอนแก้คอมเมนต์) ห้ามเขียน {} เก่าทับ
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.BACKGROUND_FIELDS
+            ]
+        if self._state.adding and not self.number:
+            # แจกเลขถัดไปจาก Thread.comment_seq — UPDATE ล็อกแถวกระทู้ไว้จนจบ transaction
+            with transaction.atomic():
+                Thread.all_objects.filter(pk=self.thread_id).update(comment_seq=models.F("comment_seq") + 1)
+                self.number = Thread.all_objects.filter(pk=self.thread_id).values_list("comment_seq", flat=True)[0]
+                super().save(*args, **kwargs)
+            return
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Comment by {self.author} on {self.thread}"
@@ -117,9 +193,17 @@ class Report(models.Model):
     reason      = models.CharField(max_length=255)
     status      = models.CharField(max_length=10, default="open")  # open|closed
     created_at  = models.DateTimeField(auto_now_add=True)
+    # denormalized ตอนสร้าง (forum/reports.py): กระทู้ของเป้าหมาย + เจ้าของเป้าหมาย
+    # หน้าแอดมินจึงไม่ต้อง subquery หา thread ของคอมเมนต์ทีละแถว
+    thread        = models.ForeignKey("Thread", null=True, blank=True, on_delete=models.CASCADE, related_name="reports")
+    target_author = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
 
     class Meta:
-        indexes = [models.Index(fields=["target_type", "target_id", "status"])]
+        indexes = [
+            models.Index(fields=["target_type", "target_id", "status"]),
+            # รวมรายงานที่เปิดอยู่ตามเป้าหมาย (GROUP BY target) บน index เดียว
+            models.Index(fields=["status", "target_type", "target_id"], name="forum_report_open_idx"),
+        ]
         ordering = ["-created_at"]
 
     def __str__(self):
@@ -128,11 +212,155 @@ class Report(models.Model):
 
 class ThreadLike(models.Model):
     thread = models.ForeignKey('Thread', related_name='likes', on_delete=models.CASCADE)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='thread_likes', on_delete=models.CASCADE)  # ✅ ใช้ settings.AUTH_USER_MODEL
+    # index ของ user อยู่ใน (user, thread) ด้านล่างแล้ว ไม่ต้องมี index เดี่ยวซ้ำ
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='thread_likes', on_delete=models.CASCADE, db_index=False)  # ✅ ใช้ settings.AUTH_USER_MODEL
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('thread', 'user')
+        unique_together = ('thread', 'user')  # (thread, user): "ผู้ใช้นี้ไลก์กระทู้นี้ไหม"
+        indexes = [
+            # กระทู้ที่ผู้ใช้ไลก์ (ติดหัวใจในฟีด) / ลบไลก์ทั้งหมดของผู้ใช้
+            models.Index(fields=["user", "thread"], name="forum_threadlike_user_idx"),
+        ]
 
     def __str__(self):
         return f'{self.user} ♥ {self.thread}'
+
+
+class SearchDocument(models.Model):
+    """
+    เอกสารสำหรับค้นหา (1 แถวต่อกระทู้/คอมเมนต์) — เก็บข้อความที่ตัดคำแล้ว (ดู forum/search.py)
+    ตัวดัชนีจริงอยู่ที่ระดับ DB: FTS5 บน SQLite / GIN(tsvector) บน PostgreSQL (สร้างใน migration)
+    """
+    KIND_CHOICES = (("thread", "Thread"), ("comment", "Comment"))
+    kind   = models.CharField(max_length=10, choices=KIND_CHOICES)
+    obj_id = models.PositiveIntegerField()
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="+")
+    title  = models.TextField(blank=True)
+    body   = models.TextField(blank=True)
+    author = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ("kind", "obj_id")
+
+    def __str__(self):
+        return f"{self.kind}:{self.obj_id}"
+
+
+class Tag(models.Model):
+    """แท็ก (#คำ) ที่ดึงจากหัวข้อ/เนื้อหากระทู้ตอนบันทึก (ดู forum/tags.py)"""
+    name = models.CharField(max_length=64, unique=True)
+    # ตัวนับ denormalized: จำนวนกระทู้ที่ยังไม่ถูกลบที่มีแท็กนี้ (ใช้ทำ tag cloud)
+    thread_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["-thread_count"], name="forum_tag_count_idx")]
+
+    def __str__(self):
+        return self.name
+
+
+class ThreadTag(models.Model):
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="thread_tags")
+    tag    = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="thread_tags")
+    # สำเนา Thread.created_at เพื่อให้หน้า /tags/<name>/ เรียง+ตัดหน้าบน index (tag, เวลา, id) ได้ตรง ๆ
+    thread_created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("thread", "tag")
+        ordering = ["id"]  # ตามลำดับที่แท็กปรากฏในกระทู้
+        indexes = [
+            models.Index(fields=["tag", "-thread_created_at", "-id"], name="forum_threadtag_feed_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.thread_id}#{self.tag_id}"
+
+
+class DailyStat(models.Model):
+    """
+    สถิติรายวัน (rollup) สำหรับแดชบอร์ดแอดมิน — อัปเดตทีละเหตุการณ์จาก signals (ดู forum/rollups.py)
+    category = NULL คือยอดรวมทั้งเว็บ; แถวรายหมวดมีเฉพาะกระทู้/คอมเมนต์/ไลก์
+    """
+    day      = models.DateField()
+    category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    new_users = models.IntegerField(default=0)
+    threads   = models.IntegerField(default=0)   # กระทู้ที่ตั้งวันนั้นและยังไม่ถูกลบ
+    comments  = models.IntegerField(default=0)   # คอมเมนต์ที่ยังไม่ถูกลบ ในกระทู้ที่ยังไม่ถูกลบ
+    likes     = models.IntegerField(default=0)
+    reports   = models.IntegerField(default=0)   # รายงานที่ส่งเข้ามาวันนั้นและยังเปิดอยู่
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "category"], name="forum_dailystat_day_cat_uniq"),
+            models.UniqueConstraint(fields=["day"], condition=models.Q(category__isnull=True),
+                                    name="forum_dailystat_day_site_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category_id or 'all'}"
+
+
+class ModerationJob(models.Model):
+    """
+    งานจัดการเนื้อหาแบบ bulk ที่รันเบื้องหลังทีละก้อน (ดู forum/moderation.py)
+    scope = เงื่อนไขที่เลือก เช่น {"ids": [...]}, {"author_id": 5}, {"category_id": 2, "status": "active"}
+    """
+    TARGET_CHOICES = (("thread", "Thread"), ("comment", "Comment"))
+    ACTION_CHOICES = (("delete", "ลบ"), ("restore", "กู้คืน"), ("purge", "ลบถาวร"), ("move", "ย้ายหมวด"))
+    STATUS_CHOICES = (("queued", "รอคิว"), ("running", "กำลังทำ"), ("done", "เสร็จ"),
+                      ("failed", "ล้มเหลว"), ("cancelled", "ยกเลิก"))
+
+    target    = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    action    = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    scope     = models.JSONField(default=dict, blank=True)
+    category  = models.ForeignKey(Category, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")  # ปลายทางของ move
+    status    = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    total     = models.PositiveIntegerField(default=0)   # ประมาณการตอนสร้างงาน
+    processed = models.PositiveIntegerField(default=0)   # แถวที่ผ่านไปแล้ว
+    affected  = models.PositiveIntegerField(default=0)   # แถวที่เปลี่ยนจริง
+    last_id   = models.PositiveIntegerField(default=0)   # cursor: ทำถึง id นี้แล้ว (ทำต่อได้หลัง worker ตาย)
+    error     = models.TextField(blank=True)
+    created_by  = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at  = models.DateTimeField(auto_now_add=True)
+    started_at  = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at  = models.DateTimeField(auto_now=True)     # heartbeat ต่อก้อน
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"], name="forum_modjob_status_idx")]
+
+    @property
+    def percent(self):
+        if self.status == "done":
+            return 100
+        return min(100, self.processed * 100 // self.total) if self.total else 0
+
+    def __str__(self):
+        return f"{self.action} {self.target} #{self.pk} ({self.status})"
+
+
+class ThreadParticipant(models.Model):
+    """
+    ผู้ใช้ที่เคยตอบกระทู้ (1 แถวต่อ user × thread) นับเฉพาะคอมเมนต์ที่ยังไม่ถูกลบ — ไม่เหลือคอมเมนต์ = ไม่มีแถว
+    ดูแลจาก signals ของ Comment (ดู forum/participants.py) ใช้ทำแท็บ "กระทู้ที่ตอบ" ในโปรไฟล์
+    """
+    user   = models.ForeignKey(User, on_delete=models.CASCADE, related_name="participations", db_index=False)
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="participants")
+    reply_count    = models.PositiveIntegerField(default=0)
+    first_reply_at = models.DateTimeField()
+    last_reply_at  = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "thread"], name="forum_participant_uniq"),
+        ]
+        indexes = [
+            # กระทู้ที่ผู้ใช้ตอบล่าสุด (keyset บน last_reply_at, id) — index เดี่ยวของ user อยู่ในนี้แล้ว
+            models.Index(fields=["user", "-last_reply_at", "-id"], name="forum_participant_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}@{self.thread_id} ×{self.reply_count}"
@@ -0,0 +1,203 @@
+# forum/moderation.py
+"""
+งานจัดการเนื้อหาแบบ bulk (ModerationJob) — ลบ / กู้คืน / ลบถาวร / ย้ายหมวด
+
+- ใช้กับ "ทุกกระทู้ที่ตรงตัวกรอง" หรือ "เนื้อหาทั้งหมดของผู้ใช้" ได้ (สแปมเป็นหมื่นแถว)
+  request แค่สร้างแถวงาน แล้วตอบกลับทันที — ตัวงานรันเบื้องหลัง
+- ทำทีละก้อนเรียงตาม id (CHUNK_SIZE, ลบถาวรใช้ PURGE_CHUNK_SIZE) แต่ละก้อนเป็น transaction สั้น ๆ ของตัวเอง
+  จด cursor (last_id) + ความคืบหน้าหลังทุกก้อน → หน้าแอดมินเห็น % และ worker ที่ตายไปทำต่อได้
+- ตัวนับ / มาแรง / สถิติรายวัน / ดัชนีค้นหา / แคช ถูกแก้ต่อก้อนผ่านเส้นทางเดิม:
+    ลบ-กู้คืน → counters.set_*_deleted, ย้ายหมวด → counters.move_threads, ลบถาวร → delete() (model signals)
+- settings.FORUM_MODERATION_RUNNER = "thread" (ค่าเริ่มต้น — thread pool ของ process หลัง commit)
+  | "sync" (ทำทันทีหลัง commit) | "worker" (รอ python manage.py run_moderation_jobs)
+  ปรับขนาดก้อน/เวลาพักได้ด้วย FORUM_MODERATION_CHUNK / FORUM_MODERATION_PAUSE
+- ยกเลิกได้ระหว่างทาง: worker เช็กสถานะก่อนทุกก้อน (ก้อนที่ทำไปแล้วไม่ย้อนกลับ)
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters, search
+from .models import Comment, ModerationJob, Thread
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+PURGE_CHUNK_SIZE = 100     # ลบจริงยิง signals ต่อแถว (+ CASCADE คอมเมนต์/ไลก์) จึงใช้ก้อนเล็กกว่า
+CHUNK_PAUSE = 0.05         # วินาทีที่พักระหว่างก้อน ให้ request อื่นได้เขียน DB บ้าง
+STALE_AFTER = timedelta(minutes=10)  # running แต่ไม่ขยับนานเท่านี้ = worker ตาย
+
+ACTIONS = {
+    "thread": ("delete", "restore", "purge", "move"),
+    "comment": ("delete", "restore", "purge"),
+}
+ACTIVE = ("queued", "running")
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        # worker เดียว: งานใหญ่สองงานไม่แย่ง DB กันเอง
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="moderation")
+    return _executor
+
+
+# ===================== Scope =====================
+
+def _model(target):
+    return Thread if target == "thread" else Comment
+
+
+def scoped(target, action, scope, category_id=None):
+    """แถวที่งานนี้ยังต้องทำ (กรองแถวที่อยู่ในสถานะปลายทางแล้วออก)"""
+    qs = _model(target).all_objects.all()
+    if "ids" in scope:
+        qs = qs.filter(id__in=scope["ids"])
+    if scope.get("q") and target == "thread":
+        qs = qs.filter(id__in=search.matching_thread_ids(scope["q"]))  # subquery ทั้งหมด ไม่มีเพดาน
+    if scope.get("author_id"):
+        qs = qs.filter(author_id=scope["author_id"])
+    if scope.get("category_id") and target == "thread":
+        qs = qs.filter(category_id=scope["category_id"])
+    if scope.get("status") == "active":
+        qs = qs.filter(is_deleted=False)
+    elif scope.get("status") == "deleted":
+        qs = qs.filter(is_deleted=True)
+
+    if action == "delete":
+        qs = qs.filter(is_deleted=False)
+    elif action == "restore":
+        qs = qs.filter(is_deleted=True)
+    elif action == "move":
+        qs = qs.exclude(category_id=category_id)
+    return qs
+
+
+def apply(target, action, qs, category_id=None) -> int:
+    """ทำ action กับ qs ทันที คืนจำนวนแถวที่เปลี่ยน (ใช้ทั้งก้อนของงานและ bulk เล็ก ๆ ใน request)"""
+    if action in ("delete", "restore"):
+        set_deleted = counters.set_threads_deleted if target == "thread" else counters.set_comments_deleted
+        return set_deleted(qs, action == "delete")
+    if action == "move":
+        return counters.move_threads(qs, category_id)
+    if action == "purge":
+        deleted = qs.delete()[1]
+        return deleted.get(_model(target)._meta.label, 0)
+    raise ValueError(f"unknown action: {action}")
+
+
+# ===================== Enqueue =====================
+
+def enqueue(target, action, scope, category=None, user=None):
+    """สร้างงานแล้วสั่งรันหลัง commit"""
+    if action not in ACTIONS.get(target, ()):
+        raise ValueError(f"{action} ใช้กับ {target} ไม่ได้")
+    if action == "move" and category is None:
+        raise ValueError("move ต้องระบุหมวดปลายทาง")
+    category_id = category.pk if category else None
+    job = ModerationJob.objects.create(
+        target=target, action=action, scope=scope, category=category, created_by=user,
+        total=scoped(target, action, scope, category_id).count(),
+    )
+    schedule(job.pk)
+    return job
+
+
+def schedule(job_id):
+    mode = getattr(settings, "FORUM_MODERATION_RUNNER", "thread")
+    if mode == "worker":
+        return
+
+    def start():
+        if mode == "sync":
+            run(job_id)
+        else:
+            _pool().submit(_run_in_thread, job_id)
+
+    transaction.on_commit(start)
+
+
+def cancel(job_id) -> bool:
+    return bool(ModerationJob.objects.filter(pk=job_id, status__in=ACTIVE).update(status="cancelled"))
+
+
+# ===================== Run =====================
+
+def _claim(job_id, stale=False):
+    """เปลี่ยนเป็น running แบบ atomic — worker สองตัวจะไม่ได้งานเดียวกัน"""
+    now = timezone.now()
+    qs = ModerationJob.objects.filter(pk=job_id)
+    if stale:
+        qs = qs.filter(status="running", updated_at__lt=now - STALE_AFTER)
+    else:
+        qs = qs.filter(status="queued")
+    return bool(qs.update(status="running", started_at=now, updated_at=now))
+
+
+def run_chunk(job) -> int:
+    """ทำก้อนถัดไปของงาน คืนจำนวนแถวในก้อน (0 = หมดแล้ว)"""
+    size = PURGE_CHUNK_SIZE if job.action == "purge" else getattr(settings, "FORUM_MODERATION_CHUNK", CHUNK_SIZE)
+    pending = scoped(job.target, job.action, job.scope, job.category_id)
+    ids = list(pending.filter(id__gt=job.last_id).order_by("id").values_list("id", flat=True)[:size])
+    if not ids:
+        return 0
+    with transaction.atomic():
+        n = apply(job.target, job.action, pending.filter(id__in=ids), job.category_id)
+        ModerationJob.objects.filter(pk=job.pk).update(
+            processed=F("processed") + len(ids), affected=F("affected") + n,
+            last_id=ids[-1], updated_at=timezone.now(),
+        )
+    job.last_id = ids[-1]
+    return len(ids)
+
+
+def run(job_id, stale=False, pause=None):
+    """รันงานจนจบ/ถูกยกเลิก (เรียกจาก thread pool หรือ management command)"""
+    if not _claim(job_id, stale=stale):
+        return None
+    job = ModerationJob.objects.get(pk=job_id)
+    if job.action == "move" and job.category_id is None:
+        return _finish(job_id, "failed", "หมวดปลายทางถูกลบไปแล้ว")
+    pause = getattr(settings, "FORUM_MODERATION_PAUSE", CHUNK_PAUSE) if pause is None else pause
+    try:
+        while run_chunk(job):
+            if ModerationJob.objects.filter(pk=job_id, status="cancelled").exists():
+                return "cancelled"
+            if pause:
+                time.sleep(pause)
+    except Exception as exc:
+        log.exception("งาน moderation #%s ล้มเหลว", job_id)
+        return _finish(job_id, "failed", str(exc))
+    return _finish(job_id, "done")
+
+
+def _finish(job_id, status, error=""):
+    ModerationJob.objects.filter(pk=job_id, status="running").update(
+        status=status, error=error, finished_at=timezone.now())
+    return status
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run(job_id)
+    finally:
+        close_old_connections()
+
+
+def runnable_ids(resume_stale=True):
+    """id ของงานที่รอคิว (+ งานที่ค้าง running เพราะ worker ตาย) เรียงตามเวลาสร้าง"""
+    queued = list(ModerationJob.objects.filter(status="queued").order_by("created_at").values_list("id", flat=True))
+    stale = []
+    if resume_stale:
+        stale = list(ModerationJob.objects.filter(status="running", updated_at__lt=timezone.now() - STALE_AFTER)
+                     .order_by("created_at").values_list("id", flat=True))
+    return [(pk, True) for pk in stale] + [(pk, False) for pk in queued]
@@ -0,0 +1,115 @@
+# forum/pagecache.py
+"""
+แคชทั้งหน้าสำหรับผู้ใช้ที่ไม่ได้ล็อกอิน (home, thread_detail, fragment คอมเมนต์)
+
+- key = path + query string เฉพาะพารามิเตอร์ที่มีผลกับหน้า (q/cat/page/cursor)
+- ผูกกับ dependency tag ของ forum/cachetags.py (all, category:<id>, thread:<id>, catinfo:<id>, card:<id>)
+  ถูก invalidate จาก forum/signals.py เมื่อมีการเขียน — หน้าเดิมไม่มีใครอ่านอีกและหมดอายุไปเอง
+- hit = cache.get_many ครั้งเดียว (หน้า + เวอร์ชันของ tag) — ไม่แตะ DB เลย
+- ผู้ใช้ที่ล็อกอิน / มีข้อความ flash ค้าง → ข้ามแคช; หน้าที่แคชตอบพร้อม Vary: Cookie
+- ครอบ async view ได้ด้วย (wrapper เป็น async ตาม view — hit ไม่ออกจาก event loop)
+"""
+import hashlib
+import inspect
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.http import urlencode
+
+from . import cachetags
+from .aio import auser
+
+PAGE_CACHE_TIMEOUT = 300
+
+
+def _maybe_cacheable(request):
+    """None = ต้องดูว่าล็อกอินอยู่ไหม"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if "messages" in request.COOKIES:
+        return False
+    # ไม่มี session cookie = ไม่ได้ล็อกอินแน่ ๆ (ไม่ต้องโหลด session/user)
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return None
+    return True
+
+
+def _cacheable(request):
+    ok = _maybe_cacheable(request)
+    return not request.user.is_authenticated if ok is None else ok
+
+
+async def _acacheable(request):
+    ok = _maybe_cacheable(request)
+    if ok is None:
+        return not (await auser(request)).is_authenticated
+    return ok
+
+
+def _key(request, params):
+    query = urlencode([(p, request.GET.get(p, "")) for p in params])
+    return hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+
+
+def _bypass(response):
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def _hit(found):
+    response = found.value
+    response["X-Page-Cache"] = "hit"
+    return response
+
+
+def _storable(response):
+    if response.status_code != 200 or response.cookies or getattr(response, "streaming", False):
+        return False
+    if hasattr(response, "render") and callable(response.render):
+        response.render()
+    patch_vary_headers(response, ("Cookie",))
+    response["X-Page-Cache"] = "miss"  # ค่าที่เก็บลงแคชด้วย — ตอน hit ถูกเขียนทับเป็น "hit"
+    return True
+
+
+def anonymous_page_cache(params=(), depends_on=lambda request, **kw: [cachetags.ALL], timeout=PAGE_CACHE_TIMEOUT):
+    """
+    params: ชื่อ GET parameter ที่มีผลกับหน้า (ที่เหลือไม่ใช้ทำ key)
+    depends_on(request, **view_kwargs) → dependency tag ที่หน้านี้ขึ้นกับ
+      (async view ส่ง async function ได้ — ใช้เมื่อต้องอ่าน cache/DB เพื่อรู้ tag)
+    """
+    def decorator(view):
+        family = f"page:{view.__name__}"
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                if not await _acacheable(request):
+                    return _bypass(await view(request, *args, **kwargs))
+                tags = depends_on(request, **kwargs)
+                if inspect.isawaitable(tags):
+                    tags = await tags
+                found = await cachetags.alookup(family, _key(request, params), tags)
+                if found.hit:
+                    return _hit(found)
+                response = await view(request, *args, **kwargs)
+                if _storable(response):
+                    await found.astore(response, timeout)
+                return response
+            return markcoroutinefunction(wrapped)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _cacheable(request):
+                return _bypass(view(request, *args, **kwargs))
+            found = cachetags.lookup(family, _key(request, params), depends_on(request, **kwargs))
+            if found.hit:
+                return _hit(found)
+            response = view(request, *args, **kwargs)
+            if _storable(response):
+                found.store(response, timeout)
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,143 @@
+# forum/pagination.py
+"""
+Keyset (cursor) pagination บนคู่ (เวลา, id)
+
+- ไม่มี COUNT(*) และไม่มี OFFSET: ทุกหน้าใช้ WHERE (t, id) < (cursor) ORDER BY t DESC, id DESC LIMIT n+1
+  หน้าลึกแค่ไหนก็ต้นทุนเท่าหน้าแรก (ถ้ามี index บนคอลัมน์เวลา)
+- cursor เป็น token ทึบ (base64) ของ ทิศทาง|เวลา|id — token เสีย/ถูกแก้ → กลับไปหน้าแรก
+  ทิศทาง: n = หน้าถัดไป, p = หน้าก่อน, a = เริ่มที่แถวนี้ (permalink)
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(direction, value, pk):
+    raw = f"{direction}|{value.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """คืน (direction, datetime, pk) หรือ None ถ้า token ใช้ไม่ได้"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        direction, value, pk = raw.split("|")
+        if direction not in ("n", "p", "a"):
+            return None
+        return direction, datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """หน้าหนึ่งของผลลัพธ์ — ใช้ใน template แบบเดียวกับ list (for/len) + ลิงก์ next/prev"""
+
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return True
+
+
+def _seek(qs, cursor, field, descending):
+    """(ทิศทาง, queryset ของหน้านี้ที่ order แล้ว) — ยังไม่ slice/ยิง query"""
+    decoded = decode_cursor(cursor)
+    direction = decoded[0] if decoded else None
+
+    # "ถัดไป" = ไปทางท้ายฟีด: ถ้าเรียงมาก→น้อย คือค่าที่น้อยกว่า
+    ahead, behind = ("lt", "gt") if descending else ("gt", "lt")
+    forward = [f"-{field}", "-id"] if descending else [field, "id"]
+    backward = [field, "id"] if descending else [f"-{field}", "-id"]
+
+    if direction in ("n", "a"):
+        _, value, pk = decoded
+        op = ahead if direction == "n" else f"{ahead}e"  # "a" = เริ่มที่แถวนี้ (รวมตัวมันเอง)
+        qs_page = qs.filter(Q(**{f"{field}__{ahead}": value}) | Q(**{field: value, f"id__{op}": pk}))
+        qs_page = qs_page.order_by(*forward)
+    elif direction == "p":
+        _, value, pk = decoded
+        qs_page = qs.filter(Q(**{f"{field}__{behind}": value}) | Q(**{field: value, f"id__{behind}": pk}))
+        qs_page = qs_page.order_by(*backward)
+    else:
+        qs_page = qs.order_by(*forward)
+    return direction, qs_page
+
+
+def _trim(rows, per_page, direction):
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == "p":
+        rows.reverse()
+    return rows, has_more
+
+
+def _before(qs, first, field, descending):
+    """แถวที่อยู่ก่อน first (ใช้ตอนกระโดดมากลางฟีด: .exists() บน index เดียวกัน)"""
+    behind = "gt" if descending else "lt"
+    value = getattr(first, field)
+    return qs.filter(Q(**{f"{field}__{behind}": value}) | Q(**{field: value, f"id__{behind}": first.pk}))
+
+
+def _page(rows, direction, has_more, has_prev, field):
+    if not rows:
+        return KeysetPage(rows)
+    first, last = rows[0], rows[-1]
+    # มาจากลิงก์ "ถัดไป" แปลว่ามีหน้าก่อนหน้าแน่ ๆ และกลับกัน
+    has_next = has_more if direction != "p" else True
+    if direction == "p":
+        has_prev = has_more
+    elif direction != "a":
+        has_prev = direction == "n"
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor("n", getattr(last, field), last.pk) if has_next else None,
+        prev_cursor=encode_cursor("p", getattr(first, field), first.pk) if has_prev else None,
+    )
+
+
+def keyset_page(qs, cursor=None, per_page=10, field="created_at", descending=True):
+    """
+    ตัดหน้าจาก qs (ยังไม่ order/slice) เรียงตาม (field, id)
+    - descending=True: ใหม่สุดก่อน (ฟีด), False: เก่าสุดก่อน (คอมเมนต์ในกระทู้)
+    cursor: token จาก page.next_cursor / page.prev_cursor / at_cursor()
+    """
+    direction, qs_page = _seek(qs, cursor, field, descending)
+    rows, has_more = _trim(list(qs_page[:per_page + 1]), per_page, direction)
+    has_prev = None
+    if rows and direction == "a":
+        has_prev = _before(qs, rows[0], field, descending).exists()
+    return _page(rows, direction, has_more, has_prev, field)
+
+
+async def akeyset_page(qs, cursor=None, per_page=10, field="created_at", descending=True):
+    """keyset_page สำหรับ async view (async ORM) — ผลลัพธ์เหมือนกันทุกประการ"""
+    direction, qs_page = _seek(qs, cursor, field, descending)
+    rows, has_more = _trim([r async for r in qs_page[:per_page + 1]], per_page, direction)
+    has_prev = None
+    if rows and direction == "a":
+        has_prev = await _before(qs, rows[0], field, descending).aexists()
+    return _page(rows, direction, has_more, has_prev, field)
+
+
+def at_cursor(obj, field="created_at"):
+    """cursor ที่หน้าเริ่มต้นที่ obj พอดี (ใช้ทำลิงก์กระโดดไปยังแถวนั้น)"""
+    return encode_cursor("a", getattr(obj, field), obj.pk)
@@ -0,0 +1,102 @@
+# forum/participants.py
+"""
+ตารางผู้ตอบกระทู้ (ThreadParticipant) + ตัวนับของหน้าโปรไฟล์
+
+- คอมเมนต์ใหม่ → บวกแถว (user, thread) ด้วย UPDATE ... F() (สร้างแถวเมื่อยังไม่มี)
+- ลบ/กู้คืน/ลบจริง → sync() คำนวณแถวนั้นใหม่จากคอมเมนต์ของคู่ (user, thread) เดียว
+  (first/last ที่ถูกลบไปต้องหาค่าใหม่อยู่แล้ว — query เดียวบน index (thread, created_at, id))
+- แท็บ "กระทู้ที่ตอบ" = เดินบน index (user, -last_reply_at, -id) แทน JOIN comments + DISTINCT
+- จำนวนกระทู้ที่ตั้ง/ที่ตอบ แคชผ่าน cachetags ผูกกับ tag user:<id> (เขียนกระทู้/คอมเมนต์ → ล้างเอง)
+  กระทู้ของคนอื่นถูกลบ → ยอด "ที่ตอบ" ช้าได้ไม่เกิน COUNTS_TIMEOUT
+- ข้อมูลเพี้ยน → python manage.py rebuild_participants
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import Greatest, Least
+
+from . import cachetags
+from .models import Comment, Thread, ThreadParticipant
+
+COUNTS_TIMEOUT = 300
+
+
+# ===================== Write =====================
+
+def added(comment):
+    """คอมเมนต์ที่ยังไม่ถูกลบเพิ่งถูกสร้าง"""
+    at = comment.created_at
+    qs = ThreadParticipant.objects.filter(user_id=comment.author_id, thread_id=comment.thread_id)
+    bump = {
+        "reply_count": F("reply_count") + 1,
+        "first_reply_at": Least(F("first_reply_at"), at),
+        "last_reply_at": Greatest(F("last_reply_at"), at),
+    }
+    if qs.update(**bump):
+        return
+    try:
+        with transaction.atomic():
+            ThreadParticipant.objects.create(user_id=comment.author_id, thread_id=comment.thread_id,
+                                             reply_count=1, first_reply_at=at, last_reply_at=at)
+    except IntegrityError:
+        qs.update(**bump)  # มีคนสร้างแถวตัดหน้า
+
+
+def sync(pairs):
+    """คำนวณแถวของคู่ (user_id, thread_id) ใหม่จากคอมเมนต์จริง"""
+    for user_id, thread_id in set(pairs):
+        row = Comment.objects.filter(thread_id=thread_id, author_id=user_id).aggregate(
+            n=Count("id"), first=Min("created_at"), last=Max("created_at"))
+        qs = ThreadParticipant.objects.filter(user_id=user_id, thread_id=thread_id)
+        if not row["n"]:
+            qs.delete()
+        elif not qs.update(reply_count=row["n"], first_reply_at=row["first"], last_reply_at=row["last"]):
+            ThreadParticipant.objects.create(user_id=user_id, thread_id=thread_id, reply_count=row["n"],
+                                             first_reply_at=row["first"], last_reply_at=row["last"])
+
+
+def rebuild() -> int:
+    """สร้างตารางใหม่ทั้งหมดจากคอมเมนต์ คืนจำนวนแถว"""
+    rows = (
+        Comment.objects.order_by()
+        .values_list("author_id", "thread_id")
+        .annotate(n=Count("id"), first=Min("created_at"), last=Max("created_at"))
+    )
+    with transaction.atomic():
+        ThreadParticipant.objects.all().delete()
+        created = ThreadParticipant.objects.bulk_create(
+            [ThreadParticipant(user_id=u, thread_id=t, reply_count=n, first_reply_at=first, last_reply_at=last)
+             for u, t, n, first, last in rows.iterator()],
+            batch_size=500,
+        )
+    return len(created)
+
+
+# ===================== Read =====================
+
+def replied(user):
+    """แถวผู้ตอบของ user ในกระทู้ที่ยังไม่ถูกลบ (ส่งต่อให้ keyset_page(field="last_reply_at"))"""
+    return (
+        ThreadParticipant.objects
+        .filter(user=user, thread__is_deleted=False)
+        .select_related("thread__author__profile", "thread__category")
+    )
+
+
+def threads_of(rows):
+    """กระทู้ของแถวผู้ตอบ พร้อมจำนวน/เวลาที่ผู้ใช้ตอบล่าสุด (t.my_reply_count, t.my_last_reply_at)"""
+    threads = []
+    for p in rows:
+        p.thread.my_reply_count = p.reply_count
+        p.thread.my_last_reply_at = p.last_reply_at
+        threads.append(p.thread)
+    return threads
+
+
+def profile_counts(user):
+    """(จำนวนกระทู้ที่ตั้ง, จำนวนกระทู้ที่ตอบ) — นับบน index ของผู้ใช้ แล้วแคชไว้"""
+    def compute():
+        return (
+            Thread.objects.filter(author=user).count(),
+            ThreadParticipant.objects.filter(user=user, thread__is_deleted=False).count(),
+        )
+    return cachetags.get_or_set("profile", f"counts:{user.pk}", compute, [cachetags.user(user.pk)], COUNTS_TIMEOUT)
@@ -0,0 +1,220 @@
+# forum/pubsub.py
+"""
+Pub/sub สำหรับ push เหตุการณ์สด (SSE) — publish จากโค้ด sync, subscribe จาก async view
+
+- Hub ใน process: channel → ผู้ฟัง (Subscriber) แต่ละตัวมีคิวจำกัดขนาดของตัวเอง
+  publish จาก thread ไหนก็ได้ (signals / on_commit) → ส่งเข้า event loop ของผู้ฟังด้วย call_soon_threadsafe
+- backend ตาม settings.FORUM_PUBSUB_BACKEND = "redis" | "local"
+  ไม่ตั้ง → ใช้ redis ถ้า CACHES["default"] เป็น django_redis, ไม่งั้น local (แบบเดียวกับ forum/zset.py)
+    local: publish ส่งเข้า Hub ตรง ๆ (process เดียว — เทสต์/dev)
+    redis: publish = PUBLISH forum:live:<channel>, ทุก worker มี task เดียว PSUBSCRIBE แล้วกระจายเข้า Hub ของตัวเอง
+           (1 connection Redis ต่อ worker ไม่ใช่ต่อผู้ชม)
+- จำกัดจำนวนผู้ฟัง: ทั้ง process (FORUM_LIVE_MAX_CONNECTIONS) และต่อผู้ใช้/IP (FORUM_LIVE_MAX_PER_CLIENT) → Full
+- backpressure: ผู้ฟังที่อ่านไม่ทัน (ไคลเอนต์ช้า — yield ของ stream ค้างรอเครือข่าย)
+    เหตุการณ์ที่ "ค่าล่าสุดพอ" (coalesce key เดียวกัน เช่นยอดไลก์) ทับค่าเดิมในคิว ไม่กินที่เพิ่ม
+    คิวเต็ม → ทิ้งของค้างทั้งหมดแล้วส่ง {"type": "resync"} ครั้งเดียว ให้ไคลเอนต์โหลดสถานะใหม่เอง
+    publisher ไม่เคยรอผู้ฟัง
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+KEY_PREFIX = "forum:live:"
+MAX_CONNECTIONS = 500      # ต่อ process
+MAX_PER_CLIENT = 4         # แท็บพร้อมกันต่อผู้ใช้/IP
+QUEUE_SIZE = 100           # เหตุการณ์ค้างต่อผู้ฟัง
+
+
+class Full(Exception):
+    """ผู้ฟังเต็มโควตา (ทั้ง process หรือของไคลเอนต์นี้)"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ===================== Subscriber =====================
+
+class Subscriber:
+    """ผู้ฟังหนึ่งคน — ใช้จาก event loop ที่สร้างมันเท่านั้น (offer ถูกเรียกผ่าน call_soon_threadsafe)"""
+
+    def __init__(self, hub, channel, client, loop, maxsize):
+        self.hub, self.channel, self.client = hub, channel, client
+        self.loop = loop
+        self.maxsize = maxsize
+        self._pending = OrderedDict()   # key → event (coalesce ได้ด้วย key เดียวกัน)
+        self._seq = 0
+        self._lagged = False
+        self._wake = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, event):
+        key = event.get("coalesce")
+        if key is None:
+            self._seq += 1
+            key = self._seq
+        elif key in self._pending:
+            self._pending[key] = event  # ค่าใหม่แทนค่าเก่า ตำแหน่งเดิม
+            self._wake.set()
+            return
+        if len(self._pending) >= self.maxsize:
+            self.dropped += len(self._pending)
+            self._pending.clear()
+            self._lagged = True
+        else:
+            self._pending[key] = event
+        self._wake.set()
+
+    async def next(self, timeout):
+        """เหตุการณ์ที่ค้างทั้งหมด ([] = ครบ timeout ไม่มีอะไรใหม่)"""
+        if not self._pending and not self._lagged:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._wake.clear()
+        out = [{"type": "resync"}] if self._lagged else []
+        out += self._pending.values()
+        self._pending = OrderedDict()
+        self._lagged = False
+        return out
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+# ===================== Hub =====================
+
+class Hub:
+    def __init__(self):
+        self._channels = {}
+        self._per_client = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, client="-"):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._total >= _setting("FORUM_LIVE_MAX_CONNECTIONS", MAX_CONNECTIONS):
+                raise Full("process")
+            if self._per_client.get(client, 0) >= _setting("FORUM_LIVE_MAX_PER_CLIENT", MAX_PER_CLIENT):
+                raise Full("client")
+            sub = Subscriber(self, channel, client, loop, _setting("FORUM_LIVE_QUEUE", QUEUE_SIZE))
+            self._channels.setdefault(channel, set()).add(sub)
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+            self._total += 1
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._channels.get(sub.channel)
+            if not subs or sub not in subs:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._channels[sub.channel]
+            left = self._per_client[sub.client] - 1
+            if left:
+                self._per_client[sub.client] = left
+            else:
+                del self._per_client[sub.client]
+            self._total -= 1
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subs = list(self._channels.get(channel, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                self.unsubscribe(sub)  # loop ปิดไปแล้ว
+
+    def stats(self):
+        with self._lock:
+            return {"connections": self._total, "channels": len(self._channels)}
+
+
+hub = Hub()
+
+
+# ===================== Backends =====================
+
+def backend_name():
+    name = getattr(settings, "FORUM_PUBSUB_BACKEND", None)
+    if name:
+        return name
+    cache_backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    return "redis" if cache_backend.startswith("django_redis") else "local"
+
+
+def publish(channel, event):
+    """ส่ง event (dict ที่ json ได้) ให้ผู้ฟัง channel ทุก worker — ไม่รอ ไม่ throw"""
+    if backend_name() != "redis":
+        hub.deliver(channel, event)
+        return
+    try:
+        from django_redis import get_redis_connection
+        get_redis_connection("default").publish(KEY_PREFIX + channel, json.dumps(event))
+    except Exception:
+        log.warning("publish %s ไม่สำเร็จ", channel, exc_info=True)
+
+
+# relay Redis → Hub: task เดียวต่อ event loop (uvicorn worker ละ 1 loop)
+_relays = {}
+
+
+def _redis_url():
+    url = getattr(settings, "FORUM_PUBSUB_REDIS_URL", None)
+    if url:
+        return url
+    location = settings.CACHES["default"]["LOCATION"]
+    return location[0] if isinstance(location, (list, tuple)) else location
+
+
+async def _relay():
+    import redis.asyncio as aioredis
+    while True:
+        client = aioredis.from_url(_redis_url())
+        try:
+            async with client.pubsub() as ps:
+                await ps.psubscribe(KEY_PREFIX + "*")
+                async for message in ps.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    channel = message["channel"].decode()[len(KEY_PREFIX):]
+                    hub.deliver(channel, json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.warning("relay pub/sub หลุด จะต่อใหม่", exc_info=True)
+            await asyncio.sleep(1)
+        finally:
+            await client.aclose()
+
+
+def ensure_relay():
+    """เรียกจาก async view ก่อน subscribe (backend redis เท่านั้น)"""
+    if backend_name() != "redis":
+        return
+    loop = asyncio.get_running_loop()
+    task = _relays.get(loop)
+    if task is None or task.done():
+        _relays[loop] = loop.create_task(_relay())
+
+
+def reset_local():
+    """ล้าง Hub (ใช้ในเทสต์)"""
+    global hub
+    hub = Hub()
@@ -0,0 +1,170 @@
+# forum/ratelimit.py
+"""
+จำกัดอัตรา request ต่อ view (แทน django-ratelimit ที่ติดตั้งไม่ได้บน Python 3.13)
+
+- sliding window แบบสองช่อง: นับช่องปัจจุบันด้วย incr (atomic) แล้วถ่วงน้ำหนักช่องก่อนหน้า
+    ประมาณการ = ก่อนหน้า × (เวลาที่เหลือของช่องก่อน / ช่วง) + ปัจจุบัน
+  ใช้หน่วยความจำ 2 key ต่อ (view, ผู้ใช้) และ 2 round trip ต่อ request ที่ถูกนับ
+- backend ตาม settings.FORUM_RATELIMIT_BACKEND = "cache" (ค่าเริ่มต้น — แชร์ทุก worker) | "local" (ใน process)
+- key: "ip" | "user" | "user_or_ip" (ผู้ใช้ที่ล็อกอินนับตาม id, ไม่ล็อกอินนับตาม IP)
+- ปรับ rate ราย view ได้ใน settings.FORUM_RATELIMITS = {"forum.thread_create": "5/m"}
+  ปิดทั้งระบบด้วย FORUM_RATELIMIT_ENABLED = False
+- เกิน → 429 พร้อม Retry-After (block=False: ไม่บล็อก แค่ตั้ง request.limited = True)
+- ครอบ async view ได้ (ตัวนับรันใน sync_to_async — อ่าน request.user ได้โดยไม่ชน async context)
+"""
+import math
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+from . import metrics
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """"10/m" → (10, 60), "100/5m" → (100, 300)"""
+    count, _, period = rate.partition("/")
+    unit = period[-1]
+    multiplier = int(period[:-1] or 1)
+    return int(count), multiplier * PERIODS[unit]
+
+
+# ===================== Backends =====================
+
+class CacheCounters:
+    def incr(self, key, ttl):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, ttl):
+                return 1
+            return cache.incr(key)  # มีคน add ตัดหน้าไปแล้ว
+
+    def get(self, key):
+        return cache.get(key) or 0
+
+
+class LocalCounters:
+    """ตัวนับใน process (เทสต์/dev) — key หมดอายุตาม ttl"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._data.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + ttl
+            self._data[key] = (value + 1, expires)
+            if len(self._data) > 10000:
+                self._data = {k: v for k, v in self._data.items() if v[1] > now}
+            return value + 1
+
+    def get(self, key):
+        value, expires = self._data.get(key, (0, 0))
+        return value if expires > time.monotonic() else 0
+
+
+_local = LocalCounters()
+
+
+def _counters():
+    if getattr(settings, "FORUM_RATELIMIT_BACKEND", "cache") == "local":
+        return _local
+    return CacheCounters()
+
+
+# ===================== Check =====================
+
+def client_ip(request):
+    return request.META.get("REMOTE_ADDR") or "-"
+
+
+def _identity(request, key):
+    if key in ("user", "user_or_ip"):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"u{user.pk}"
+    return f"ip{client_ip(request)}"
+
+
+def hit(group, identity, rate, now=None):
+    """นับ 1 ครั้ง คืน (ถูกจำกัดไหม, วินาทีที่ควรรอ)"""
+    limit, period = parse_rate(rate)
+    now = time.time() if now is None else now
+    window, offset = divmod(now, period)
+    window = int(window)
+    counters = _counters()
+    base = f"rl:{group}:{identity}:"
+    current = counters.incr(f"{base}{window}", period * 2)
+    previous = counters.get(f"{base}{window - 1}")
+    estimate = previous * (1 - offset / period) + current
+    if estimate <= limit:
+        return False, 0
+    return True, max(1, math.ceil(period - offset))
+
+
+def _too_many(request, retry_after):
+    if "application/json" in request.headers.get("accept", ""):
+        response = JsonResponse({"error": "rate_limited", "retry_after": retry_after}, status=429)
+    else:
+        response = HttpResponse("ส่งคำขอถี่เกินไป กรุณารอสักครู่แล้วลองใหม่", status=429,
+                                content_type="text/plain; charset=utf-8")
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def ratelimit(key="ip", rate="10/m", method=None, block=True, group=None):
+    """
+    decorator ของ view — ใช้แบบเดียวกับ django-ratelimit
+    method: list ของ HTTP method ที่นับ (None = ทุก method)
+    """
+    methods = {m.upper() for m in method} if method else None
+
+    def decorator(view):
+        name = group or f"{view.__module__.rsplit('.', 1)[0]}.{view.__name__}"
+
+        def check(request):
+            """None = ผ่าน, ไม่งั้นคือ response 429"""
+            request.limited = False
+            if not getattr(settings, "FORUM_RATELIMIT_ENABLED", True):
+                return None
+            if methods is not None and request.method not in methods:
+                return None
+            view_rate = getattr(settings, "FORUM_RATELIMITS", {}).get(name, rate)
+            limited, retry_after = hit(name, _identity(request, key), view_rate)
+            if limited:
+                request.limited = True
+                if block:
+                    metrics.inc("forum_ratelimit_rejections_total", group=name)
+                    return _too_many(request, retry_after)
+            return None
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                if methods is not None and request.method not in methods:
+                    request.limited = False
+                    return await view(request, *args, **kwargs)
+                blocked = await sync_to_async(check)(request)
+                if blocked is not None:
+                    return blocked
+                return await view(request, *args, **kwargs)
+            return markcoroutinefunction(wrapped)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            blocked = check(request)
+            if blocked is not None:
+                return blocked
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,90 @@
+# forum/reports.py
+"""
+รายงานเนื้อหา: เก็บเป้าหมายแบบ denormalized + รวมรายงานตามเป้าหมายสำหรับหน้าแอดมิน
+
+- ตอนส่งรายงาน: จด thread (ของกระทู้/คอมเมนต์นั้น) และเจ้าของเป้าหมายลงแถวเลย
+- หน้าแอดมินเห็น 1 แถวต่อเป้าหมาย: จำนวนรายงานที่เปิดอยู่, ผู้รายงานไม่ซ้ำ, ครั้งแรก/ล่าสุด
+  เรียงตามความรุนแรง (ผู้รายงานไม่ซ้ำ → จำนวนรายงาน → ล่าสุด)
+- ปิดรายงานทั้งหมดของเป้าหมายด้วย UPDATE เดียว (status = closed) — ประวัติยังอยู่
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+
+from . import rollups
+from .models import Comment, Report, Thread
+
+OPEN, CLOSED = "open", "closed"
+
+
+def resolve_target(target_type, target_id):
+    """(thread_id, author_id) ของเป้าหมาย หรือ None ถ้าไม่มีอยู่จริง"""
+    if target_type == "thread":
+        return Thread.objects.filter(pk=target_id).values_list("id", "author_id").first()
+    if target_type == "comment":
+        return Comment.objects.filter(pk=target_id).values_list("thread_id", "author_id").first()
+    return None
+
+
+def fill_target(report):
+    """เติม thread / target_author ให้รายงานที่ยังไม่บันทึก คืน False ถ้าเป้าหมายไม่มีอยู่"""
+    found = resolve_target(report.target_type, report.target_id)
+    if found is None:
+        return False
+    report.thread_id, report.target_author_id = found
+    return True
+
+
+# ===================== Admin queue =====================
+
+def open_targets(q=""):
+    """รายงานที่เปิดอยู่ รวมเป็น 1 แถวต่อเป้าหมาย (values() พร้อมตัวเลขสรุป)"""
+    qs = Report.objects.filter(status=OPEN)
+    if q:
+        cond = Q(reason__icontains=q) | Q(reporter__username__icontains=q) | Q(target_type=q)
+        if q.isdigit():
+            cond |= Q(target_id=int(q)) | Q(thread_id=int(q))
+        qs = qs.filter(cond)
+    return (
+        qs.order_by()
+        .values("target_type", "target_id", "thread_id", "target_author__username")
+        .annotate(
+            open_count=Count("id"),
+            reporters=Count("reporter", distinct=True),
+            first_at=Min("created_at"),
+            last_at=Max("created_at"),
+        )
+        .order_by("-reporters", "-open_count", "-last_at")
+    )
+
+
+def attach_reasons(rows, per_target=3):
+    """เหตุผลล่าสุดของแต่ละเป้าหมายในหน้านั้น (query เดียว) → row["reasons"]"""
+    rows = list(rows)
+    if not rows:
+        return rows
+    cond = Q()
+    for r in rows:
+        cond |= Q(target_type=r["target_type"], target_id=r["target_id"])
+    reasons = {}
+    for tt, tid, reason in (Report.objects.filter(cond, status=OPEN)
+                            .order_by("-created_at").values_list("target_type", "target_id", "reason")):
+        bucket = reasons.setdefault((tt, tid), [])
+        if len(bucket) < per_target and reason not in bucket:
+            bucket.append(reason)
+    for r in rows:
+        r["reasons"] = reasons.get((r["target_type"], r["target_id"]), [])
+    return rows
+
+
+def close_target(target_type, target_id):
+    """ปิดรายงานที่เปิดอยู่ทั้งหมดของเป้าหมาย คืนจำนวนที่ปิด"""
+    qs = Report.objects.filter(status=OPEN, target_type=target_type, target_id=target_id)
+    with transaction.atomic():
+        # ยอดรายงานค้างใน rollup นับตามวันที่ส่ง (UPDATE ไม่ผ่าน signals)
+        per_day = list(qs.annotate(day=TruncDate("created_at")).order_by()
+                       .values_list("day").annotate(n=Count("id")))
+        n = qs.update(status=CLOSED)
+        for day, k in per_day:
+            rollups.record_day(day, reports=-k)
+    return n
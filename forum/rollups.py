@@ -0,0 +1,167 @@
+# forum/rollups.py
+"""
+สถิติรายวัน (DailyStat) สำหรับแดชบอร์ด — ไม่ต้อง COUNT ตารางใหญ่ทุกครั้งที่เปิดหน้า
+
+- นับตามวันที่ของตัวเหตุการณ์เอง (created_at / date_joined ตาม TIME_ZONE)
+  ลบ/กู้คืน/ย้ายหมวดภายหลัง → ถอน/คืนยอดที่วันเดิม ยอดรวมจึงตรงกับของที่ยังมองเห็นจริง
+- แถว category = NULL คือทั้งเว็บ, แถวรายหมวดมีเฉพาะ threads/comments/likes
+- reports = รายงานที่ยังเปิดอยู่ (ปิด/ลบรายงาน → ถอนยอด) ผลรวมจึงเป็นขนาดคิวรายงาน
+- อัปเดตทีละเหตุการณ์จาก forum/signals.py ด้วย UPDATE ... SET f = f + n (สร้างแถวเมื่อยังไม่มี)
+- แดชบอร์ดอ่านผลรวมจาก rollup: ต้นทุนตามจำนวนวันในช่วงที่ดู ไม่ตามจำนวนกระทู้/คอมเมนต์
+- ข้อมูลเก่า/เพี้ยน → python manage.py rebuild_stats
+"""
+import threading
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Comment, DailyStat, Report, Thread, ThreadLike
+
+FIELDS = ("new_users", "threads", "comments", "likes", "reports")
+CATEGORY_FIELDS = ("threads", "comments", "likes")
+
+
+def _day(when):
+    return timezone.localdate(when)
+
+
+def _bump_row(day, category_id, deltas):
+    deltas = {f: n for f, n in deltas.items() if n}
+    if not deltas:
+        return
+    qs = DailyStat.objects.filter(day=day, category_id=category_id)
+    if qs.update(**{f: F(f) + n for f, n in deltas.items()}):
+        return
+    try:
+        with transaction.atomic():
+            DailyStat.objects.create(day=day, category_id=category_id, **deltas)
+    except IntegrityError:
+        qs.update(**{f: F(f) + n for f, n in deltas.items()})  # มีคนสร้างแถวตัดหน้า
+
+
+def record(when, category_id=None, site=True, **deltas):
+    """บวก/ลบยอดของวันที่ when: record(t.created_at, t.category_id, threads=1)"""
+    record_day(_day(when), category_id, site, **deltas)
+
+
+def record_day(day, category_id=None, site=True, **deltas):
+    if site:
+        _bump_row(day, None, deltas)
+    if category_id:
+        _bump_row(day, category_id, {f: n for f, n in deltas.items() if f in CATEGORY_FIELDS})
+
+
+# ===================== Thread (ตัวกระทู้ + คอมเมนต์ที่อยู่ในนั้น) =====================
+
+def _thread_contribution(thread, category_id, sign, site):
+    record(thread.created_at, category_id, site=site, threads=sign)
+    per_day = (
+        Comment.objects.filter(thread_id=thread.pk)
+        .annotate(day=TruncDate("created_at")).order_by()
+        .values_list("day").annotate(n=Count("id"))
+    )
+    for day, n in per_day:
+        if site:
+            _bump_row(day, None, {"comments": sign * n})
+        if category_id:
+            _bump_row(day, category_id, {"comments": sign * n})
+
+
+def thread_changed(thread, was_live, old_category_id, is_live, new_category_id):
+    """ลบ/กู้คืน/ย้ายหมวด — ย้ายยอดของกระทู้และคอมเมนต์ในกระทู้ตามวันเดิม"""
+    if was_live and is_live:
+        if old_category_id != new_category_id:
+            _thread_contribution(thread, old_category_id, -1, site=False)
+            _thread_contribution(thread, new_category_id, 1, site=False)
+    elif was_live:
+        _thread_contribution(thread, old_category_id, -1, site=True)
+    elif is_live:
+        _thread_contribution(thread, new_category_id, 1, site=True)
+
+
+# ลบกระทู้จริง: pre_delete ถอนยอดทั้งกระทู้ไปแล้ว คอมเมนต์ที่ถูก CASCADE ไม่ต้องถอนซ้ำ
+_cascading = threading.local()
+
+
+def thread_deleting(thread):
+    _cascading.ids = getattr(_cascading, "ids", set()) | {thread.pk}
+    if not thread.is_deleted:
+        _thread_contribution(thread, thread.category_id, -1, site=True)
+
+
+def thread_deleted(thread):
+    getattr(_cascading, "ids", set()).discard(thread.pk)
+
+
+def is_cascading(thread_id):
+    return thread_id in getattr(_cascading, "ids", ())
+
+
+# ===================== Read =====================
+
+def totals(since):
+    """ยอดรวมทั้งเว็บ + ยอดตั้งแต่วันที่ since: {"threads": n, "threads_recent": n, ...}"""
+    sums = {}
+    for f in FIELDS:
+        sums[f"{f}_total"] = Sum(f)
+        sums[f"{f}_recent"] = Sum(f, filter=Q(day__gte=since))
+    row = DailyStat.objects.filter(category__isnull=True).aggregate(**sums)
+    return {k.removesuffix("_total"): v or 0 for k, v in row.items()}
+
+
+def series(start, end, category_id=None):
+    """[{"day": date, field: n, ...}] ทุกวันใน [start, end] (วันที่ไม่มีแถว = 0)"""
+    qs = DailyStat.objects.filter(day__range=(start, end))
+    qs = qs.filter(category_id=category_id) if category_id else qs.filter(category__isnull=True)
+    rows = {r["day"]: r for r in qs.values("day", *FIELDS)}
+    out = []
+    for i in range((end - start).days + 1):
+        day = start + timedelta(days=i)
+        out.append(rows.get(day) or {"day": day, **{f: 0 for f in FIELDS}})
+    return out
+
+
+# ===================== Rebuild =====================
+
+def _group(qs, date_field, category_field=None):
+    fields = ["day"] + ([category_field] if category_field else [])
+    return (
+        qs.annotate(day=TruncDate(date_field)).order_by()
+        .values_list(*fields).annotate(n=Count("id"))
+    )
+
+
+def rebuild() -> int:
+    """คำนวณ DailyStat ทั้งหมดใหม่จากตารางจริง คืนจำนวนแถวที่สร้าง"""
+    rows = {}
+
+    def add(day, category_id, field, n):
+        row = rows.setdefault((day, category_id), {f: 0 for f in FIELDS})
+        row[field] += n
+
+    sources = [
+        ("threads", Thread.objects.all(), "created_at", "category_id"),
+        ("comments", Comment.objects.filter(thread__is_deleted=False),
+         "created_at", "thread__category_id"),
+        ("likes", ThreadLike.objects.all(), "created_at", "thread__category_id"),
+    ]
+    for field, qs, date_field, cat_field in sources:
+        for day, cat, n in _group(qs, date_field, cat_field):
+            add(day, None, field, n)
+            add(day, cat, field, n)
+    for day, n in _group(User.objects.all(), "date_joined"):
+        add(day, None, "new_users", n)
+    for day, n in _group(Report.objects.filter(status="open"), "created_at"):
+        add(day, None, "reports", n)
+
+    with transaction.atomic():
+        DailyStat.objects.all().delete()
+        DailyStat.objects.bulk_create(
+            [DailyStat(day=day, category_id=cat, **counts) for (day, cat), counts in rows.items()],
+            batch_size=500,
+        )
+    return len(rows)
@@ -0,0 +1,267 @@
+# forum/search.py
+"""
+ระบบค้นหากระทู้/คอมเมนต์/ผู้เขียน แทนการ icontains สแกนทั้งตาราง
+
+- ข้อความถูกตัดคำก่อนเก็บลง SearchDocument:
+    * คำภาษาไทย (ไม่มีช่องว่างคั่นคำ) → ตัดเป็น character bigram ซ้อนกัน เช่น "ไดโน" → "ได ดโ โน"
+      คำค้นก็ตัดแบบเดียวกันแล้วค้นเป็น phrase จึงได้ผลเท่ากับค้นหา substring แต่ใช้ดัชนีได้
+    * คำอังกฤษ/ตัวเลข → 1 token ต่อคำ (ตัวพิมพ์เล็ก)
+- SQLite: FTS5 (tokenize=ascii, external content = forum_searchdocument, sync ด้วย trigger)
+- PostgreSQL: GIN index บน tsvector('simple') ของคอลัมน์เดียวกัน
+- DB อื่น: fallback เป็น icontains บน SearchDocument
+- หน้าแรก: search_thread_ids จัดอันดับต่อกระทู้ คืนไม่เกิน SEARCH_RESULT_LIMIT กระทู้ (= 50 หน้า
+  ของผลค้นหา — หน้าแสดงหมายเหตุเมื่อชนเพดาน ให้เพิ่มคำค้นให้แคบลง)
+- แอดมิน/งาน bulk: matching_thread_ids เป็น subquery ไม่มีเพดาน (ไม่ตกหล่นแม้ตรงเป็นหมื่นกระทู้)
+"""
+import html
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import SearchDocument, Thread, Comment
+
+FTS_TABLE = "forum_search_fts"
+SEARCH_RESULT_LIMIT = 500     # จำนวนกระทู้สูงสุดที่หน้าแรกแสดงต่อคำค้น (10 ต่อหน้า = 50 หน้า)
+SEARCH_CANDIDATES = 5000      # เอกสารคะแนนสูงสุดที่นำมารวมเป็นกระทู้ (ดู search_thread_ids)
+
+_THAI_RUN = re.compile(r"[\u0E00-\u0E7F]+")
+_WORD = re.compile(r"[\u0E00-\u0E7F]+|\w+")
+
+
+# ===================== Tokenize =====================
+
+def _terms(text):
+    """[(คำ, [token, ...]), ...] — คำไทยแตกเป็น bigram"""
+    out = []
+    for w in _WORD.findall((text or "").lower()):
+        if _THAI_RUN.fullmatch(w) and len(w) > 1:
+            out.append((w, [w[i:i + 2] for i in range(len(w) - 1)]))
+        else:
+            out.append((w, [w]))
+    return out
+
+
+def segment(text) -> str:
+    plain = html.unescape(strip_tags(text or ""))
+    return " ".join(tok for _, toks in _terms(plain) for tok in toks)
+
+
+# ===================== Index =====================
+
+def index_thread(thread):
+    SearchDocument.objects.update_or_create(
+        kind="thread", obj_id=thread.pk,
+        defaults={
+            "thread_id": thread.pk,
+            "title": segment(thread.title),
+            "body": segment(thread.content),
+            "author": segment(thread.author.username),
+        },
+    )
+
+
+def index_comment(comment):
+    SearchDocument.objects.update_or_create(
+        kind="comment", obj_id=comment.pk,
+        defaults={
+            "thread_id": comment.thread_id,
+            "title": "",
+            "body": segment(comment.content),
+            "author": segment(comment.author.username),
+        },
+    )
+
+
+def unindex_comments(ids):
+    SearchDocument.objects.filter(kind="comment", obj_id__in=list(ids)).delete()
+
+
+def rebuild(batch_size=500) -> int:
+    """ล้างแล้วสร้างดัชนีใหม่ทั้งหมด คืนจำนวนเอกสาร"""
+    SearchDocument.objects.all().delete()
+    total = 0
+    threads = Thread.all_objects.select_related("author").order_by("pk")  # กระทู้ที่ถูกลบยังค้นได้ในหน้าแอดมิน
+    comments = Comment.objects.select_related("author").order_by("pk")
+    for qs, build in ((threads, _thread_doc), (comments, _comment_doc)):
+        batch = []
+        for obj in qs.iterator(chunk_size=batch_size):
+            batch.append(build(obj))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        total += len(batch)
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cur:
+            cur.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _thread_doc(t):
+    return SearchDocument(kind="thread", obj_id=t.pk, thread_id=t.pk, title=segment(t.title),
+                          body=segment(t.content), author=segment(t.author.username))
+
+
+def _comment_doc(c):
+    return SearchDocument(kind="comment", obj_id=c.pk, thread_id=c.thread_id, title="",
+                          body=segment(c.content), author=segment(c.author.username))
+
+
+# ===================== Query =====================
+
+# ต้องตรงกับ expression ของ GIN index ใน migration ไม่งั้น PostgreSQL จะไม่ใช้ index
+_PG_VECTOR = (
+    "(setweight(to_tsvector('simple', title), 'A')"
+    " || setweight(to_tsvector('simple', author), 'B')"
+    " || setweight(to_tsvector('simple', body), 'C'))"
+)
+
+
+def _fts5_query(terms):
+    parts = []
+    for _, toks in terms:
+        # คำเดียว/ตัวอักษรเดียว → prefix match (พิมพ์ค้างกลางคำก็เจอ)
+        parts.append('"%s"%s' % (" ".join(toks), "*" if len(toks) == 1 else ""))
+    return " AND ".join(parts)
+
+
+def _tsquery(terms):
+    parts = []
+    for _, toks in terms:
+        parts.append(" <-> ".join(toks) + (":*" if len(toks) == 1 else ""))
+    return " & ".join(parts)
+
+
+def _icontains_docs(terms):
+    qs = SearchDocument.objects.all()
+    for _, toks in terms:
+        phrase = " ".join(toks)
+        qs = qs.filter(Q(title__icontains=phrase) | Q(body__icontains=phrase) | Q(author__icontains=phrase))
+    return qs
+
+
+def search_thread_ids(q, category_id=None, include_deleted=False, limit=SEARCH_RESULT_LIMIT):
+    """
+    คืน id กระทู้ที่ตรงคำค้น เรียงตามความเกี่ยวข้อง (ดีที่สุดก่อน) ไม่เกิน limit กระทู้
+    รวมคะแนนเป็นกระทู้ละแถว (เอกสารที่ดีที่สุดของกระทู้) และกรองหมวด/กระทู้ที่ถูกลบในคิวรีเดียวกัน
+    — กระทู้ที่คอมเมนต์ตรงคำค้นเป็นพันไม่เบียดกระทู้อื่นตกไป
+
+    เพดาน: รวม/เรียงเฉพาะ SEARCH_CANDIDATES เอกสารที่คะแนนดีที่สุด (top-N ของดัชนีก่อน GROUP BY)
+    คำค้นสั้น/คำที่พบบ่อยจึงไม่ต้องจัดกลุ่มและเรียงเกือบทั้งดัชนีทุก request ของหน้าแรก
+    แลกกับ: กรองหมวด/กระทู้ที่ถูกลบหลังตัด → คำที่พบบ่อยมากอาจได้ผลในหมวดน้อยกว่าที่มีจริง
+    และกระทู้เดียวที่มีเอกสารตรงคำค้นเกิน SEARCH_CANDIDATES ยังเบียดกระทู้อื่นได้
+    (หน้าแอดมินและงาน bulk ใช้ matching_thread_ids ซึ่งไม่มีเพดาน)
+    """
+    terms = _terms(q)
+    if not terms:
+        return []
+
+    where, params = [], []
+    if not include_deleted:
+        where.append("t.is_deleted = %s")
+        params.append(False)
+    if category_id:
+        where.append("t.category_id = %s")
+        params.append(int(category_id))
+    extra = "".join(f" AND {w}" for w in where)
+
+    vendor = connection.vendor
+    if vendor == "sqlite":
+        sql = f"""
+            SELECT d.thread_id, MIN(m.rank) AS score
+            FROM (
+                SELECT rowid, rank FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s
+            ) m
+            JOIN forum_searchdocument d ON d.id = m.rowid
+            JOIN forum_thread t ON t.id = d.thread_id
+            WHERE 1 = 1{extra}
+            GROUP BY d.thread_id
+            ORDER BY score, d.thread_id
+            LIMIT %s
+        """
+        params = [_fts5_query(terms), SEARCH_CANDIDATES, *params, limit]
+    elif vendor == "postgresql":
+        sql = f"""
+            SELECT d.thread_id, MAX(m.score) AS score
+            FROM (
+                SELECT id, ts_rank({_PG_VECTOR}, query) AS score
+                FROM forum_searchdocument, to_tsquery('simple', %s) query
+                WHERE {_PG_VECTOR} @@ query
+                ORDER BY score DESC LIMIT %s
+            ) m
+            JOIN forum_searchdocument d ON d.id = m.id
+            JOIN forum_thread t ON t.id = d.thread_id
+            WHERE 1 = 1{extra}
+            GROUP BY d.thread_id
+            ORDER BY score DESC, d.thread_id
+            LIMIT %s
+        """
+        params = [_tsquery(terms), SEARCH_CANDIDATES, *params, limit]
+    else:
+        qs = _icontains_docs(terms)
+        if not include_deleted:
+            qs = qs.filter(thread__is_deleted=False)
+        if category_id:
+            qs = qs.filter(thread__category_id=category_id)
+        ids = qs.order_by("-thread_id").values_list("thread_id", flat=True).distinct()
+        return list(ids[:min(limit, SEARCH_CANDIDATES)])
+
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return [row[0] for row in cur.fetchall()]
+
+
+def matching_thread_ids(q):
+    """
+    subquery (ยังไม่รัน) ของ id กระทู้ทุกกระทู้ที่ตรงคำค้น — ไม่จัดอันดับ ไม่มีเพดาน
+    ใช้กรองใน SQL: Thread.all_objects.filter(id__in=matching_thread_ids(q)) (หน้าแอดมิน/งาน bulk)
+    """
+    terms = _terms(q)
+    if not terms:
+        return SearchDocument.objects.none().values("thread_id")
+    vendor = connection.vendor
+    if vendor == "sqlite":
+        docs = SearchDocument.objects.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts5_query(terms)],
+        ))
+    elif vendor == "postgresql":
+        docs = SearchDocument.objects.filter(id__in=RawSQL(
+            f"SELECT id FROM forum_searchdocument WHERE {_PG_VECTOR} @@ to_tsquery('simple', %s)",
+            [_tsquery(terms)],
+        ))
+    else:
+        docs = _icontains_docs(terms)
+    return docs.values("thread_id")
+
+
+# ===================== Snippet =====================
+
+def highlight(text, q, width=160):
+    """ตัดข้อความรอบคำที่ตรงคำค้นแรก แล้วครอบคำค้นด้วย <mark> (escape แล้ว ปลอดภัยกับ template)"""
+    plain = " ".join(html.unescape(strip_tags(text or "")).split())
+    words = sorted({w for w, _ in _terms(q)}, key=len, reverse=True)
+    if not plain or not words:
+        return ""
+
+    low = plain.lower()
+    hits = [i for i in (low.find(w) for w in words) if i >= 0]
+    start = max(0, min(hits) - width // 3) if hits else 0
+    chunk = plain[start:start + width]
+
+    pattern = re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE)
+    out, last = [], 0
+    for m in pattern.finditer(chunk):
+        out.append(escape(chunk[last:m.start()]))
+        out.append(f"<mark>{escape(m.group())}</mark>")
+        last = m.end()
+    out.append(escape(chunk[last:]))
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width < len(plain) else ""
+    return mark_safe(prefix + "".join(out) + suffix)
@@ -1,11 +1,274 @@
 # forum/signals.py
-from django.db.models.signals import post_save, post_delete
+from django.contrib.auth.models import User
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
 
-from .models import Comment
+from .events import bulk_moved, bulk_soft_deleted
+from .models import Category, Thread, Comment, Report, ThreadLike
+from . import cachetags, counters, images, live, participants, rollups, search, tags, trending
 
-@receiver([post_save, post_delete], sender=Comment)
-def invalidate_comment_count(sender, instance, **kwargs):
-    # ลบแคชตัวนับคอมเมนต์ของกระทู้ที่เกี่ยวข้อง
-    cache.delete(f"thread:{instance.thread_id}:comment_count")
+
+# ---------- จำสถานะตอนโหลด เพื่อรู้ว่า save() ครั้งนี้เปลี่ยนอะไร ----------
+# อ่านผ่าน __dict__ เพื่อไม่ให้ฟิลด์ที่ถูก defer (.only()) ยิง query เพิ่ม
+
+def _image_name(instance):
+    raw = instance.__dict__.get("image")  # ยังเป็น str จนกว่าจะมีคนอ่านผ่าน descriptor
+    return getattr(raw, "name", raw) or ""
+
+@receiver(post_init, sender=Thread)
+def remember_thread_state(sender, instance, **kwargs):
+    instance._loaded_state = (
+        instance.__dict__.get("is_deleted"),
+        instance.__dict__.get("category_id"),
+    ) if instance.pk else None
+    instance._loaded_image = _image_name(instance)
+
+@receiver(post_init, sender=Comment)
+def remember_comment_state(sender, instance, **kwargs):
+    instance._loaded_deleted = instance.__dict__.get("is_deleted") if instance.pk else None
+    instance._loaded_image = _image_name(instance)
+
+
+def _image_changed(instance, kind):
+    """รูปใหม่/เปลี่ยนรูป → ล้างไฟล์ย่อเดิมแล้วสั่งสร้างใหม่เบื้องหลัง (images)"""
+    if "image" not in instance.__dict__:
+        return  # ฟิลด์ถูก defer ไว้ แปลว่าไม่ได้แก้
+    name = getattr(instance.image, "name", "") or ""
+    if name == getattr(instance, "_loaded_image", ""):
+        return
+    instance._loaded_image = name
+    rows = type(instance)._base_manager.filter(pk=instance.pk)
+    images.discard(rows.values_list("image_variants", flat=True).first())  # ค่าใน DB — งานเบื้องหลังอาจเขียนหลังโหลด instance
+    rows.update(image_variants={})
+    instance.image_variants = {}
+    if name:
+        images.schedule(instance, kind=kind)
+
+
+def _tags(thread_id, *category_ids, user_id=None, trending=False):
+    tags = [cachetags.ALL, cachetags.thread(thread_id)]
+    tags += [cachetags.category(c) for c in category_ids if c]
+    if user_id:
+        tags.append(cachetags.user(user_id))
+    if trending:
+        tags.append(cachetags.TRENDING)
+    return tags
+
+
+def _invalidate(thread_id, *category_ids, user_id=None, trending=False):
+    """ที่เดียวที่ล้างแคช: ทุกการเขียนที่กระทบกระทู้ (ตัวกระทู้/คอมเมนต์/ไลก์/bulk) ผ่านตรงนี้"""
+    cachetags.invalidate(*_tags(thread_id, *category_ids, user_id=user_id, trending=trending))
+
+
+# ---------- Thread ----------
+# - Category.thread_count (counters)
+# - มาแรง: คะแนนตอนตั้งกระทู้ / คำนวณใหม่เมื่อถูกลบ-กู้คืน-ย้ายหมวด (trending)
+# - ดัชนีค้นหา (search)
+# - Tag / ThreadTag + Tag.thread_count (tags)
+# - ไฟล์ย่อของรูป (images)
+# - สถิติรายวัน (rollups)
+# - dependency tag ของแคช (cachetags) — ทุก Model ด้านล่าง ผ่าน _invalidate()
+
+SEARCH_FIELDS = {"title", "content", "author", "author_id"}
+TAG_FIELDS = {"title", "content"}
+
+@receiver(post_save, sender=Thread)
+def thread_saved(sender, instance, created, update_fields=None, **kwargs):
+    prev = None if created else getattr(instance, "_loaded_state", None)
+    deltas = {}
+    if created:
+        if not instance.is_deleted:
+            deltas[instance.category_id] = 1
+            trending.record(instance.pk, instance.category_id, "thread", when=instance.created_at)
+            rollups.record(instance.created_at, instance.category_id, threads=1)
+    elif prev is not None and None not in prev:
+        was_deleted, old_cat = prev
+        if not was_deleted:
+            deltas[old_cat] = deltas.get(old_cat, 0) - 1
+        if not instance.is_deleted:
+            deltas[instance.category_id] = deltas.get(instance.category_id, 0) + 1
+        if (was_deleted, old_cat) != (instance.is_deleted, instance.category_id):
+            trending.refresh_thread(instance, old_category_id=old_cat)
+            rollups.thread_changed(instance, not was_deleted, old_cat,
+                                   not instance.is_deleted, instance.category_id)
+        if was_deleted != instance.is_deleted:
+            tags.set_threads_live([instance.pk], not instance.is_deleted)
+    counters.bump_categories(deltas)
+    # แก้ไข/ลบ/ย้ายหมวด → กล่องมาแรงแสดงข้อมูลเก่า; กระทู้ใหม่รอ TTL ของกล่องเอง
+    _invalidate(instance.pk, instance.category_id, *(prev[1:] if prev else ()),
+                user_id=instance.author_id, trending=not created)
+    instance._loaded_state = (instance.is_deleted, instance.category_id)
+
+    # save(update_fields=["is_deleted"]) ไม่ต้อง index ใหม่ — กระทู้ที่ถูกลบกรองตอนค้นอยู่แล้ว
+    if created or update_fields is None or SEARCH_FIELDS & set(update_fields):
+        search.index_thread(instance)
+    if created or update_fields is None or TAG_FIELDS & set(update_fields):
+        tags.sync_thread(instance)
+    _image_changed(instance, "thread")
+
+@receiver(pre_delete, sender=Thread)
+def thread_deleting(sender, instance, **kwargs):
+    # ต้องทำก่อน CASCADE ลบ ThreadTag / Comment ทิ้ง
+    if not instance.is_deleted:
+        tags.set_threads_live([instance.pk], False)
+    rollups.thread_deleting(instance)
+
+@receiver(post_delete, sender=Thread)
+def thread_deleted(sender, instance, **kwargs):
+    if not instance.is_deleted:
+        counters.bump_categories({instance.category_id: -1})
+    trending.remove(instance.pk, instance.category_id)
+    rollups.thread_deleted(instance)
+    images.discard(instance.__dict__.get("image_variants"))
+    _invalidate(instance.pk, instance.category_id, user_id=instance.author_id, trending=True)
+
+
+# ---------- Comment ----------
+# - Thread.comment_count / last_activity_at (counters)
+# - มาแรง: บวก/ถอนคะแนนด้วยเวลาของคอมเมนต์เอง (trending)
+# - ดัชนีค้นหา (search)
+# - สถิติรายวัน นับเฉพาะคอมเมนต์ในกระทู้ที่ยังไม่ถูกลบ (rollups)
+# - แถวผู้ตอบ (user, thread) ของแท็บ "กระทู้ที่ตอบ" (participants)
+
+def _comment_category(comment):
+    return comment.thread.category_id
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        if not instance.is_deleted:
+            counters.bump_thread(instance.thread_id, comments=1, activity_at=instance.created_at)
+            trending.record(instance.thread_id, _comment_category(instance), "comment", when=instance.created_at)
+            participants.added(instance)
+            if not instance.thread.is_deleted:
+                rollups.record(instance.created_at, _comment_category(instance), comments=1)
+            live.comment_added(instance)
+    else:
+        was_deleted = getattr(instance, "_loaded_deleted", None)
+        if was_deleted is not None and was_deleted != instance.is_deleted:
+            sign = -1 if instance.is_deleted else 1
+            counters.bump_thread(instance.thread_id, comments=sign)
+            trending.record(instance.thread_id, _comment_category(instance), "comment",
+                            when=instance.created_at, sign=sign)
+            if not instance.thread.is_deleted:
+                rollups.record(instance.created_at, _comment_category(instance), comments=sign)
+            participants.sync([(instance.author_id, instance.thread_id)])
+            if instance.is_deleted:
+                live.comment_removed(instance)
+    instance._loaded_deleted = instance.is_deleted
+    _image_changed(instance, "comment")
+    _invalidate(instance.thread_id, _comment_category(instance), user_id=instance.author_id)
+
+    if instance.is_deleted:
+        search.unindex_comments([instance.pk])
+    else:
+        search.index_comment(instance)
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if not instance.is_deleted:
+        counters.bump_thread(instance.thread_id, comments=-1)
+        if not rollups.is_cascading(instance.thread_id):
+            # ลบจริงทั้งกระทู้: แถวผู้ตอบหายไปกับ CASCADE เอง
+            participants.sync([(instance.author_id, instance.thread_id)])
+            if not instance.thread.is_deleted:
+                rollups.record(instance.created_at, instance.thread.category_id, comments=-1)
+    search.unindex_comments([instance.pk])
+    images.discard(instance.__dict__.get("image_variants"))
+    if not instance.is_deleted and not rollups.is_cascading(instance.thread_id):
+        live.comment_removed(instance)
+    # ไม่อ่าน instance.thread: ถ้ามาจาก CASCADE ของกระทู้ thread_deleted จะล้าง tag หมวดให้เอง
+    _invalidate(instance.thread_id, user_id=instance.author_id)
+
+
+# ---------- ThreadLike → Thread.like_count + มาแรง ----------
+
+@receiver(post_save, sender=ThreadLike)
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_thread(instance.thread_id, likes=1)
+        trending.record(instance.thread_id, instance.thread.category_id, "like", when=instance.created_at)
+        rollups.record(instance.created_at, instance.thread.category_id, likes=1)
+        _invalidate(instance.thread_id, instance.thread.category_id, user_id=instance.user_id)
+
+@receiver(post_delete, sender=ThreadLike)
+def like_deleted(sender, instance, **kwargs):
+    counters.bump_thread(instance.thread_id, likes=-1)
+    trending.record(instance.thread_id, instance.thread.category_id, "like", when=instance.created_at, sign=-1)
+    rollups.record(instance.created_at, instance.thread.category_id, likes=-1)
+    _invalidate(instance.thread_id, instance.thread.category_id, user_id=instance.user_id)
+
+
+# ---------- Category → ชื่อหมวดในฟีด/dropdown ----------
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    cachetags.invalidate(cachetags.ALL, cachetags.category(instance.pk), cachetags.category_info(instance.pk))
+
+
+# ---------- bulk soft-delete / กู้คืน / ย้ายหมวด (counters.set_*_deleted, move_threads) ----------
+# tag ของทั้งก้อนรวมเป็นชุดเดียวแล้ว invalidate ครั้งเดียว (ก้อนละหลายร้อยแถวจาก forum/moderation.py)
+
+_BULK_THREAD_FIELDS = ("id", "category_id", "author_id", "is_deleted", "created_at")
+
+@receiver(bulk_soft_deleted, sender=Thread)
+def threads_bulk_soft_deleted(sender, ids, deleted, **kwargs):
+    stale = set()
+    for t in Thread.all_objects.filter(id__in=ids).only(*_BULK_THREAD_FIELDS):
+        trending.refresh_thread(t)
+        rollups.thread_changed(t, deleted, t.category_id, not deleted, t.category_id)
+        stale.update(_tags(t.pk, t.category_id, user_id=t.author_id, trending=True))
+    tags.set_threads_live(ids, not deleted)
+    cachetags.invalidate(*stale)
+
+@receiver(bulk_moved, sender=Thread)
+def threads_bulk_moved(sender, moves, category_id, **kwargs):
+    stale = set()
+    for t in Thread.all_objects.filter(id__in=list(moves)).only(*_BULK_THREAD_FIELDS):
+        old = moves[t.pk]
+        trending.refresh_thread(t, old_category_id=old)
+        rollups.thread_changed(t, not t.is_deleted, old, not t.is_deleted, t.category_id)
+        stale.update(_tags(t.pk, old, t.category_id, user_id=t.author_id, trending=True))
+    cachetags.invalidate(*stale)
+
+@receiver(bulk_soft_deleted, sender=Comment)
+def comments_bulk_soft_deleted(sender, ids, deleted, **kwargs):
+    stale = set()
+    comments = Comment.all_objects.filter(id__in=ids).select_related("thread", "author")
+    for c in comments:
+        trending.record(c.thread_id, c.thread.category_id, "comment",
+                        when=c.created_at, sign=-1 if deleted else 1)
+        if not c.thread.is_deleted:
+            rollups.record(c.created_at, c.thread.category_id, comments=-1 if deleted else 1)
+        stale.update(_tags(c.thread_id, c.thread.category_id, user_id=c.author_id))
+        if not deleted:
+            search.index_comment(c)
+    if deleted:
+        search.unindex_comments(ids)
+    participants.sync((c.author_id, c.thread_id) for c in comments)
+    cachetags.invalidate(*stale)
+
+
+# ---------- สถิติรายวันของผู้ใช้ / รายงาน (rollups) ----------
+
+@receiver(post_save, sender=User)
+def user_joined(sender, instance, created, **kwargs):
+    if created:
+        rollups.record(instance.date_joined, new_users=1)
+
+@receiver(post_delete, sender=User)
+def user_removed(sender, instance, **kwargs):
+    rollups.record(instance.date_joined, new_users=-1)
+
+# ปิดรายงานแบบ bulk (reports.close_target) ถอนยอดเองเพราะเป็น UPDATE
+
+@receiver(post_save, sender=Report)
+def report_filed(sender, instance, created, **kwargs):
+    if created and instance.status == "open":
+        rollups.record(instance.created_at, reports=1)
+
+@receiver(post_delete, sender=Report)
+def report_removed(sender, instance, **kwargs):
+    if instance.status == "open":
+        rollups.record(instance.created_at, reports=-1)
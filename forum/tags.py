@@ -0,0 +1,124 @@
+# forum/tags.py
+"""
+แท็กกระทู้ (#คำ ในหัวข้อ/เนื้อหา) แบบบันทึกลงตาราง แทนการ regex ทุกครั้งที่ render
+
+- ดึงแท็กครั้งเดียวตอนบันทึกกระทู้ (forum/signals.py → sync_thread) ลง Tag / ThreadTag
+- Tag.thread_count นับเฉพาะกระทู้ที่ยังไม่ถูกลบ (ปรับด้วย counters.bump_tags)
+- หน้า /tags/<name>/ ตัดหน้าแบบ keyset บน index (tag, thread_created_at, id)
+- tag cloud อ่านจากตัวนับ ไม่ต้อง COUNT/GROUP BY
+- ข้อมูลเก่า/เพี้ยน → python manage.py rebuild_tags
+"""
+import math
+import re
+
+from django.db import transaction
+from django.db.models import Count, Prefetch, prefetch_related_objects
+
+from . import cachetags, counters
+from .models import Tag, Thread, ThreadTag
+
+TAG_RE = re.compile(r"#([\w\u0E00-\u0E7F/+\-]+)")
+MAX_TAGS_PER_THREAD = 10
+
+
+def normalize(name) -> str:
+    return (name or "").strip().strip("/+-").casefold()[:64]
+
+
+def extract(*texts):
+    """ชื่อแท็กไม่ซ้ำ ตามลำดับที่ปรากฏ"""
+    names = []
+    for text in texts:
+        for raw in TAG_RE.findall(text or ""):
+            name = normalize(raw)
+            if name and name not in names:
+                names.append(name)
+    return names[:MAX_TAGS_PER_THREAD]
+
+
+# ===================== Write =====================
+
+def _get_or_create_tags(names):
+    if not names:
+        return {}
+    Tag.objects.bulk_create([Tag(name=n) for n in names], ignore_conflicts=True)
+    return {t.name: t for t in Tag.objects.filter(name__in=names)}
+
+
+def sync_thread(thread):
+    """ให้ ThreadTag ของกระทู้ตรงกับหัวข้อ/เนื้อหาปัจจุบัน (เพิ่ม/ลบเฉพาะส่วนต่าง)"""
+    names = extract(thread.title, thread.content)
+    with transaction.atomic():
+        current = {tt.tag.name: tt for tt in ThreadTag.objects.filter(thread=thread).select_related("tag")}
+        added = [n for n in names if n not in current]
+        removed = [tt for n, tt in current.items() if n not in names]
+
+        tags = _get_or_create_tags(added)
+        ThreadTag.objects.bulk_create([
+            ThreadTag(thread=thread, tag=tags[n], thread_created_at=thread.created_at) for n in added
+        ])
+        if removed:
+            ThreadTag.objects.filter(id__in=[tt.id for tt in removed]).delete()
+
+        if not thread.is_deleted:
+            deltas = {tags[n].id: 1 for n in added}
+            deltas.update({tt.tag_id: -1 for tt in removed})
+            counters.bump_tags(deltas)
+    if added or removed:
+        cachetags.invalidate(cachetags.TAGS)
+
+
+def set_threads_live(thread_ids, live: bool):
+    """กระทู้ถูกลบ/กู้คืน → ปรับ Tag.thread_count ของแท็กทั้งหมดในกระทู้เหล่านั้น"""
+    per_tag = dict(
+        ThreadTag.objects.filter(thread_id__in=thread_ids)
+        .order_by().values_list("tag_id").annotate(n=Count("id"))
+    )
+    sign = 1 if live else -1
+    counters.bump_tags({tid: sign * n for tid, n in per_tag.items()})
+    if per_tag:
+        cachetags.invalidate(cachetags.TAGS)
+
+
+def rebuild(batch_size=500) -> int:
+    """ดึงแท็กจากกระทู้ทั้งหมดใหม่แล้วคำนวณตัวนับจากตาราง คืนจำนวนกระทู้ที่มีแท็ก"""
+    n = 0
+    for t in Thread.all_objects.order_by("id").only("id", "title", "content", "created_at", "is_deleted") \
+            .iterator(chunk_size=batch_size):
+        if extract(t.title, t.content) or ThreadTag.objects.filter(thread=t).exists():
+            sync_thread(t)
+            n += 1
+    live = dict(
+        ThreadTag.objects.filter(thread__is_deleted=False)
+        .order_by().values_list("tag_id").annotate(n=Count("id"))
+    )
+    for tag in Tag.objects.only("id", "thread_count"):
+        if tag.thread_count != live.get(tag.id, 0):
+            Tag.objects.filter(pk=tag.pk).update(thread_count=live.get(tag.id, 0))
+    cachetags.invalidate(cachetags.TAGS)
+    return n
+
+
+# ===================== Read =====================
+
+def prefetch(threads):
+    """โหลดแท็กของหลายกระทู้ใน query เดียว (ให้ t.tag_list ไม่ยิง query ต่อกระทู้)"""
+    prefetch_related_objects(
+        [t for t in threads if "thread_tags" not in getattr(t, "_prefetched_objects_cache", {})],
+        Prefetch("thread_tags", queryset=ThreadTag.objects.select_related("tag")),
+    )
+    return threads
+
+
+def tag_cloud(limit=30):
+    """แท็กยอดนิยม เรียงตามชื่อ พร้อม t.weight 1–5 (สเกล log ของจำนวนกระทู้)"""
+    def compute():
+        cloud = list(Tag.objects.filter(thread_count__gt=0).order_by("-thread_count", "name")[:limit])
+        if cloud:
+            hi, lo = math.log(cloud[0].thread_count), math.log(cloud[-1].thread_count)
+            for t in cloud:
+                span = (math.log(t.thread_count) - lo) / (hi - lo) if hi > lo else 0.5
+                t.weight = 1 + round(span * 4)
+        cloud.sort(key=lambda t: t.name)
+        return cloud
+    return cachetags.get_or_set("tags", f"cloud:{limit}", compute, [cachetags.TAGS], 300)
@@ -0,0 +1,45 @@
+# forum/templatetags/forum_tags.py
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from forum import images
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def url_replace(context, **kwargs):
+    """คืน query string ของ request ปัจจุบัน โดยแทนค่าตาม kwargs (None/ค่าว่าง = ลบพารามิเตอร์นั้น)"""
+    query = context["request"].GET.copy()
+    for key, value in kwargs.items():
+        if value is None or value == "":
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return "?" + query.urlencode()
+
+
+@register.simple_tag
+def responsive_img(image, variants=None, sizes="100vw", width=None, **attrs):
+    """
+    <picture> ที่มี srcset WebP/JPEG จากไฟล์ย่อ (forum/images.py)
+    ไฟล์ย่อยังไม่พร้อม → <img> ไฟล์ต้นฉบับ
+    width: ความกว้างที่แสดงจริง (px) ใช้เลือก src สำรองสำหรับเบราว์เซอร์ที่ไม่รู้จัก srcset
+    ใช้: {% responsive_img t.image t.image_variants sizes="120px" width=120 class="rounded" %}
+    """
+    if not image or not getattr(image, "name", ""):
+        return ""
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    attr_html = format_html_join(" ", '{}="{}"', ((k.rstrip("_").replace("_", "-"), v) for k, v in attrs.items()))
+    if not variants or not variants.get("jpeg"):
+        return format_html('<img src="{}" alt="" {}>', image.url, attr_html)
+
+    fallback = images.smallest_at_least(variants, int(width or 0) * 2) or image.url
+    dims = format_html(' width="{}" height="{}"', variants["w"], variants["h"]) if variants.get("w") else ""
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt=""{} {}></picture>',
+        images.srcset(variants, "webp"), sizes,
+        fallback, images.srcset(variants, "jpeg"), sizes, dims, attr_html,
+    )
@@ -1,3 +1,1169 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import (Category, Thread, Comment, ThreadLike, Tag, ThreadTag, Report, DailyStat, ModerationJob,
+                     ThreadParticipant)
+from .counters import set_threads_deleted, set_comments_deleted
+from . import cachetags, instrument, likes, live, metrics, moderation, participants, pubsub, search, trending, zset
+from .pagination import keyset_page
+
+# เทสต์ไม่พึ่ง Redis — ใช้ cache ในหน่วยความจำแทน
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+# เครื่องเทสต์ช้าได้ — ไม่พ่น log "forum.slow" ลง console (เทสต์ของ log นี้ตั้งค่าเองพร้อม assertLogs)
+QUIET_SLOW_MS = 60_000
+
+
+@override_settings(CACHES=LOCMEM_CACHES, FORUM_SLOW_REQUEST_MS=QUIET_SLOW_MS)
+class ForumTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("dino", password="pw")
+        cls.staff = User.objects.create_user("admin", password="pw", is_staff=True)
+        cls.cat = Category.objects.create(name="ทั่วไป")
+        cls.cat2 = Category.objects.create(name="ฟอสซิล")
+
+    def setUp(self):
+        cache.clear()
+        zset.reset_local()
+        pubsub.reset_local()
+
+    def make_thread(self, **kw):
+        kw.setdefault("category", self.cat)
+        kw.setdefault("author", self.user)
+        kw.setdefault("title", "ไดโนเสาร์")
+        kw.setdefault("content", "เนื้อหา")
+        return Thread.objects.create(**kw)
+
+
+class CounterTests(ForumTestCase):
+    def test_comment_create_and_soft_delete(self):
+        t = self.make_thread()
+        c = Comment.objects.create(thread=t, author=self.user, content="a")
+        Comment.objects.create(thread=t, author=self.user, content="b")
+        t.refresh_from_db()
+        self.assertEqual(t.comment_count, 2)
+        self.assertEqual(t.last_activity_at, Comment.objects.latest("created_at").created_at)
+
+        c.is_deleted = True
+        c.save(update_fields=["is_deleted"])
+        t.refresh_from_db()
+        self.assertEqual(t.comment_count, 1)
+
+        set_comments_deleted(Comment.all_objects.filter(thread=t), False)
+        t.refresh_from_db()
+        self.assertEqual(t.comment_count, 2)
+
+    def test_like_toggle_view(self):
+        t = self.make_thread()
+        self.client.force_login(self.user)
+        url = reverse("forum:thread_like_toggle", args=[t.id])
+        self.client.post(url)
+        t.refresh_from_db()
+        self.assertEqual(t.like_count, 1)
+        self.client.post(url)
+        t.refresh_from_db()
+        self.assertEqual(t.like_count, 0)
+
+    def test_category_thread_count(self):
+        t = self.make_thread()
+        self.make_thread()
+        self.cat.refresh_from_db()
+        self.assertEqual(self.cat.thread_count, 2)
+
+        t.category = self.cat2
+        t.save()
+        self.cat.refresh_from_db()
+        self.cat2.refresh_from_db()
+        self.assertEqual((self.cat.thread_count, self.cat2.thread_count), (1, 1))
+
+        n = set_threads_deleted(Thread.objects.all(), True)
+        self.assertEqual(n, 2)
+        self.cat.refresh_from_db()
+        self.assertEqual(self.cat.thread_count, 0)
+
+    def test_stale_instance_save_keeps_counters(self):
+        t = self.make_thread()
+        stale = Thread.objects.get(pk=t.pk)
+        Comment.objects.create(thread=t, author=self.user, content="a")
+        stale.title = "แก้ชื่อ"
+        stale.save()
+        t.refresh_from_db()
+        self.assertEqual((t.title, t.comment_count), ("แก้ชื่อ", 1))
+
+    def test_reconcile_fixes_drift(self):
+        t = self.make_thread()
+        Comment.objects.create(thread=t, author=self.user, content="a")
+        ThreadLike.objects.create(thread=t, user=self.user)
+        Thread.objects.filter(pk=t.pk).update(comment_count=9, like_count=9)
+        Category.objects.filter(pk=self.cat.pk).update(thread_count=7)
+
+        call_command("reconcile_counters", stdout=StringIO())
+        t.refresh_from_db()
+        self.cat.refresh_from_db()
+        self.assertEqual((t.comment_count, t.like_count, self.cat.thread_count), (1, 1, 1))
+
+    def test_home_has_no_group_by(self):
+        t = self.make_thread()
+        Comment.objects.create(thread=t, author=self.user, content="a")
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(reverse("forum:home"))
+        self.assertContains(r, "1 ความเห็น")
+        self.assertFalse([q for q in ctx.captured_queries if "GROUP BY" in q["sql"]])
+
+
+class LikeToggleTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        self.thread = self.make_thread()
+        self.url = reverse("forum:thread_like_toggle", args=[self.thread.id])
+        self.client.force_login(self.user)
+
+    def post(self, action=None):
+        data = {"action": action} if action else {}
+        return self.client.post(self.url, data, HTTP_ACCEPT="application/json").json()
+
+    def test_json_verbs_are_idempotent(self):
+        self.assertEqual(self.post("like"), {"liked": True, "count": 1})
+        self.assertEqual(self.post("like"), {"liked": True, "count": 1})
+        self.assertEqual(self.post("unlike"), {"liked": False, "count": 0})
+        self.assertEqual(self.post("unlike"), {"liked": False, "count": 0})
+        self.assertEqual(self.post(), {"liked": True, "count": 1})
+        self.assertEqual(ThreadLike.objects.count(), 1)
+
+    def test_lost_race_is_not_an_error(self):
+        # อีก request INSERT ไปแล้วหลังจากเราเช็ค: SELECT ไม่เจอ แต่ INSERT ชน unique
+        ThreadLike.objects.create(thread=self.thread, user=self.user)
+        with mock.patch.object(ThreadLike.objects, "select_for_update") as sfu:
+            sfu.return_value.filter.return_value.first.return_value = None
+            liked, count = likes.set_like(self.thread, self.user, "like")
+        self.assertEqual((liked, count), (True, 1))
+
+    def test_concurrent_unlike_counts_once(self):
+        # สอง request อ่านเจอแถวไลก์เดียวกัน (SQLite ไม่ล็อก FOR UPDATE) แล้วต่างคนต่างลบ
+        ThreadLike.objects.create(thread=self.thread, user=self.staff)
+        ThreadLike.objects.create(thread=self.thread, user=self.user)
+        stale = ThreadLike.objects.get(thread=self.thread, user=self.user)
+        self.assertEqual(likes.set_like(self.thread, self.user, "unlike"), (False, 1))
+        board = trending._board(trending.current_era())
+        score = board.score(self.thread.id)
+        with mock.patch.object(ThreadLike.objects, "select_for_update") as sfu:
+            sfu.return_value.filter.return_value.first.return_value = stale
+            self.assertEqual(likes.set_like(self.thread, self.user, "unlike"), (False, 1))
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).like_count, 1)
+        self.assertEqual(DailyStat.objects.filter(category=None).aggregate(n=Sum("likes"))["n"], 1)
+        self.assertEqual(board.score(self.thread.id), score)
+
+    def test_form_post_still_redirects(self):
+        r = self.client.post(self.url, {"next": "/"})
+        self.assertRedirects(r, "/", fetch_redirect_response=False)
+        self.assertTrue(ThreadLike.objects.filter(thread=self.thread, user=self.user).exists())
+
+
+class AsyncViewTests(ForumTestCase):
+    """view หลักเป็น async — decorator ต้องคงความเป็น coroutine และผลลัพธ์ผ่าน ASGI ต้องเหมือน WSGI"""
+
+    def test_decorated_views_stay_async(self):
+        from asgiref.sync import iscoroutinefunction
+        from accounts import views as account_views
+        from . import views
+        for view in (views.home, views.thread_detail, views.thread_like_toggle,
+                     account_views.profile_detail, account_views.online_now):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+
+    async def test_page_cache_and_like_over_asgi(self):
+        t = await Thread.objects.acreate(category=self.cat, author=self.user, title="สเตโกซอรัส", content="x")
+        url = reverse("forum:thread_detail", args=[t.id])
+        r = await self.async_client.get(url)
+        self.assertContains(r, "สเตโกซอรัส")
+        self.assertEqual(r["X-Page-Cache"], "miss")
+        self.assertEqual((await self.async_client.get(url))["X-Page-Cache"], "hit")
+
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.post(reverse("forum:thread_like_toggle", args=[t.id]),
+                                         {"action": "like"}, headers={"accept": "application/json"})
+        self.assertEqual(r.json(), {"liked": True, "count": 1})
+        r = await self.async_client.get(url)
+        self.assertNotIn("X-Page-Cache", r)
+        self.assertTrue(r.context["liked"])
+
+    @override_settings(FORUM_RATELIMITS={"forum.thread_like_toggle": "1/m"})
+    def test_ratelimit_wraps_async_view(self):
+        t = self.make_thread()
+        self.client.force_login(self.user)
+        url = reverse("forum:thread_like_toggle", args=[t.id])
+        self.assertEqual(self.client.post(url).status_code, 302)
+        self.assertEqual(self.client.post(url).status_code, 429)
+
+    def test_async_keyset_page_matches_sync(self):
+        from asgiref.sync import async_to_sync
+        from .pagination import akeyset_page, at_cursor
+        threads = [self.make_thread(title=f"t{i}") for i in range(5)]
+        for cursor in (None, at_cursor(threads[2])):
+            sync_page = keyset_page(Thread.objects.all(), cursor, per_page=2)
+            async_page = async_to_sync(akeyset_page)(Thread.objects.all(), cursor, per_page=2)
+            self.assertEqual([t.id for t in async_page], [t.id for t in sync_page])
+            self.assertEqual((async_page.next_cursor, async_page.prev_cursor),
+                             (sync_page.next_cursor, sync_page.prev_cursor))
+
+
+class LiveUpdateTests(ForumTestCase):
+    """push คอมเมนต์/ไลก์ผ่าน pub/sub (backend local) + SSE"""
+
+    async def test_hub_coalesces_and_resyncs_slow_subscribers(self):
+        with override_settings(FORUM_LIVE_QUEUE=3):
+            sub = pubsub.hub.subscribe("thread:1", "ip1")
+        for n in (1, 2, 3):
+            pubsub.publish("thread:1", {"type": "likes", "count": n, "coalesce": "likes"})
+        pubsub.publish("thread:2", {"type": "likes", "count": 99})  # channel อื่น
+        pubsub.publish("thread:1", {"type": "comment", "id": 7})
+        self.assertEqual(await sub.next(1), [{"type": "likes", "count": 3, "coalesce": "likes"},
+                                             {"type": "comment", "id": 7}])
+        for i in range(4):  # เกินคิว 3 → ทิ้งของค้าง ส่ง resync แทน
+            pubsub.publish("thread:1", {"type": "comment", "id": i})
+        self.assertEqual(await sub.next(1), [{"type": "resync"}])
+        self.assertEqual(await sub.next(0.01), [])
+
+        # stream มีอายุจำกัด ส่ง ping ระหว่างเงียบ และคืนที่ผู้ฟังเมื่อจบ
+        chunks = [c async for c in live.stream(sub, heartbeat=0.01, max_age=0.05)]
+        self.assertTrue(chunks[0].startswith("retry:"))
+        self.assertIn(": ping\n\n", chunks)
+        self.assertEqual(pubsub.hub.stats()["connections"], 0)
+
+    @override_settings(FORUM_LIVE_MAX_PER_CLIENT=1, FORUM_LIVE_MAX_CONNECTIONS=2)
+    async def test_connection_limits(self):
+        a = pubsub.hub.subscribe("thread:1", "ip1")
+        with self.assertRaises(pubsub.Full):
+            pubsub.hub.subscribe("thread:2", "ip1")
+        b = pubsub.hub.subscribe("thread:1", "ip2")
+        with self.assertRaises(pubsub.Full):
+            pubsub.hub.subscribe("thread:1", "ip3")
+        a.close()
+        b.close()
+        pubsub.hub.subscribe("thread:1", "ip3").close()
+
+    async def test_stream_pushes_comments_and_likes_after_commit(self):
+        from asgiref.sync import sync_to_async
+        t = await Thread.objects.acreate(category=self.cat, author=self.user, title="x", content="x")
+        r = await self.async_client.get(reverse("forum:thread_live", args=[t.id]))
+        self.assertEqual(r["Content-Type"], "text/event-stream")
+        chunks = aiter(r.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b"retry:"))
+
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                c = Comment.objects.create(thread=t, author=self.user, content="สด")
+            with self.captureOnCommitCallbacks(execute=True):
+                likes.set_like(t, self.staff, "like")
+            return c
+        c = await sync_to_async(write)()
+        body = (await anext(chunks)).decode()
+        self.assertIn(f'event: comment\ndata: {{"id": {c.id}, "number": 1', body)
+        self.assertIn('event: likes\ndata: {"count": 1}', body)
+
+    def test_wsgi_and_hidden_threads(self):
+        t = self.make_thread()
+        self.assertEqual(self.client.get(reverse("forum:thread_live", args=[t.id])).status_code, 204)
+        hidden = self.make_thread(is_deleted=True)
+        r = async_to_sync(self.async_client.get)(reverse("forum:thread_live", args=[hidden.id]))
+        self.assertEqual(r.status_code, 404)
+
+    def test_published_only_after_commit(self):
+        t = self.make_thread()
+        with mock.patch.object(pubsub, "publish") as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                Comment.objects.create(thread=t, author=self.user, content="x")
+            publish.assert_not_called()  # ยังไม่ commit (rollback = ไม่มีใครเห็น)
+            for callback in callbacks:
+                callback()
+            self.assertEqual(publish.call_args.args[0], live.channel(t.id))
+
+
+class BenchmarkTests(ForumTestCase):
+    def test_seed_then_bench_writes_comparable_json(self):
+        import json
+        import os
+        call_command("seed_forum", users=5, categories=2, threads_per_category=3, comments=2, likes=1,
+                     big_thread=40, reports=4, images=0, stdout=StringIO())
+        big = Thread.objects.order_by("-comment_count").first()
+        self.assertEqual((big.comment_count, big.comment_seq), (Comment.objects.filter(thread=big).count(),
+                                                                Comment.all_objects.filter(thread=big).count()))
+        self.assertEqual(User.objects.filter(username__startswith="seed_").count(), 5)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "bench.json")
+            call_command("bench_forum", iterations=1, warmup=1, output=out, stdout=StringIO())
+            with open(out, encoding="utf-8") as f:
+                results = json.load(f)["results"]
+            call_command("bench_forum", iterations=1, warmup=1, baseline=out, only=["home"],
+                         slack_ms=10_000, stdout=StringIO())
+        self.assertIn("thread_detail_big", results)
+        self.assertIn("dashboard", results)  # staff "admin" จาก setUpTestData
+        self.assertTrue(all(r["status"] == 200 for r in results.values()))
+        self.assertEqual(results["home_anon"]["queries"], 0)  # รอบที่วัดโดนแคชทั้งหน้าแล้ว
+
+    def test_compare_flags_query_growth_but_tolerates_noise(self):
+        from .benchmark import compare
+        before = {"home": {"p95_ms": 10.0, "queries": 6, "bytes": 1000, "status": 200}}
+        self.assertEqual(compare({"home": {**before["home"], "p95_ms": 14.0}}, before), [])
+        self.assertEqual(compare({"home": {**before["home"], "queries": 7}}, before),
+                         [("home", "queries", 6, 7)])
+        self.assertEqual(compare({"home": {**before["home"], "p95_ms": 30.0, "bytes": 2000}}, before),
+                         [("home", "p95_ms", 10.0, 30.0), ("home", "bytes", 1000, 2000)])
+
+
+class InstrumentTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        instrument.stats.reset()
+
+    @override_settings(FORUM_SERVER_TIMING="all")
+    def test_server_timing_matches_queries_run(self):
+        t = self.make_thread()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(reverse("forum:thread_detail", args=[t.id]))
+        timing = r["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing)
+        self.assertIn("tpl;dur=", timing)
+        self.assertGreater(instrument.stats.snapshot()["routes"][0]["render_ms"], 0)
+
+    def test_server_timing_staff_only_by_default(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("forum:home")))
+        self.client.force_login(self.staff)
+        self.assertIn("Server-Timing", self.client.get(reverse("forum:home")))
+
+    def test_cache_hits_grouped_by_family(self):
+        self.make_thread()
+        self.client.force_login(self.user)
+        self.client.get(reverse("forum:home"))
+        self.client.get(reverse("forum:home"))
+        snap = instrument.stats.snapshot()
+        home = next(r for r in snap["routes"] if r["route"] == "forum:home")
+        self.assertEqual(home["count"], 2)
+        trending_ = next(f for f in snap["families"] if f["family"] == "trending")
+        self.assertEqual((trending_["hit"], trending_["miss"]), (1, 1))
+        self.assertNotIn("c", {f["family"] for f in snap["families"]})  # key ของ cachetags ไม่ถูกนับซ้ำ
+
+    @override_settings(FORUM_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_with_slowest_queries(self):
+        t = self.make_thread()
+        with self.assertLogs("forum.slow", "WARNING") as logs:
+            self.client.get(reverse("forum:thread_detail", args=[t.id]))
+        self.assertIn(f"/threads/{t.id}/", logs.output[0])
+        slow = instrument.stats.snapshot()["slow"][0]
+        self.assertEqual(slow["route"], "forum:thread_detail")
+        self.assertTrue(slow["slowest"] and slow["slowest"][0][1].startswith("SELECT"))
+
+    def test_perf_panel_is_staff_only(self):
+        import os
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("adminpanel:perf")).status_code, 302)
+        self.client.force_login(self.staff)
+        self.client.get(reverse("forum:home"))
+        r = self.client.get(reverse("adminpanel:perf"))
+        self.assertContains(r, "forum:home")
+        data = self.client.get(reverse("adminpanel:perf"), {"format": "json"}).json()
+        self.assertEqual(data["pid"], os.getpid())
+
+
+@override_settings(FORUM_METRICS_TOKEN="scrape-me")
+class MetricsTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def scrape(self):
+        r = self.client.get(reverse("forum:metrics"), HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(r.status_code, 200)
+        return r.content.decode()
+
+    def test_latency_histogram_queries_and_cache_per_view(self):
+        self.make_thread()
+        self.client.force_login(self.user)
+        self.client.get(reverse("forum:home"))
+        self.client.get(reverse("forum:home"))
+        body = self.scrape()
+        labels = 'method="GET",status="2xx",view="forum:home"'
+        self.assertIn(f'forum_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2\n', body)
+        self.assertIn(f"forum_http_request_duration_seconds_count{{{labels}}} 2\n", body)
+        self.assertIn('forum_db_queries_total{view="forum:home"}', body)
+        self.assertIn('forum_cache_requests_total{family="trending",result="hit"} 1\n', body)
+        self.assertIn('forum_cache_requests_total{family="trending",result="miss"} 1\n', body)
+
+    @override_settings(FORUM_RATELIMITS={"forum.thread_like_toggle": "1/m"})
+    def test_ratelimit_rejections_and_upload_sizes(self):
+        t = self.make_thread()
+        self.client.force_login(self.user)
+        url = reverse("forum:thread_like_toggle", args=[t.id])
+        for _ in range(3):
+            self.client.post(url, HTTP_ACCEPT="application/json")
+        self.client.post(reverse("forum:thread_create"), {
+            "title": "x", "image": SimpleUploadedFile("x.jpg", b"0" * 20000, content_type="image/jpeg"),
+        })
+        body = self.scrape()
+        self.assertIn('forum_ratelimit_rejections_total{group="forum.thread_like_toggle"} 2\n', body)
+        self.assertIn('forum_upload_bytes_bucket{view="forum:thread_create",le="16384"} 0\n', body)
+        self.assertIn('forum_upload_bytes_bucket{view="forum:thread_create",le="65536"} 1\n', body)
+        self.assertIn('forum_upload_bytes_sum{view="forum:thread_create"} 20000\n', body)
+
+    def test_scrape_sums_values_flushed_by_other_workers(self):
+        # worker อื่น flush ลง store เดียวกันแล้ว + ค่าที่ยังค้างใน process นี้
+        metrics.store().push({'forum_ratelimit_rejections_total\tgroup="g"\t': 3})
+        metrics.inc("forum_ratelimit_rejections_total", group="g")
+        self.assertIn('forum_ratelimit_rejections_total{group="g"} 4\n', metrics.render())
+
+    def test_requires_token_or_staff(self):
+        url = reverse("forum:metrics")
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer nope").status_code, 401)
+        with self.settings(FORUM_METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.client.force_login(self.staff)
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class RateLimitTests(ForumTestCase):
+    def test_sliding_window_weights_previous_window(self):
+        from .ratelimit import hit
+        for _ in range(10):
+            self.assertEqual(hit("g", "ip1", "10/m", now=600.0), (False, 0))
+        self.assertEqual(hit("g", "ip1", "10/m", now=630.0), (True, 30))  # ครั้งที่ 11 ในช่องเดียวกัน
+        self.assertTrue(hit("g", "ip1", "10/m", now=660.0)[0])            # 11×1.0 + 1 ช่องก่อนยังนับเต็ม
+        self.assertFalse(hit("g", "ip1", "10/m", now=695.0)[0])           # 11×(25/60) + 2 ≈ 6.6
+        self.assertFalse(hit("g", "ip2", "10/m", now=630.0)[0])
+
+    @override_settings(FORUM_RATELIMITS={"forum.thread_like_toggle": "2/m"})
+    def test_view_returns_429_with_retry_after(self):
+        t = self.make_thread()
+        self.client.force_login(self.user)
+        url = reverse("forum:thread_like_toggle", args=[t.id])
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, HTTP_ACCEPT="application/json").status_code, 200)
+        r = self.client.post(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(r.status_code, 429)
+        self.assertGreater(int(r["Retry-After"]), 0)
+
+    @override_settings(FORUM_RATELIMIT_BACKEND="local", FORUM_RATELIMITS={"forum.thread_detail": "1/m"})
+    def test_get_is_not_counted_for_post_only_views(self):
+        t = self.make_thread()
+        url = reverse("forum:thread_detail", args=[t.id])
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class DailyStatTests(ForumTestCase):
+    def snapshot(self):
+        # แถวที่ทุกช่องเป็น 0 (เคยมีแล้วถูกถอน) ไม่นับ — rebuild ไม่สร้างแถวแบบนั้น
+        rows = DailyStat.objects.values_list(
+            "day", "category_id", "new_users", "threads", "comments", "likes", "reports")
+        return sorted((r for r in rows if any(r[2:])), key=lambda r: (r[0], r[1] or 0))
+
+    def test_incremental_matches_rebuild(self):
+        from . import rollups
+        a, b = self.make_thread(), self.make_thread(category=self.cat2)
+        c = Comment.objects.create(thread=a, author=self.user, content="x")
+        Comment.objects.create(thread=b, author=self.user, content="y")
+        ThreadLike.objects.create(thread=a, user=self.staff)
+        Report.objects.create(target_type="thread", target_id=a.id, reporter=self.user, reason="r")
+        b.category = self.cat
+        b.save()
+        set_threads_deleted(Thread.objects.filter(pk=a.pk), True)
+        set_threads_deleted(Thread.all_objects.filter(pk=a.pk), False)
+        set_comments_deleted(Comment.objects.filter(pk=c.pk), True)
+        Thread.objects.get(pk=b.pk).delete()
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_dashboard_reads_rollups(self):
+        from django.utils import timezone
+        self.make_thread()
+        self.client.force_login(self.staff)
+        url = reverse("adminpanel:dashboard")
+        r = self.client.get(url, {"start": "2025-01-01", "end": str(timezone.localdate())})
+        self.assertEqual(r.context["total_threads"], 1)
+        self.assertEqual(r.context["total_users"], 2)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("COUNT(", sql.upper())
+
+
+class ReportQueueTests(ForumTestCase):
+    def file(self, reporter, target_type, target_id, reason="สแปม"):
+        self.client.force_login(reporter)
+        return self.client.post(reverse("forum:report_create", args=[target_type, target_id]), {"reason": reason})
+
+    def test_report_stores_target_thread_and_author(self):
+        t = self.make_thread()
+        c = Comment.objects.create(thread=t, author=self.staff, content="x")
+        self.file(self.user, "comment", c.id)
+        r = Report.objects.get()
+        self.assertEqual((r.thread_id, r.target_author_id), (t.id, self.staff.id))
+        self.assertEqual(self.file(self.user, "comment", 999999).status_code, 404)
+
+    def test_queue_groups_by_target_and_resolve_closes_all(self):
+        a, b = self.make_thread(), self.make_thread()
+        for reporter in (self.user, self.staff):
+            self.file(reporter, "thread", a.id)
+        self.file(self.user, "thread", a.id, reason="ซ้ำ")
+        self.file(self.user, "thread", b.id)
+        self.client.force_login(self.staff)
+        r = self.client.get(reverse("adminpanel:admin_reports"))
+        rows = r.context["page_obj"].object_list
+        self.assertEqual([(x["target_id"], x["open_count"], x["reporters"]) for x in rows],
+                         [(a.id, 3, 2), (b.id, 1, 1)])
+        self.client.post(reverse("adminpanel:report_target_resolve", args=["thread", a.id]))
+        self.assertEqual(Report.objects.filter(status="open").count(), 1)
+        self.assertEqual(DailyStat.objects.filter(category=None).get().reports, 1)
+
+    def test_delete_target_soft_deletes_and_closes(self):
+        t = self.make_thread()
+        self.file(self.user, "thread", t.id)
+        rid = Report.objects.get().id
+        self.client.force_login(self.staff)
+        self.client.post(reverse("adminpanel:report_delete_target", args=[rid]))
+        t.refresh_from_db()
+        self.assertTrue(t.is_deleted)
+        self.assertEqual(Report.objects.get().status, "closed")
+
+
+@override_settings(FORUM_MODERATION_RUNNER="sync", FORUM_MODERATION_CHUNK=2, FORUM_MODERATION_PAUSE=0)
+class ModerationJobTests(ForumTestCase):
+    def bulk(self, **data):
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("forum:admin_threads_bulk"), data)
+
+    def test_filter_scope_runs_in_chunks_and_fixes_counters(self):
+        threads = [self.make_thread() for _ in range(5)]
+        self.make_thread(category=self.cat2)
+        r = self.bulk(action="delete", scope="filter", cat=self.cat.id, status="active")
+        self.assertRedirects(r, reverse("adminpanel:job_list"))
+        job = ModerationJob.objects.get()
+        self.assertEqual((job.status, job.total, job.processed, job.affected, job.last_id),
+                         ("done", 5, 5, 5, threads[-1].id))
+        self.cat.refresh_from_db()
+        self.assertEqual(self.cat.thread_count, 0)
+        self.assertEqual(Thread.objects.filter(is_deleted=False).count(), 1)
+        self.assertEqual(DailyStat.objects.get(category=self.cat).threads, 0)
+
+    def test_search_filter_scope_is_not_capped(self):
+        Thread.objects.bulk_create([Thread(category=self.cat, author=self.user, title=f"spam wave {i}", content="x")
+                                    for i in range(1205)])
+        keep = self.make_thread(title="ปกติ")
+        search.rebuild()
+        self.bulk(action="delete", scope="filter", q="spam", status="active")
+        job = ModerationJob.objects.get()
+        self.assertEqual((job.status, job.total, job.affected), ("done", 1205, 1205))
+        self.assertEqual(list(Thread.objects.values_list("id", flat=True)), [keep.id])
+
+    def test_move_updates_both_categories(self):
+        t = self.make_thread()
+        Comment.objects.create(thread=t, author=self.user, content="x")
+        self.bulk(action="move", ids=[t.id], category=self.cat2.id)
+        self.cat.refresh_from_db()
+        self.cat2.refresh_from_db()
+        self.assertEqual((self.cat.thread_count, self.cat2.thread_count), (0, 1))
+        self.assertEqual(DailyStat.objects.get(category=self.cat2).comments, 1)
+        self.assertEqual(trending.top_ids(category_id=self.cat2.id), [t.id])
+
+    def test_user_content_purge(self):
+        spam = self.make_thread()
+        Comment.objects.create(thread=spam, author=self.staff, content="ตอบสแปม")
+        keep = self.make_thread(author=self.staff)
+        Comment.objects.create(thread=keep, author=self.user, content="สแปม")
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("adminpanel:user_content_job", args=[self.user.id]), {"action": "purge"})
+        self.assertEqual(list(ModerationJob.objects.values_list("status", flat=True)), ["done", "done"])
+        self.assertFalse(Thread.objects.filter(author=self.user).exists())
+        self.assertFalse(Comment.objects.exists())
+        keep.refresh_from_db()
+        self.assertEqual(keep.comment_count, 0)
+
+    @override_settings(FORUM_MODERATION_RUNNER="worker")
+    def test_worker_runs_queued_and_skips_cancelled(self):
+        self.make_thread()
+        a = moderation.enqueue("thread", "delete", {}, user=self.staff)
+        b = moderation.enqueue("thread", "restore", {}, user=self.staff)
+        self.assertTrue(moderation.cancel(b.pk))
+        call_command("run_moderation_jobs", stdout=StringIO())
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.status, a.affected, b.status, b.processed), ("done", 1, "cancelled", 0))
+        r = self.client.get(reverse("adminpanel:job_status"), {"id": [a.id, b.id]})
+        self.assertEqual(r.status_code, 302)  # ต้องเป็น staff
+        self.client.force_login(self.staff)
+        r = self.client.get(reverse("adminpanel:job_status"), {"id": [a.id]})
+        self.assertEqual(r.json()["jobs"][0]["percent"], 100)
+
+
+class ParticipantTests(ForumTestCase):
+    def rows(self):
+        return {(p.user_id, p.thread_id): p.reply_count for p in ThreadParticipant.objects.all()}
+
+    def test_maintained_on_create_delete_and_restore(self):
+        a, b = self.make_thread(), self.make_thread()
+        c1 = Comment.objects.create(thread=a, author=self.staff, content="1")
+        c2 = Comment.objects.create(thread=a, author=self.staff, content="2")
+        Comment.objects.create(thread=b, author=self.staff, content="3")
+        self.assertEqual(self.rows(), {(self.staff.id, a.id): 2, (self.staff.id, b.id): 1})
+        p = ThreadParticipant.objects.get(thread=a)
+        self.assertEqual((p.first_reply_at, p.last_reply_at), (c1.created_at, c2.created_at))
+
+        c2.is_deleted = True
+        c2.save(update_fields=["is_deleted"])
+        p.refresh_from_db()
+        self.assertEqual((p.reply_count, p.last_reply_at), (1, c1.created_at))
+        set_comments_deleted(Comment.objects.filter(pk=c1.pk), True)
+        self.assertEqual(self.rows(), {(self.staff.id, b.id): 1})
+        set_comments_deleted(Comment.all_objects.filter(thread=a), False)
+        self.assertEqual(self.rows()[(self.staff.id, a.id)], 2)
+
+        b.delete()  # CASCADE ทั้งกระทู้
+        participants.rebuild()
+        self.assertEqual(self.rows(), {(self.staff.id, a.id): 2})
+
+    def test_replies_tab_orders_by_last_reply(self):
+        old, new = self.make_thread(title="เก่า"), self.make_thread(title="ใหม่")
+        Comment.objects.create(thread=new, author=self.staff, content="x")
+        Comment.objects.create(thread=old, author=self.staff, content="x")
+        self.make_thread(is_deleted=True)
+        url = reverse("accounts:profile_detail", args=[self.staff.username])
+        r = self.client.get(url, {"tab": "replies"})
+        self.assertEqual([t.id for t in r.context["page_obj"]], [old.id, new.id])
+        self.assertEqual(r.context["replies_count"], 2)
+        set_threads_deleted(Thread.objects.filter(pk=old.pk), True)
+        r = self.client.get(url, {"tab": "replies"})
+        self.assertEqual([t.id for t in r.context["page_obj"]], [new.id])
+
+
+class SearchTests(ForumTestCase):
+    def test_segment_thai_bigrams(self):
+        self.assertEqual(search.segment("ไดโน Rex!"), "ได ดโ โน rex")
+
+    def test_thai_substring_and_ranking(self):
+        a = self.make_thread(title="สวัสดีไดโนเสาร์", content="ทักทาย")
+        b = self.make_thread(title="อื่น ๆ", content="เจอไดโนเสาร์ที่พิพิธภัณฑ์")
+        self.make_thread(title="ไม่เกี่ยว", content="ปลา")
+        self.assertEqual(search.search_thread_ids("ไดโน"), [a.id, b.id])
+
+    def test_comment_and_author_match(self):
+        t = self.make_thread(title="หัวข้อ", content="x")
+        c = Comment.objects.create(thread=t, author=self.staff, content="fossil hunting")
+        self.assertEqual(search.search_thread_ids("foss"), [t.id])
+        self.assertEqual(search.search_thread_ids("admin"), [t.id])
+
+        set_comments_deleted(Comment.objects.filter(pk=c.pk), True)
+        self.assertEqual(search.search_thread_ids("fossil"), [])
+
+    def test_deleted_threads_hidden_unless_requested(self):
+        t = self.make_thread(title="trex", is_deleted=True)
+        self.assertEqual(search.search_thread_ids("trex"), [])
+        self.assertEqual(search.search_thread_ids("trex", include_deleted=True), [t.id])
+
+    def test_comment_heavy_thread_does_not_crowd_out_others(self):
+        big = self.make_thread(title="หัวข้อ", content="x")
+        Comment.objects.bulk_create([Comment(thread=big, author=self.user, content="fossil", number=i)
+                                     for i in range(1, 1101)])
+        # เอกสารยาวกว่า → คะแนนต่ำกว่าคอมเมนต์สั้น ๆ ทั้ง 1100 อัน
+        other = self.make_thread(category=self.cat2, title="ข่าว", content="found a fossil bone " + "x " * 50)
+        search.rebuild()
+        self.assertEqual(sorted(search.search_thread_ids("fossil")), sorted([big.id, other.id]))
+        self.assertEqual(search.search_thread_ids("fossil", category_id=self.cat2.id), [other.id])
+
+    def test_candidates_are_capped_before_grouping(self):
+        threads = [self.make_thread(title=f"fossil {'x ' * i}") for i in range(5)]
+        search.rebuild()
+        with mock.patch.object(search, "SEARCH_CANDIDATES", 3):
+            # title สั้นกว่าคะแนนดีกว่า → เหลือ 3 กระทู้แรก
+            self.assertEqual(search.search_thread_ids("fossil"), [t.id for t in threads[:3]])
+
+    def test_admin_search_is_not_capped(self):
+        Thread.objects.bulk_create([Thread(category=self.cat, author=self.user, title=f"spam {i}", content="x",
+                                           is_deleted=i % 2 == 0) for i in range(1205)])
+        search.rebuild()
+        self.assertEqual(Thread.all_objects.filter(id__in=search.matching_thread_ids("spam")).count(), 1205)
+        self.client.force_login(self.staff)
+        r = self.client.get(reverse("forum:admin_threads"), {"q": "spam", "status": "all"})
+        self.assertEqual(r.context["page_obj"].paginator.count, 1205)
+
+    def test_home_search_highlights(self):
+        self.make_thread(title="ข่าว", content="<p>พบ <b>ไดโนเสาร์</b> ตัวใหม่</p>")
+        r = self.client.get(reverse("forum:home"), {"q": "ไดโน"})
+        self.assertContains(r, "<mark>ไดโน</mark>")
+
+
+class KeysetPaginationTests(ForumTestCase):
+    def test_walk_forward_and_back(self):
+        ids = [self.make_thread(title=f"t{i}").id for i in range(25)]
+        newest_first = ids[::-1]
+
+        p1 = keyset_page(Thread.objects.all(), None, per_page=10)
+        self.assertEqual([t.id for t in p1], newest_first[:10])
+        self.assertFalse(p1.has_previous)
+
+        p2 = keyset_page(Thread.objects.all(), p1.next_cursor, per_page=10)
+        p3 = keyset_page(Thread.objects.all(), p2.next_cursor, per_page=10)
+        self.assertEqual([t.id for t in p3], newest_first[20:])
+        self.assertFalse(p3.has_next)
+
+        back = keyset_page(Thread.objects.all(), p3.prev_cursor, per_page=10)
+        self.assertEqual([t.id for t in back], newest_first[10:20])
+        self.assertTrue(back.has_previous)
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        self.make_thread()
+        page = keyset_page(Thread.objects.all(), "not-a-cursor", per_page=10)
+        self.assertEqual(len(page), 1)
+
+    def test_home_uses_cursor_without_count(self):
+        for i in range(12):
+            self.make_thread(title=f"t{i}")
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(reverse("forum:home"))
+        self.assertContains(r, "cursor=")
+        self.assertFalse([q for q in ctx.captured_queries if "COUNT(" in q["sql"]])
+
+
+class TrendingTests(ForumTestCase):
+    def test_comments_outrank_bare_threads(self):
+        quiet = self.make_thread(title="เงียบ")
+        busy = self.make_thread(title="คึกคัก", category=self.cat2)
+        Comment.objects.create(thread=busy, author=self.user, content="1")
+        self.assertEqual(trending.top_ids(2), [busy.id, quiet.id])
+        self.assertEqual(trending.top_ids(5, category_id=self.cat.id), [quiet.id])
+
+    def test_unlike_and_soft_delete_undo_score(self):
+        t = self.make_thread()
+        board = zset.get_sorted_set(f"trending:{trending.current_era()}:all")
+        base = board.score(t.id)
+        like = ThreadLike.objects.create(thread=t, user=self.staff)
+        self.assertGreater(board.score(t.id), base)
+        like.delete()
+        self.assertAlmostEqual(board.score(t.id) / base, 1.0)
+
+        set_threads_deleted(Thread.objects.filter(pk=t.pk), True)
+        self.assertEqual(trending.top_ids(), [])
+        set_threads_deleted(Thread.all_objects.filter(pk=t.pk), False)
+        self.assertEqual(trending.top_ids(), [t.id])
+
+    def test_withdraw_does_not_revive_trimmed_thread(self):
+        t = self.make_thread()
+        like = ThreadLike.objects.create(thread=t, user=self.staff)
+        board = zset.get_sorted_set(f"trending:{trending.current_era()}:all")
+        board.remove(t.id)  # ถูกตัดหางไปแล้ว (trim)
+        like.delete()
+        self.assertIsNone(board.score(t.id))
+
+    def test_refresh_matches_incremental_score(self):
+        t = self.make_thread()
+        Comment.objects.create(thread=t, author=self.user, content="1")
+        Comment.objects.create(thread=t, author=self.staff, content="2")
+        ThreadLike.objects.create(thread=t, user=self.staff)
+        era = trending.current_era()
+        scores = [zset.get_sorted_set(f"trending:{e}:all").score(t.id) for e in (era, era + 1)]
+        with self.assertNumQueries(2):  # ผลรวมของคอมเมนต์ + ไลก์ คิวรีละครั้ง
+            trending.refresh_thread(t)
+        for e, before in zip((era, era + 1), scores):
+            self.assertAlmostEqual(zset.get_sorted_set(f"trending:{e}:all").score(t.id) / before, 1.0)
+
+    def test_next_era_board_is_ready(self):
+        t = self.make_thread()
+        era = trending.current_era()
+        nxt = zset.get_sorted_set(f"trending:{era + 1}:all").score(t.id)
+        self.assertAlmostEqual(nxt / trending.event_score("thread", t.created_at, era + 1), 1.0)
+        self.assertLess(nxt, zset.get_sorted_set(f"trending:{era}:all").score(t.id))
+
+    def test_rebuild_command_and_home(self):
+        t = self.make_thread(title="มาแรงมาก")
+        zset.reset_local()
+        call_command("rebuild_trending", stdout=StringIO())
+        self.assertEqual(trending.top_ids(), [t.id])
+        r = self.client.get(reverse("forum:home"))
+        self.assertContains(r, "มาแรงมาก")
+
+
+class TagTests(ForumTestCase):
+    def test_tags_extracted_on_save_and_counted(self):
+        t = self.make_thread(title="ฟอสซิล #ไดโนเสาร์", content="ดู #T-Rex และ #ไดโนเสาร์ อีกที")
+        self.assertEqual(t.tag_list, ["ไดโนเสาร์", "t-rex"])
+        self.assertEqual(Tag.objects.get(name="ไดโนเสาร์").thread_count, 1)
+
+        t.content = "เหลือแค่ #ฟอสซิล"
+        t.save()
+        self.assertEqual(sorted(Thread.objects.get(pk=t.pk).tag_list), ["ฟอสซิล", "ไดโนเสาร์"])
+        self.assertEqual(Tag.objects.get(name="t-rex").thread_count, 0)
+
+    def test_soft_delete_and_hard_delete_adjust_counts(self):
+        t = self.make_thread(content="#ไข่")
+        other = self.make_thread(content="#ไข่")
+        set_threads_deleted(Thread.objects.filter(pk=t.pk), True)
+        self.assertEqual(Tag.objects.get(name="ไข่").thread_count, 1)
+        other.delete()
+        self.assertEqual(Tag.objects.get(name="ไข่").thread_count, 0)
+
+    def test_tag_page_and_home_render_without_regex(self):
+        for i in range(12):
+            self.make_thread(title=f"t{i}", content="#ทดสอบ")
+        self.make_thread(title="ไม่มีแท็ก")
+        url = reverse("forum:tag_detail", args=["ทดสอบ"])
+        r = self.client.get(url)
+        self.assertEqual(len(r.context["threads"]), 10)
+        r2 = self.client.get(url, {"cursor": r.context["page_obj"].next_cursor})
+        self.assertEqual(len(r2.context["threads"]), 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(reverse("forum:home"))
+        self.assertEqual(len([q for q in ctx.captured_queries if "forum_threadtag" in q["sql"]]), 1)
+        self.assertContains(r, "แท็กยอดนิยม")
+
+    def test_rebuild_tags_command(self):
+        t = self.make_thread(content="#ไดโน")
+        ThreadTag.objects.all().delete()
+        Tag.objects.update(thread_count=5)
+        call_command("rebuild_tags", stdout=StringIO())
+        self.assertEqual(t.tag_list, ["ไดโน"])
+        self.assertEqual(Tag.objects.get(name="ไดโน").thread_count, 1)
+
+
+class CommentPaginationTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        self.thread = self.make_thread()
+        self.comments = [
+            Comment.objects.create(thread=self.thread, author=self.user, content=f"c{i}") for i in range(70)
+        ]
+
+    def test_numbers_are_sequential_and_survive_deletes(self):
+        self.assertEqual([c.number for c in self.comments[:3]], [1, 2, 3])
+        self.comments[-1].delete()
+        c = Comment.objects.create(thread=self.thread, author=self.user, content="ใหม่")
+        self.assertEqual(c.number, 71)
+
+    def test_detail_renders_one_page_and_fragment_continues(self):
+        from .views import COMMENTS_PER_PAGE
+        r = self.client.get(reverse("forum:thread_detail", args=[self.thread.id]))
+        self.assertEqual(len(r.context["comments"]), COMMENTS_PER_PAGE)
+        self.assertContains(r, "comments-more")
+
+        cursor = r.context["comment_page"].next_cursor
+        frag = self.client.get(reverse("forum:thread_comments", args=[self.thread.id]), {"cursor": cursor})
+        self.assertEqual(frag.context["comments"][0].number, COMMENTS_PER_PAGE + 1)
+        self.assertNotContains(frag, "<html")
+
+    def test_permalink_jumps_to_comment(self):
+        r = self.client.get(reverse("forum:comment_permalink", args=[self.thread.id, 55]))
+        self.assertEqual(r.status_code, 302)
+        self.assertTrue(r["Location"].endswith(f"#comment-{self.comments[54].id}"))
+        page = self.client.get(r["Location"].split("#")[0])
+        self.assertEqual(page.context["comments"][0].number, 55)
+        self.assertTrue(page.context["comment_page"].has_previous)
+        self.assertEqual(
+            self.client.get(reverse("forum:comment_permalink", args=[self.thread.id, 999])).status_code, 404
+        )
+
+
+class QueryCountTests(ForumTestCase):
+    """จำนวน query ของหน้าหลักต้องคงที่ ไม่โตตามจำนวนกระทู้/คอมเมนต์/ผู้เขียนในหน้า"""
+
+    HOME_QUERIES = 6      # threads, trending, แท็ก, หมวด (dropdown), หมวดยอดนิยม, tag cloud
+    DETAIL_QUERIES = 3    # thread+author+profile, แท็ก, comments+author+profile
+    PAGE_TAG_QUERIES = 1  # ผู้ไม่ล็อกอิน + cache เย็น: หมวด/ผู้ตั้งกระทู้เพื่อรู้ tag ของแคชหน้า
+
+    def add_threads(self, n):
+        for i in range(n):
+            author = User.objects.create(username=f"writer{self.id_seq}")
+            self.id_seq += 1
+            t = self.make_thread(author=author, title=f"t{i} #แท็ก{i}")
+            Comment.objects.create(thread=t, author=self.user, content="ตอบ")
+
+    def add_comments(self, thread, n):
+        for _ in range(n):
+            author = User.objects.create(username=f"reader{self.id_seq}")
+            self.id_seq += 1
+            Comment.objects.create(thread=thread, author=author, content="ตอบ")
+
+    def setUp(self):
+        super().setUp()
+        self.id_seq = 0
+
+    def assert_home_queries(self):
+        cache.clear()
+        with self.assertNumQueries(self.HOME_QUERIES):
+            self.client.get(reverse("forum:home"))
+
+    def test_home_query_count_is_constant(self):
+        self.add_threads(2)
+        self.assert_home_queries()
+        self.add_threads(10)
+        self.assert_home_queries()
+
+    def test_thread_detail_query_count_is_constant(self):
+        t = self.make_thread()
+        url = reverse("forum:thread_detail", args=[t.id])
+        self.add_comments(t, 2)
+        with self.assertNumQueries(self.PAGE_TAG_QUERIES + self.DETAIL_QUERIES):
+            self.client.get(url)
+        self.add_comments(t, 20)
+        with self.assertNumQueries(self.PAGE_TAG_QUERIES + self.DETAIL_QUERIES):
+            self.client.get(url)
+
+    def test_logged_in_navbar_uses_cached_card(self):
+        t = self.make_thread()
+        self.client.force_login(self.user)
+        url = reverse("forum:thread_detail", args=[t.id])
+        self.client.get(url)  # โหลดการ์ดชื่อ/รูปของผู้ใช้ลง cache
+        # + session user, ไลก์ของผู้ใช้
+        with self.assertNumQueries(self.DETAIL_QUERIES + 2):
+            r = self.client.get(url)
+        self.assertContains(r, "navbar-avatar")
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN ของ SQLite")
+class IndexPlanTests(ForumTestCase):
+    """query จริงของหน้าที่ถูกเรียกบ่อยต้องวิ่งบน partial/composite index ที่ตั้งไว้ ไม่ใช่ SCAN + sort"""
+
+    def plans(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+        out = []
+        with connection.cursor() as cur:
+            for q in ctx.captured_queries:
+                if q["sql"].startswith("SELECT"):
+                    cur.execute("EXPLAIN QUERY PLAN " + q["sql"])
+                    out.append(" ".join(row[-1] for row in cur.fetchall()))
+        return "\n".join(out)
+
+    def setUp(self):
+        super().setUp()
+        self.t = self.make_thread()
+        self.make_thread(is_deleted=True)
+        Comment.objects.create(thread=self.t, author=self.user, content="x")
+        ThreadLike.objects.create(thread=self.t, user=self.user)
+
+    def test_feeds_use_live_indexes(self):
+        self.assertIn("forum_thread_live_idx", self.plans(reverse("forum:home")))
+        self.assertIn("forum_thread_cat_live_idx", self.plans(reverse("forum:home"), cat=self.cat.id))
+        self.assertIn("forum_thread_author_live_idx",
+                      self.plans(reverse("accounts:profile_detail", args=[self.user.username]), tab="threads"))
+
+    def test_thread_detail_uses_comment_and_like_indexes(self):
+        self.client.force_login(self.user)
+        plan = self.plans(reverse("forum:thread_detail", args=[self.t.id]))
+        self.assertIn("forum_comment_live_idx", plan)
+        self.assertIn("forum_threadlike_thread_id_user_id", plan)  # unique (thread, user)
+        with connection.cursor() as cur:
+            cur.execute("EXPLAIN QUERY PLAN " + str(ThreadLike.objects.filter(user=self.user).values("thread_id").query))
+            self.assertIn("forum_threadlike_user_idx", " ".join(r[-1] for r in cur.fetchall()))
+
+    def test_report_queue_uses_status_index(self):
+        Report.objects.create(target_type="thread", target_id=self.t.id, thread=self.t, reporter=self.user, reason="r")
+        self.client.force_login(self.staff)
+        self.assertIn("forum_report_open_idx", self.plans(reverse("adminpanel:admin_reports")))
+
+
+class PageCacheTests(ForumTestCase):
+    def test_anonymous_hit_skips_db(self):
+        t = self.make_thread()
+        url = reverse("forum:thread_detail", args=[t.id])
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "miss")
+        with self.assertNumQueries(0):
+            r = self.client.get(url)
+        self.assertEqual(r["X-Page-Cache"], "hit")
+        self.assertIn("Cookie", r["Vary"])
+
+    def test_write_bumps_generation(self):
+        t = self.make_thread()
+        url = reverse("forum:thread_detail", args=[t.id])
+        self.client.get(reverse("forum:home"))
+        self.client.get(url)
+        Comment.objects.create(thread=t, author=self.user, content="คอมเมนต์ใหม่")
+        r = self.client.get(url)
+        self.assertEqual(r["X-Page-Cache"], "miss")
+        self.assertContains(r, "คอมเมนต์ใหม่")
+        self.assertEqual(self.client.get(reverse("forum:home"))["X-Page-Cache"], "miss")
+
+    def test_other_thread_stays_cached(self):
+        a, b = self.make_thread(), self.make_thread()
+        url = reverse("forum:thread_detail", args=[a.id])
+        self.client.get(url)
+        Comment.objects.create(thread=b, author=self.user, content="ตอบ")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "hit")
+
+    def test_category_rename_and_author_profile_invalidate_thread_page(self):
+        t = self.make_thread()
+        url = reverse("forum:thread_detail", args=[t.id])
+        self.client.get(url)
+        self.cat.name = "หมวดใหม่"
+        self.cat.save()
+        r = self.client.get(url)
+        self.assertEqual(r["X-Page-Cache"], "miss")
+        profile = self.user.profile
+        profile.display_name = "ไดโนใจดี"
+        profile.save()
+        r = self.client.get(url)
+        self.assertEqual(r["X-Page-Cache"], "miss")
+        self.assertContains(r, "ไดโนใจดี")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "hit")
+
+    def test_key_encodes_param_values(self):
+        from django.test import RequestFactory
+        from .pagecache import _key
+        rf = RequestFactory()
+        params = ("q", "cat")
+        self.assertNotEqual(_key(rf.get("/", {"q": "a&cat=1"}), params), _key(rf.get("/", {"q": "a", "cat": "1"}), params))
+
+    def test_logged_in_bypasses_cache(self):
+        t = self.make_thread()
+        url = reverse("forum:thread_detail", args=[t.id])
+        self.client.get(url)
+        self.client.force_login(self.user)
+        r = self.client.get(url)
+        self.assertNotIn("X-Page-Cache", r)
+        self.assertIn("Cookie", r["Vary"])
+
+
+class CacheTagTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        cachetags.reset_stats()
+
+    def test_invalidate_by_tag_and_count_hits(self):
+        calls = []
+        def compute():
+            calls.append(1)
+            return len(calls)
+        get = lambda: cachetags.get_or_set("demo", "k", compute, [cachetags.thread(1), cachetags.TRENDING])
+        self.assertEqual((get(), get()), (1, 1))
+        cachetags.invalidate(cachetags.thread(2))
+        self.assertEqual(get(), 1)
+        cachetags.invalidate(cachetags.TRENDING)
+        self.assertEqual(get(), 2)
+        self.assertEqual(cachetags.stats()["demo"], {"hit": 2, "miss": 2})
+
+    def test_bulk_delete_drops_thread_from_trending_box(self):
+        t = self.make_thread(title="ไทรันโนซอรัส")
+        self.assertContains(self.client.get(reverse("forum:home"), {"q": "x"}), "ไทรันโนซอรัส")
+        set_threads_deleted(Thread.objects.filter(pk=t.pk), True)
+        self.assertNotContains(self.client.get(reverse("forum:home"), {"q": "x"}), "ไทรันโนซอรัส")
+
+    def test_edit_refreshes_trending_title(self):
+        t = self.make_thread(title="ชื่อเดิม")
+        self.client.get(reverse("forum:home"), {"q": "x"})
+        t.title = "ชื่อใหม่"
+        t.save()
+        r = self.client.get(reverse("forum:home"), {"q": "x"})
+        self.assertContains(r, "ชื่อใหม่")
+        self.assertEqual(cachetags.stats()["trending"], {"hit": 0, "miss": 2})
+
+
+def _jpeg_bytes(size=(2000, 1500)):
+    from PIL import Image
+    buf = BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(buf, "JPEG", quality=95)
+    return buf.getvalue()
+
+
+@override_settings(FORUM_IMAGE_PIPELINE="sync")
+class ImageVariantTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_upload_builds_variants_after_commit(self):
+        original = _jpeg_bytes()
+        with self.captureOnCommitCallbacks(execute=True):
+            t = self.make_thread(image=SimpleUploadedFile("big.jpg", original, content_type="image/jpeg"))
+        t.refresh_from_db()
+        self.assertEqual(sorted(t.image_variants["webp"], key=int), ["240", "480", "960"])
+        small = t.image_variants["jpeg"]["240"]
+        self.assertTrue(default_storage.exists(small))
+        self.assertLess(default_storage.size(small) * 10, len(original))
+
+        r = self.client.get(reverse("forum:home"))
+        self.assertContains(r, 'type="image/webp"')
+        self.assertContains(r, "240w")
+
+    def test_replacing_image_resets_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            t = self.make_thread(image=SimpleUploadedFile("a.jpg", _jpeg_bytes(), content_type="image/jpeg"))
+        t = Thread.objects.get(pk=t.pk)
+        t.image = SimpleUploadedFile("b.jpg", _jpeg_bytes((300, 200)), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            t.save()
+        self.assertEqual(Thread.objects.get(pk=t.pk).image_variants, {})
+        for cb in callbacks:
+            cb()
+        # เล็กกว่าความกว้างเป้าหมาย → ไม่ขยาย ใช้ 240 กับขนาดจริง 300
+        self.assertEqual(sorted(Thread.objects.get(pk=t.pk).image_variants["jpeg"], key=int), ["240", "300"])
+
+    def test_replaced_or_deleted_image_removes_old_variant_files(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            t = self.make_thread(image=SimpleUploadedFile("a.jpg", _jpeg_bytes(), content_type="image/jpeg"))
+            c = Comment.objects.create(thread=t, author=self.user, content="x",
+                                       image=SimpleUploadedFile("c.jpg", _jpeg_bytes(), content_type="image/jpeg"))
+        t.refresh_from_db()
+        old = [n for fmt in ("webp", "jpeg") for n in t.image_variants[fmt].values()]
+        self.assertTrue(all(default_storage.exists(n) for n in old))
+        t.image = SimpleUploadedFile("b.jpg", _jpeg_bytes((300, 200)), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            t.save()
+        self.assertFalse(any(default_storage.exists(n) for n in old))
+
+        t.refresh_from_db()
+        c.refresh_from_db()
+        files = [n for obj in (t, c) for fmt in ("webp", "jpeg") for n in obj.image_variants[fmt].values()]
+        self.assertTrue(files and all(default_storage.exists(n) for n in files))
+        with self.captureOnCommitCallbacks(execute=True):
+            Thread.all_objects.get(pk=t.pk).delete()  # ลบจริง: คอมเมนต์ถูกลบตาม CASCADE
+        self.assertFalse(any(default_storage.exists(n) for n in files))
+
+    def test_new_avatar_removes_old_variant_files(self):
+        profile = self.user.profile
+        profile.avatar = SimpleUploadedFile("a.jpg", _jpeg_bytes(), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        profile.refresh_from_db()
+        old = list(profile.avatar_variants["jpeg"].values())
+        self.assertTrue(old and all(default_storage.exists(n) for n in old))
+        profile.avatar = SimpleUploadedFile("b.jpg", _jpeg_bytes(), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertFalse(any(default_storage.exists(n) for n in old))
+
+    def test_full_save_keeps_variants_built_meanwhile(self):
+        t = self.make_thread()
+        c = Comment.objects.create(thread=t, author=self.user, content="ก่อนแก้")
+        profile = self.user.profile
+        # งานเบื้องหลังเขียนไฟล์ย่อ ระหว่างที่ฟอร์มแก้ไขถือ instance เก่า ({}) ไว้
+        Comment.objects.filter(pk=c.pk).update(image_variants={"jpeg": {"240": "x.jpg"}})
+        type(profile).objects.filter(pk=profile.pk).update(avatar_variants={"jpeg": {"240": "a.jpg"}})
+        c.content = "แก้แล้ว"
+        c.save()
+        profile.bio = "สวัสดี"
+        profile.save()
+        c.refresh_from_db()
+        profile.refresh_from_db()
+        self.assertEqual((c.content, c.image_variants), ("แก้แล้ว", {"jpeg": {"240": "x.jpg"}}))
+        self.assertEqual((profile.bio, profile.avatar_variants), ("สวัสดี", {"jpeg": {"240": "a.jpg"}}))
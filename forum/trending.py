@@ -0,0 +1,196 @@
+# forum/trending.py
+"""
+กระทู้มาแรงแบบอัปเดตทีละเหตุการณ์ (ไม่ต้อง aggregate ย้อนหลัง 7 วันทุกครั้งที่ cache หมด)
+
+คะแนนแบบ decay ตามเวลา (forward decay):
+    score(now) = Σ weight_i · 2^(-(now - t_i) / half_life)
+เก็บในรูป Σ weight_i · 2^((t_i - epoch) / half_life) ซึ่งอันดับเท่ากันทุกช่วงเวลา
+จึงบวกเพิ่มได้ทันทีที่มีเหตุการณ์ (ZINCRBY) โดยไม่ต้องไล่ลดคะแนนของกระทู้อื่น
+และถอนเหตุการณ์ได้ตรงตัวด้วยเวลาเดิม (เช่น unlike ใช้ created_at ของไลก์นั้น)
+
+- leaderboard รวม + แยกตามหมวด (get_sorted_set ใน forum/zset.py, top-N = O(log n + N))
+  ตัดหางแบบสุ่มเหลือ MAX_MEMBERS — การถอนคะแนน (sign=-1) แตะเฉพาะสมาชิกที่ยังอยู่ (ZADD XX INCR)
+  กระทู้ที่ถูกตัดไปแล้วจึงไม่กลับมาด้วยคะแนนติดลบ และคะแนนที่เหลือ <= 0 ถูกลบออก
+- 2^(t/half_life) ล้น float เมื่อผ่านไป ~1000 half-life จึงแบ่งเป็นช่วง (era) ละ ERA_HALF_LIVES
+  แต่ละ era มี epoch ของตัวเอง ทุกเหตุการณ์เขียนลง board ของ era ปัจจุบันและ era ถัดไป
+  พอข้าม era ก็อ่าน board ถัดไปได้ทันทีโดยประวัติไม่หาย (ตัวเลขอยู่ในช่วง ±2^128 เสมอ)
+- ปรับได้ใน settings:
+    FORUM_TRENDING_HALF_LIFE_HOURS (ค่าเริ่มต้น 24)
+    FORUM_TRENDING_WEIGHTS         (ค่าเริ่มต้น thread=1, comment=2, like=1)
+- python manage.py rebuild_trending สร้างใหม่จาก DB (และล้าง board ของ era ก่อนหน้า)
+"""
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import DateTimeField, FloatField, Func, Sum, Value
+from django.db.models.functions import Power
+from django.utils import timezone
+
+from .models import Category, Thread, Comment, ThreadLike
+from .zset import get_sorted_set
+
+DEFAULT_WEIGHTS = {"thread": 1.0, "comment": 2.0, "like": 1.0}
+MAX_MEMBERS = 1000          # เก็บแค่อันดับต้น ๆ ต่อ leaderboard
+ERA_HALF_LIVES = 64
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+TRIM_PROBABILITY = 0.01     # ตัดหางทุก ~100 เหตุการณ์
+
+
+def _half_life_seconds():
+    return float(getattr(settings, "FORUM_TRENDING_HALF_LIFE_HOURS", 24)) * 3600
+
+
+def _era_seconds():
+    return ERA_HALF_LIVES * _half_life_seconds()
+
+
+def _era_start(era):
+    return EPOCH + timedelta(seconds=era * _era_seconds())
+
+
+def current_era(now=None):
+    now = now or timezone.now()
+    return int((now - EPOCH).total_seconds() // _era_seconds())
+
+
+def _weight(event):
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, "FORUM_TRENDING_WEIGHTS", {})}
+    return float(weights[event])
+
+
+def event_score(event, when=None, era=None):
+    when = when or timezone.now()
+    era = current_era() if era is None else era
+    elapsed = (when - EPOCH).total_seconds() - era * _era_seconds()
+    return _weight(event) * 2 ** (elapsed / _half_life_seconds())
+
+
+def _board(era, category_id=None):
+    scope = f"cat:{category_id}" if category_id else "all"
+    return get_sorted_set(f"trending:{era}:{scope}")
+
+
+def _boards(category_id, era):
+    boards = [_board(era)]
+    if category_id:
+        boards.append(_board(era, category_id))
+    return boards
+
+
+def _live_eras():
+    era = current_era()
+    return (era, era + 1)
+
+
+# ===================== Events =====================
+
+def record(thread_id, category_id, event, when=None, sign=1):
+    """บวก (sign=1) หรือถอน (sign=-1) คะแนนของเหตุการณ์หนึ่งครั้ง"""
+    for era in _live_eras():
+        amount = sign * event_score(event, when, era)
+        for board in _boards(category_id, era):
+            left = board.incr(thread_id, amount, xx=sign < 0)  # ถูกตัดหางไปแล้ว → ไม่สร้างใหม่
+            if sign < 0 and left is not None and left <= 0:
+                board.remove(thread_id)
+            if random.random() < TRIM_PROBABILITY:
+                board.trim(MAX_MEMBERS)
+
+
+def remove(thread_id, category_id=None):
+    for era in _live_eras():
+        for board in _boards(category_id, era):
+            board.remove(thread_id)
+
+
+def refresh_thread(thread, old_category_id=None):
+    """คำนวณคะแนนของกระทู้เดียวใหม่จาก DB (ใช้ตอนกู้คืน/ย้ายหมวด)"""
+    remove(thread.pk, old_category_id or thread.category_id)
+    if thread.is_deleted:
+        return
+    eras = _live_eras()
+    comments = _decayed_sums(Comment.objects.filter(thread=thread), eras)
+    likes = _decayed_sums(ThreadLike.objects.filter(thread=thread), eras)
+    for era in eras:
+        score = (event_score("thread", thread.created_at, era)
+                 + _weight("comment") * comments[era] + _weight("like") * likes[era])
+        for board in _boards(thread.category_id, era):
+            board.add({thread.pk: score})
+
+
+class _SecondsSince(Func):
+    """วินาที (float) จาก start ถึงคอลัมน์ datetime — คำนวณใน DB"""
+    output_field = FloatField()
+
+    def __init__(self, expression, start):
+        super().__init__(expression, Value(start, output_field=DateTimeField()))
+
+    def as_sqlite(self, compiler, connection, **extra):
+        return self.as_sql(compiler, connection, template="((julianday(%(expressions)s)) * 86400.0)",
+                           arg_joiner=") - julianday(", **extra)
+
+    def as_postgresql(self, compiler, connection, **extra):
+        return self.as_sql(compiler, connection, template="EXTRACT(EPOCH FROM (%(expressions)s))",
+                           arg_joiner=" - ", **extra)
+
+
+def _decayed_sums(qs, eras):
+    """{era: Σ 2^((created_at - เริ่ม era) / half_life)} ของแถวใน qs — aggregate เดียว ไม่โหลดทีละแถว"""
+    half_life = _half_life_seconds()
+    sums = qs.aggregate(**{
+        f"era{era}": Sum(Power(Value(2.0), _SecondsSince("created_at", _era_start(era)) / Value(half_life)))
+        for era in eras
+    })
+    return {era: sums[f"era{era}"] or 0.0 for era in eras}
+
+
+# ===================== Query =====================
+
+def top_ids(n=5, category_id=None):
+    board = _board(current_era(), category_id)
+    return [int(member) for member, _ in board.top(n)]
+
+
+# ===================== Rebuild =====================
+
+def rebuild(window_days=14) -> int:
+    """
+    ล้าง leaderboard แล้วคำนวณจากเหตุการณ์ในช่วง window_days ล่าสุด
+    (เหตุการณ์ที่เก่ากว่านั้นหายไปเกือบหมดแล้วจาก decay)
+    คืนจำนวนกระทู้ที่มีคะแนน
+    """
+    since = timezone.now() - timedelta(days=window_days)
+    events, cats = [], {}
+
+    live = Thread.objects.all()
+    for tid, cid, when in live.filter(created_at__gte=since).values_list("id", "category_id", "created_at").iterator():
+        events.append((tid, "thread", when))
+        cats[tid] = cid
+    comments = Comment.objects.filter(thread__is_deleted=False, created_at__gte=since)
+    for tid, cid, when in comments.values_list("thread_id", "thread__category_id", "created_at").iterator():
+        events.append((tid, "comment", when))
+        cats[tid] = cid
+    likes = ThreadLike.objects.filter(thread__is_deleted=False, created_at__gte=since)
+    for tid, cid, when in likes.values_list("thread_id", "thread__category_id", "created_at").iterator():
+        events.append((tid, "like", when))
+        cats[tid] = cid
+
+    era = current_era()
+    cat_ids = list(Category.objects.values_list("id", flat=True))
+    for e in (era - 1, era, era + 1):
+        _board(e).clear()
+        for cid in cat_ids:
+            _board(e, cid).clear()
+
+    for e in _live_eras():
+        scores = {}
+        for tid, event, when in events:
+            scores[tid] = scores.get(tid, 0.0) + event_score(event, when, e)
+        per_cat = {}
+        for tid, score in scores.items():
+            if cats[tid]:
+                per_cat.setdefault(cats[tid], {})[tid] = score
+        for board, mapping in [(_board(e), scores)] + [(_board(e, cid), m) for cid, m in per_cat.items()]:
+            board.add(mapping)
+            board.trim(MAX_MEMBERS)
+    return len(cats)
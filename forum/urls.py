@@ -5,13 +5,19 @@ app_name = "forum"
 
 urlpatterns = [
     path("", views.home, name="home"),
+    path("metrics", views.metrics_export, name="metrics"),  # Prometheus (forum/metrics.py)
 
     path("threads/new/", views.thread_create, name="thread_create"),
     path("threads/<int:thread_id>/", views.thread_detail, name="thread_detail"),
+    path("threads/<int:thread_id>/comments/", views.thread_comments, name="thread_comments"),
+    path("threads/<int:thread_id>/live/", views.thread_live, name="thread_live"),
+    path("threads/<int:thread_id>/c/<int:number>/", views.comment_permalink, name="comment_permalink"),
     path("threads/<int:thread_id>/edit/", views.thread_edit, name="thread_edit"),
     path("threads/<int:thread_id>/delete/", views.thread_delete, name="thread_delete"),
     path("threads/<int:thread_id>/like/", views.thread_like_toggle, name="thread_like_toggle"),
 
+    path("tags/<path:name>/", views.tag_detail, name="tag_detail"),
+
     path("report/<str:target_type>/<int:target_id>/", views.report_create, name="report_create"),
 
     # เส้นทางแผงจัดการ (อย่าใช้ /admin/ เพราะชน Django Admin)
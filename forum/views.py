@@ -1,38 +1,38 @@
 # forum/views.py
-from datetime import timedelta
-import re
+import asyncio
+import hmac
+
+from django.conf import settings
 from django.http import Http404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
-from django.shortcuts import get_object_or_404, redirect, render
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
-from django.utils import timezone
 from django.urls import reverse
-from django.core.cache import cache
+from django.utils.http import urlencode
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Q, F, IntegerField, Value, Case, When, BooleanField
-from django.db.models.functions import Coalesce
-
-# --- Fallback สำหรับกรณีไม่มี django-ratelimit (เช่นบน Python 3.13) ---
-try:
-    from ratelimit.decorators import ratelimit
-except Exception:  # pragma: no cover
-    def ratelimit(*args, **kwargs):
-        def _wrap(fn):
-            return fn
-        return _wrap
-
-from .models import Category, Thread, Comment, Report, ThreadLike
+from django.db import transaction
+
+from .models import Category, Thread, Comment, ThreadLike, Tag, ThreadTag
 from .forms import ThreadForm, CommentForm, ReportForm
+from .counters import set_threads_deleted
+from . import search
+from . import trending as trending_engine
+from . import tags as tagging
+from .pagination import akeyset_page, keyset_page, at_cursor
+from . import aio, cachetags, likes, live, metrics, moderation, pubsub, reports
+from .pagecache import anonymous_page_cache
+from .ratelimit import client_ip, ratelimit
 
 # ===================== Constants =====================
-TRENDING_CACHE_KEY = "home:trending:top5"
+COMMENTS_PER_PAGE = 30
 
 # ===================== Helpers (DRY) =====================
 
-@ratelimit(key="ip", rate="10/m", method=["POST"], block=True)
+@ratelimit(key="user_or_ip", rate="10/m", method=["POST"], block=True)
 @login_required
 def report_create(request, target_type, target_id):
     if target_type not in ("thread", "comment"):
@@ -45,6 +45,8 @@ def report_create(request, target_type, target_id):
             r.target_type = target_type
             r.target_id = int(target_id)
             r.reporter = request.user
+            if not reports.fill_target(r):  # จด thread / เจ้าของเป้าหมายไว้ในแถวรายงาน
+                raise Http404("ไม่พบเป้าหมาย")
             r.save()
             messages.success(request, "ส่งรายงานเรียบร้อย")
             return redirect("forum:home")
@@ -60,43 +62,13 @@ def report_create(request, target_type, target_id):
 
 def _thread_base_qs():
     return (
-        Thread.objects
-        .filter(is_deleted=False)
-        .select_related("author", "category")
-    )
-
-def _with_comment_count(qs):
-    # นับเฉพาะคอมเมนต์ที่ยังไม่ถูกลบ → alias: live_comment_count
-    return qs.annotate(
-        live_comment_count=Count("comments", filter=Q(comments__is_deleted=False)),
+        Thread.objects  # LiveManager: เฉพาะกระทู้ที่ยังไม่ถูกลบ (ตรงกับ partial index ของฟีด)
+        # author__profile: ให้ |display_name ไม่ยิง query ต่อแถว
+        .select_related("author__profile", "category")
     )
 
-def _with_like_count(qs):
-    return qs.annotate(like_count=Count("likes", distinct=True))
-
-def _extract_tags_from(thread):
-    tag_re = re.compile(r"#([\wก-๙/+\-]+)")
-    tags = []
-    if thread.category_id:
-        tags.append(thread.category.name)
-    for field in (thread.title, thread.content):
-        if field:
-            tags.extend(tag_re.findall(field))
-    clean, seen = [], set()
-    for x in tags:
-        if x and x not in seen:
-            seen.add(x)
-            clean.append(x)
-    return clean
-
 # ===================== Admin: จัดการกระทู้ =====================
 
-def _annotate_counts(qs):
-    # ตั้งชื่อไม่ชน property ในโมเดล
-    return qs.annotate(
-        live_comment_count=Count("comments", filter=Q(comments__is_deleted=False))
-    )
-
 @staff_member_required
 def admin_threads(request):
     q      = (request.GET.get("q") or "").strip()
@@ -104,29 +76,24 @@ def admin_threads(request):
     status = (request.GET.get("status") or "active").strip()  # active|deleted|all
     order  = (request.GET.get("order") or "-created_at").strip()
 
-    qs = Thread.objects.select_related("author", "category")
+    qs = Thread.all_objects.select_related("author__profile", "category")
 
     if status == "active":
-        qs = qs.filter(is_deleted=False)
+        qs = qs.live()
     elif status == "deleted":
-        qs = qs.filter(is_deleted=True)
+        qs = qs.deleted()
 
     if cat:
         qs = qs.filter(category_id=cat)
 
     if q:
-        qs = qs.filter(
-            Q(title__icontains=q) |
-            Q(content__icontains=q) |
-            Q(author__username__icontains=q)
-        )
-
-    qs = _annotate_counts(qs)
+        # ค้นผ่านดัชนี full-text (forum/search.py) แทน icontains — subquery ไม่มีเพดาน แอดมินต้องเห็นครบ
+        qs = qs.filter(id__in=search.matching_thread_ids(q))
 
     order_map = {
         "-created_at": "-created_at",
         "created_at": "created_at",
-        "-comment_count": "-live_comment_count",
+        "-comment_count": "-comment_count",
     }
     qs = qs.order_by(order_map.get(order, "-created_at"))
 
@@ -141,111 +108,126 @@ def admin_threads(request):
 @staff_member_required
 @require_POST
 def admin_thread_toggle_delete(request, thread_id: int):
-    updated = Thread.objects.filter(id=thread_id).update(
-        is_deleted=Case(
-            When(is_deleted=True, then=Value(False)),
-            default=Value(True),
-            output_field=BooleanField(),
-        )
-    )
+    with transaction.atomic():
+        qs = Thread.all_objects.select_for_update().filter(id=thread_id)
+        current = qs.values_list("is_deleted", flat=True).first()
+        updated = set_threads_deleted(qs, not current) if current is not None else 0
     if updated:
-        cache.delete(TRENDING_CACHE_KEY)  # << เพิ่ม
         messages.success(request, "อัปเดตสถานะกระทู้เรียบร้อย")
     else:
         messages.error(request, "ไม่พบกระทู้ที่ต้องการ")
     return redirect(request.POST.get("next") or "forum:admin_threads")
 
+INLINE_BULK_LIMIT = 100  # เลือกมากกว่านี้ / ทุกแถวที่ตรงตัวกรอง → งานเบื้องหลัง (forum/moderation.py)
+
+def _admin_filter_scope(data):
+    """ตัวกรองของหน้า admin_threads → scope ของ ModerationJob"""
+    scope = {"status": (data.get("status") or "active").strip()}
+    cat = (data.get("cat") or "").strip()
+    if cat.isdigit():
+        scope["category_id"] = int(cat)
+    q = (data.get("q") or "").strip()
+    if q:
+        scope["q"] = q  # งานค้นเองทีละก้อน (moderation.scoped) — ไม่ snapshot id ที่มีเพดาน
+    return scope
+
 @staff_member_required
 @require_POST
 def admin_threads_bulk(request):
-    ids = request.POST.getlist("ids")
+    ids = [int(i) for i in request.POST.getlist("ids") if i.isdigit()]
     action = request.POST.get("action")
-    if not ids:
-        messages.warning(request, "ยังไม่ได้เลือกกระทู้")
-        return redirect(request.POST.get("next") or "forum:admin_threads")
-
-    qs = Thread.objects.filter(id__in=ids)
-    if action == "delete":
-        n = qs.update(is_deleted=True)
-    elif action == "restore":
-        n = qs.update(is_deleted=False)
-    else:
+    every = request.POST.get("scope") == "filter"
+    back = request.POST.get("next") or "forum:admin_threads"
+    if action not in moderation.ACTIONS["thread"]:
         messages.warning(request, "ไม่รู้จักคำสั่งที่ส่งมา")
-        return redirect(request.POST.get("next") or "forum:admin_threads")
-
-    cache.delete(TRENDING_CACHE_KEY)  # << เพิ่ม
+        return redirect(back)
+    if not ids and not every:
+        messages.warning(request, "ยังไม่ได้เลือกกระทู้")
+        return redirect(back)
+
+    category = None
+    if action == "move":
+        cat = request.POST.get("category") or ""
+        category = Category.objects.filter(pk=cat).first() if cat.isdigit() else None
+        if category is None:
+            messages.warning(request, "กรุณาเลือกหมวดปลายทาง")
+            return redirect(back)
+
+    if every or len(ids) > INLINE_BULK_LIMIT:
+        scope = _admin_filter_scope(request.POST) if every else {"ids": ids}
+        job = moderation.enqueue("thread", action, scope, category=category, user=request.user)
+        messages.success(request, f"สร้างงาน #{job.pk} แล้ว ({job.total} กระทู้) กำลังทำเบื้องหลัง")
+        return redirect("adminpanel:job_list")
+
+    category_id = category.pk if category else None
+    n = moderation.apply("thread", action, moderation.scoped("thread", action, {"ids": ids}, category_id), category_id)
     messages.success(request, f"อัปเดต {n} กระทู้แล้ว")
-    return redirect(request.POST.get("next") or "forum:admin_threads")
+    return redirect(back)
 
 # ===================== Public Views =====================
 
-def home(request):
-    # ลิสต์หลัก
-    qs = _with_like_count(_with_comment_count(_thread_base_qs())).order_by("-created_at")
+def _home_depends_on(request):
+    cat = request.GET.get("cat") or ""
+    return [cachetags.category(cat)] if cat.isdigit() else [cachetags.ALL]
+
+@anonymous_page_cache(params=("q", "cat", "page", "cursor"), depends_on=_home_depends_on, timeout=60)
+async def home(request):
+    # ลิสต์หลัก (ตัวนับอ่านจากคอลัมน์ในตาราง thread — ไม่มี JOIN/GROUP BY)
+    qs = _thread_base_qs().order_by("-created_at")
 
     # ค้นหา/กรองหมวด
     q = (request.GET.get("q") or "").strip()
     cat = (request.GET.get("cat") or "").strip()
-    if q:
-        qs = qs.filter(
-            Q(title__icontains=q) |
-            Q(content__icontains=q) |
-            Q(author__username__icontains=q)
-        )
-    if cat:
-        qs = qs.filter(category_id=cat)
+    if not cat.isdigit():
+        cat = ""
+
+    async def feed():
+        if q:
+            # ค้นผ่านดัชนี full-text: ได้ id เรียงตามความเกี่ยวข้อง แล้วค่อยดึงเฉพาะหน้าที่แสดง
+            ranked_ids = await aio.run(search.search_thread_ids, q, category_id=cat or None)
+            page_obj = Paginator(ranked_ids, 10).get_page(request.GET.get("page"))
+            by_id = await qs.ain_bulk(page_obj.object_list)
+            threads = [by_id[i] for i in page_obj.object_list if i in by_id]
+            for t in threads:
+                t.search_snippet = search.highlight(t.content, q)
+            return page_obj, threads
+        # เพจจิเนชันแบบ cursor บน (created_at, id) — ไม่มี COUNT/OFFSET
+        page_obj = await akeyset_page(qs.filter(category_id=cat) if cat else qs,
+                                      request.GET.get("cursor"), per_page=10)
+        return page_obj, page_obj.object_list
+
+    # กำลังมาแรง — leaderboard แบบ decay ตามเวลา (forum/trending.py) แยกตามหมวดที่กรองอยู่
+    async def top_trending():
+        ids = await aio.run(trending_engine.top_ids, 5, category_id=cat or None)
+        by_id = await _thread_base_qs().ain_bulk(ids)
+        return [by_id[i] for i in ids if i in by_id]
+
+    # ส่วนที่ไม่ขึ้นต่อกันยิงพร้อมกัน
+    (page_obj, threads), trending, cats, top_cats, tag_cloud, user = await asyncio.gather(
+        feed(),
+        # 1 นาที (leaderboard อัปเดตเองทุกเหตุการณ์) + ล้างทันทีเมื่อกระทู้ถูกลบ/แก้ไข (tag trending)
+        cachetags.aget_or_set("trending", f"top5:cat:{cat or 'all'}", top_trending, [cachetags.TRENDING], 60),
+        # หมวดทั้งหมด (สำหรับ dropdown)
+        aio.alist(Category.objects.all().only("id", "name").order_by("order", "name")),
+        # หมวดหมู่ยอดนิยม (thread_count = จำนวนเธรดที่ไม่ถูกลบ, เก็บเป็นคอลัมน์)
+        aio.alist(Category.objects.order_by("-thread_count", "order", "name")[:10]),
+        aio.run(tagging.tag_cloud),
+        aio.auser(request),
+    )
 
-    # เพจจิเนชัน
-    paginator = Paginator(qs, 10)
-    page_obj = paginator.get_page(request.GET.get("page"))
-
-    # หมวดทั้งหมด (สำหรับ dropdown)
-    cats = Category.objects.all().only("id", "name").order_by("order", "name")
-
-    # กำลังมาแรง (7 วัน) — คิด score = คอมเมนต์*2 + ไลก์, แคช 5 นาที
-    week_ago = timezone.now() - timedelta(days=7)
-    trending = cache.get(TRENDING_CACHE_KEY)
-    if trending is None:
-        trending_qs = (
-            _with_like_count(
-                _with_comment_count(
-                    _thread_base_qs().filter(created_at__gte=week_ago)
-                )
-            )
-            .annotate(
-                score=Coalesce(F("live_comment_count"), Value(0), output_field=IntegerField()) * 2
-                     + Coalesce(F("like_count"), Value(0), output_field=IntegerField())
-            )
-            .order_by("-score", "-created_at")[:5]
-        )
-        trending = list(trending_qs)
-        cache.set(TRENDING_CACHE_KEY, trending, 300)  # 5 นาที
-
-    # เติม tag_list ให้ลิสต์ที่จะแสดงจริง ๆ
-    threads = list(page_obj.object_list)
-    for t in threads + trending:
-        t.tag_list = _extract_tags_from(t)[:5]
-
-    # liked flags
-    if request.user.is_authenticated and threads:
-        liked_ids = set(
-            ThreadLike.objects
-            .filter(user=request.user, thread_id__in=[th.id for th in threads])
-            .values_list("thread_id", flat=True)
-        )
-    else:
-        liked_ids = set()
-    for t in threads:
-        t.liked = t.id in liked_ids
+    async def liked_ids():
+        if not (user.is_authenticated and threads):
+            return set()
+        return {tid async for tid in ThreadLike.objects
+                .filter(user=user, thread_id__in=[th.id for th in threads])
+                .values_list("thread_id", flat=True)}
 
-    # หมวดหมู่ยอดนิยม (นับจำนวนเธรดที่ไม่ถูกลบ)
-    top_cats = (
-        Category.objects
-        .annotate(thread_count=Count("threads", filter=Q(threads__is_deleted=False)))
-        .order_by("-thread_count", "order", "name")[:10]
-    )
+    # แท็กของกระทู้ที่จะแสดงจริง ๆ (อ่านจาก ThreadTag ใน query เดียว) + liked flags
+    _, liked = await asyncio.gather(aio.run(tagging.prefetch, threads + trending), liked_ids())
+    for t in threads:
+        t.liked = t.id in liked
 
-    return render(
+    return await aio.arender(
         request,
         "forum/thread_list.html",
         {
@@ -256,10 +238,30 @@ def home(request):
             "cat": cat,
             "trending": trending,
             "top_cats": top_cats,
+            "tag_cloud": tag_cloud,
+            "search_limit": search.SEARCH_RESULT_LIMIT,
         },
     )
 
-@ratelimit(key="ip", rate="10/m", block=True)
+def tag_detail(request, name):
+    tag = get_object_or_404(Tag, name=tagging.normalize(name))
+
+    # เดินบน index (tag, thread_created_at, id) ของ ThreadTag แล้วค่อยได้กระทู้ของหน้านั้น
+    qs = (
+        ThreadTag.objects
+        .filter(tag=tag, thread__is_deleted=False)
+        .select_related("thread__author__profile", "thread__category")
+    )
+    page_obj = keyset_page(qs, request.GET.get("cursor"), per_page=10, field="thread_created_at")
+    threads = tagging.prefetch([tt.thread for tt in page_obj])
+
+    return render(
+        request,
+        "forum/tag_detail.html",
+        {"tag": tag, "threads": threads, "page_obj": page_obj},
+    )
+
+@ratelimit(key="user_or_ip", rate="10/m", method=["POST"], block=True)
 @login_required
 def thread_create(request):
     if request.method == "POST":
@@ -268,74 +270,164 @@ def thread_create(request):
             t = form.save(commit=False)
             t.author = request.user
             t.save()
-            cache.delete(TRENDING_CACHE_KEY)  # อัปเดตมาแรง
             return redirect("forum:thread_detail", thread_id=t.id)
     else:
         form = ThreadForm()
     return render(request, "forum/thread_form.html", {"form": form})
 
-@ratelimit(key="ip", rate="20/m", method=["POST"], block=True)
-def thread_detail(request, thread_id):
-    # ดึงกระทู้โดยไม่กรองสถานะก่อน
-    thread = get_object_or_404(Thread, pk=thread_id)
+def _is_staff(user):
+    return user.is_staff or user.is_superuser
+
+def _visible(model, user):
+    """กระทู้/คอมเมนต์ที่ถูกลบ เปิดดู/แก้ได้เฉพาะ staff/superuser (all_objects) — คนอื่นได้ 404"""
+    return model.all_objects if _is_staff(user) else model.objects
 
-    # ถ้ากระทู้ถูกลบ ให้เปิดดูได้เฉพาะ staff/superuser
-    if thread.is_deleted and not (request.user.is_staff or request.user.is_superuser):
-        raise Http404("No Thread matches the given query.")
+def _visible_thread_or_404(request, thread_id):
+    return get_object_or_404(
+        _visible(Thread, request.user).select_related("author__profile", "category"), pk=thread_id
+    )
 
-    tags = _extract_tags_from(thread)[:6]
+def _comments_qs(thread):
+    return Comment.objects.filter(thread=thread).select_related("author__profile")
+
+def _comment_page(request, thread):
+    """คอมเมนต์หนึ่งหน้า (เก่า→ใหม่) ตัดด้วย seek cursor บน (created_at, id) — ไม่ขึ้นกับความยาวกระทู้"""
+    return keyset_page(_comments_qs(thread), request.GET.get("cursor"), per_page=COMMENTS_PER_PAGE, descending=False)
+
+def _comment_url(comment):
+    return reverse("forum:comment_permalink", kwargs={"thread_id": comment.thread_id, "number": comment.number})
+
+def _thread_tags(thread_id, meta):
+    # หน้ากระทู้แสดงหมวดและการ์ดผู้ตั้งกระทู้ด้วย → ขึ้นกับชื่อหมวดและการ์ดของผู้ตั้ง
+    # (ไม่ใช้ category:/user: — ถูกบีบทุกครั้งที่มีคนโพสต์ในหมวด/ผู้ใช้โพสต์ที่อื่น)
+    tags = [cachetags.thread(thread_id)]
+    if meta:
+        tags += [cachetags.category_info(meta[0]), cachetags.card(meta[1])]
+    return tags
+
+def _thread_meta_qs(thread_id):
+    return Thread.all_objects.filter(pk=thread_id).values_list("category_id", "author_id")
+
+def _thread_depends_on(request, thread_id):
+    # (หมวด, ผู้เขียน) ของกระทู้แคชไว้ใต้ tag thread:<id> (ย้ายหมวด = ล้าง) — hit ไม่แตะ DB
+    meta = cachetags.get_or_set("threadmeta", thread_id, _thread_meta_qs(thread_id).first,
+                                [cachetags.thread(thread_id)])
+    return _thread_tags(thread_id, meta)
+
+async def _athread_depends_on(request, thread_id):
+    meta = await cachetags.aget_or_set("threadmeta", thread_id, _thread_meta_qs(thread_id).afirst,
+                                       [cachetags.thread(thread_id)])
+    return _thread_tags(thread_id, meta)
+
+def _post_comment(request, thread):
+    """(ฟอร์ม, URL ของคอมเมนต์ใหม่ หรือ None ถ้าฟอร์มไม่ผ่าน)"""
+    form = CommentForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return form, None
+    c = form.save(commit=False)
+    c.thread = thread
+    c.author = request.user
+    c.save()  # signals → comment_count/last_activity_at
+    return form, _comment_url(c)
+
+@ratelimit(key="user_or_ip", rate="20/m", method=["POST"], block=True)
+@anonymous_page_cache(params=("cursor",), depends_on=_athread_depends_on)
+async def thread_detail(request, thread_id):
+    user = await aio.auser(request)
+    thread = await aget_object_or_404(
+        _visible(Thread, user).select_related("author__profile", "category"), pk=thread_id
+    )
 
     # ฟอร์มคอมเมนต์
     comment_form = CommentForm()
-    if request.method == "POST" and request.user.is_authenticated:
-        comment_form = CommentForm(request.POST, request.FILES)
-        if comment_form.is_valid():
-            c = comment_form.save(commit=False)
-            c.thread = thread
-            c.author = request.user
-            c.save()
-            cache.delete(f"thread:{thread.id}:comment_count")
-            cache.delete(TRENDING_CACHE_KEY)  # คอมเมนต์กระทบคะแนนมาแรง
-            return redirect("forum:thread_detail", thread_id=thread.id)
-
-    # โหลด/นับคอมเมนต์ (แคช 60s)
-    cache_key = f"thread:{thread_id}:comment_count"
-    comment_count = cache.get(cache_key)
-    if comment_count is None:
-        comment_count = Comment.objects.filter(thread=thread, is_deleted=False).count()
-        cache.set(cache_key, comment_count, 60)
-    thread.live_comment_count = comment_count  # safe (ไม่ชน property)
-
-    comments_qs = (
-        Comment.objects
-        .filter(thread=thread, is_deleted=False)
-        .select_related("author")
-        .order_by("created_at")
+    if request.method == "POST" and user.is_authenticated:
+        comment_form, url = await aio.run(_post_comment, request, thread)
+        if url:
+            # ไปที่คอมเมนต์ใหม่ (อาจอยู่หน้าท้าย ๆ ของกระทู้)
+            return redirect(url)
+
+    async def liked():
+        return user.is_authenticated and await ThreadLike.objects.filter(thread=thread, user=user).aexists()
+
+    # แท็ก / คอมเมนต์หน้านี้ / ไลก์ของผู้ใช้ ไม่ขึ้นต่อกัน
+    tagged, comment_page, is_liked = await asyncio.gather(
+        aio.run(tagging.prefetch, [thread]),
+        akeyset_page(_comments_qs(thread), request.GET.get("cursor"), per_page=COMMENTS_PER_PAGE, descending=False),
+        liked(),
     )
 
-    likes_count = ThreadLike.objects.filter(thread=thread).count()
-    liked = request.user.is_authenticated and ThreadLike.objects.filter(
-        thread=thread, user=request.user
-    ).exists()
-
-    return render(
+    return await aio.arender(
         request,
         "forum/thread_detail.html",
         {
             "thread": thread,
-            "tags": tags,
+            "tags": tagged[0].tag_list[:6],
             "comment_form": comment_form,
-            "comment_count": comment_count,
-            "comments": comments_qs,
-            "likes_count": likes_count,
-            "liked": liked,
+            "comment_count": thread.comment_count,
+            "comments": comment_page.object_list,
+            "comment_page": comment_page,
+            "likes_count": thread.like_count,
+            "liked": is_liked,
         },
     )
 
-@ratelimit(key="ip", rate="30/m", method=["POST"], block=True)
+@anonymous_page_cache(params=("cursor",), depends_on=_thread_depends_on)
+def thread_comments(request, thread_id):
+    """HTML ของคอมเมนต์หน้าถัดไป (fragment) สำหรับ infinite scroll"""
+    thread = _visible_thread_or_404(request, thread_id)
+    comment_page = _comment_page(request, thread)
+    return render(
+        request,
+        "forum/_comment_batch.html",
+        {"thread": thread, "comments": comment_page.object_list, "comment_page": comment_page},
+    )
+
+async def thread_live(request, thread_id):
+    """SSE: คอมเมนต์ใหม่ / ยอดไลก์ของกระทู้นี้แบบสด (forum/live.py) — แทนการรีโหลดทั้งหน้า"""
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)  # WSGI: ไม่ค้าง thread ไว้กับ stream (EventSource หยุดต่อเอง)
+    user = await aio.auser(request)
+    if not await _visible(Thread, user).filter(pk=thread_id).aexists():
+        raise Http404("ไม่พบกระทู้")
+
+    client = f"u{user.pk}" if user.is_authenticated else f"ip{client_ip(request)}"
+    pubsub.ensure_relay()
+    try:
+        sub = pubsub.hub.subscribe(live.channel(thread_id), client)
+    except pubsub.Full:
+        response = HttpResponse("ผู้ชมสดเต็ม ลองใหม่ภายหลัง", status=503, content_type="text/plain; charset=utf-8")
+        response["Retry-After"] = "30"
+        return response
+
+    response = StreamingHttpResponse(live.stream(sub), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: อย่าพักข้อมูลไว้
+    return response
+
+def metrics_export(request):
+    """/metrics สำหรับ Prometheus (forum/metrics.py) — ด้วย token จาก scrape config หรือ staff"""
+    token = getattr(settings, "FORUM_METRICS_TOKEN", "")
+    if token:
+        sent = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(sent.encode(), token.encode()):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    elif not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def comment_permalink(request, thread_id, number):
+    """/threads/<id>/c/<N>/ → หน้ากระทู้ที่เริ่มที่คอมเมนต์ #N (ค้นด้วย index (thread, number))"""
+    c = get_object_or_404(
+        Comment.objects.only("id", "thread_id", "created_at"),
+        thread_id=thread_id, number=number,
+    )
+    url = reverse("forum:thread_detail", kwargs={"thread_id": thread_id})
+    return redirect(f"{url}?{urlencode({'cursor': at_cursor(c)})}#comment-{c.id}")
+
+@ratelimit(key="user_or_ip", rate="30/m", method=["POST"], block=True)
 @login_required
 def thread_edit(request, thread_id: int):
-    thread = get_object_or_404(Thread, id=thread_id)
+    thread = get_object_or_404(_visible(Thread, request.user), id=thread_id)
 
     # ให้ staff/superuser แก้ไขได้เสมอ
     if not (request.user.is_staff or request.user.is_superuser or request.user.id == thread.author_id):
@@ -352,10 +444,10 @@ def thread_edit(request, thread_id: int):
 
     return render(request, "forum/thread_form.html", {"form": form, "thread": thread})
 
-@ratelimit(key="ip", rate="15/m", method=["POST"], block=True)
+@ratelimit(key="user_or_ip", rate="15/m", method=["POST"], block=True)
 @login_required
 def thread_delete(request, thread_id: int):
-    thread = get_object_or_404(Thread, id=thread_id)
+    thread = get_object_or_404(_visible(Thread, request.user), id=thread_id)
 
     if not (request.user.is_staff or request.user.is_superuser or request.user.id == thread.author_id):
         return HttpResponseForbidden("คุณไม่มีสิทธิ์ลบกระทู้นี้")
@@ -370,19 +462,24 @@ def thread_delete(request, thread_id: int):
     # ป้องกัน GET ตรง ๆ
     return redirect("forum:thread_detail", thread_id=thread.id)
 
+def _wants_json(request):
+    return (request.headers.get("x-requested-with") == "XMLHttpRequest"
+            or "application/json" in request.headers.get("accept", ""))
+
 @require_POST
+@ratelimit(key="user_or_ip", rate="60/m", block=True)
 @login_required
-def thread_like_toggle(request, thread_id):
-    thread = get_object_or_404(Thread, pk=thread_id, is_deleted=False)
-
-    like_qs = ThreadLike.objects.filter(thread=thread, user=request.user)
-    if like_qs.exists():
-        like_qs.delete()
-    else:
-        ThreadLike.objects.create(thread=thread, user=request.user)
+async def thread_like_toggle(request, thread_id):
+    thread = await aget_object_or_404(Thread.objects.only("id", "category_id"), pk=thread_id)
 
-    cache.delete(TRENDING_CACHE_KEY)  # ไลก์กระทบคะแนนมาแรง
+    # action = like / unlike / toggle (ค่าเริ่มต้น) — atomic ใน forum/likes.py
+    verb = request.POST.get("action") or "toggle"
+    if verb not in likes.VERBS:
+        return HttpResponseBadRequest("unknown action")
+    liked, count = await aio.run(likes.set_like, thread, await aio.auser(request), verb)
 
+    if _wants_json(request):
+        return JsonResponse({"liked": liked, "count": count})
     next_url = request.POST.get("next") or reverse(
         "forum:thread_detail", kwargs={"thread_id": thread.id}
     )
@@ -390,7 +487,7 @@ def thread_like_toggle(request, thread_id):
 
 @login_required
 def comment_edit(request, pk: int):
-    c = get_object_or_404(Comment, pk=pk)
+    c = get_object_or_404(_visible(Comment, request.user), pk=pk)
     if not (request.user.is_staff or request.user.is_superuser or request.user.id == c.author_id):
         return HttpResponseForbidden("คุณไม่มีสิทธิ์แก้ไขความคิดเห็นนี้")
 
@@ -398,22 +495,18 @@ def comment_edit(request, pk: int):
     if request.method == "POST" and form.is_valid():
         form.save()
         messages.success(request, "แก้ไขความคิดเห็นแล้ว")
-        cache.delete(f"thread:{c.thread_id}:comment_count")
-        cache.delete(TRENDING_CACHE_KEY)
-        return redirect("forum:thread_detail", thread_id=c.thread_id)
+        return redirect(_comment_url(c))
 
     return render(request, "forum/comment_form.html", {"form": form, "comment": c})
 
 @login_required
 def comment_delete(request, pk: int):
-    c = get_object_or_404(Comment, pk=pk)
+    c = get_object_or_404(_visible(Comment, request.user), pk=pk)
     if not (request.user.is_staff or request.user.is_superuser or request.user.id == c.author_id):
         return HttpResponseForbidden("คุณไม่มีสิทธิ์ลบความคิดเห็นนี้")
     if request.method == "POST":
         c.is_deleted = True
         c.save(update_fields=["is_deleted"])
         messages.success(request, "ลบความคิดเห็นแล้ว")
-        # ล้างแคช มาแรง + ตัวนับคอมเมนต์
-        cache.delete(TRENDING_CACHE_KEY)
-        cache.delete(f"thread:{c.thread_id}:comment_count")
+        # ตัวนับคอมเมนต์และคะแนนมาแรงปรับผ่าน signals
     return redirect("forum:thread_detail", thread_id=c.thread_id)
@@ -0,0 +1,175 @@
+# forum/zset.py
+"""
+Sorted set (member → score) สำหรับ leaderboard / ข้อมูลเรียงตามเวลา
+
+- RedisSortedSet: ใช้ ZSET ของ Redis ตัวเดียวกับ cache (django_redis) — แชร์ทุก worker
+- LocalSortedSet: ตัวแทนในหน่วยความจำของ process (เทสต์/dev ที่ไม่มี Redis)
+- เลือก backend ด้วย settings.FORUM_ZSET_BACKEND = "redis" | "local"
+  ไม่ตั้ง → ใช้ redis ถ้า CACHES["default"] เป็น django_redis, ไม่งั้น local
+"""
+import bisect
+import threading
+
+from django.conf import settings
+
+KEY_PREFIX = "forum:z:"
+
+
+class LocalSortedSet:
+    def __init__(self):
+        self._scores = {}
+        self._ordered = []          # [(score, member)] เรียงน้อย → มาก
+        self._lock = threading.Lock()
+
+    def _set(self, member, score):
+        old = self._scores.get(member)
+        if old is not None:
+            del self._ordered[bisect.bisect_left(self._ordered, (old, member))]
+        self._scores[member] = score
+        bisect.insort(self._ordered, (score, member))
+
+    def _drop(self, member):
+        old = self._scores.pop(member, None)
+        if old is not None:
+            del self._ordered[bisect.bisect_left(self._ordered, (old, member))]
+
+    def incr(self, member, amount, xx=False):
+        """xx=True: เพิ่มเฉพาะสมาชิกที่มีอยู่แล้ว (ไม่มี → None) เหมือน ZADD XX INCR"""
+        member = str(member)
+        with self._lock:
+            if xx and member not in self._scores:
+                return None
+            score = self._scores.get(member, 0.0) + amount
+            self._set(member, score)
+            return score
+
+    def add(self, mapping, nx=False):
+        """nx=True: เพิ่มเฉพาะสมาชิกที่ยังไม่มี (คะแนนเดิมไม่ถูกทับ) เหมือน ZADD NX"""
+        with self._lock:
+            for member, score in mapping.items():
+                if nx and str(member) in self._scores:
+                    continue
+                self._set(str(member), float(score))
+
+    def remove(self, *members):
+        with self._lock:
+            for m in members:
+                self._drop(str(m))
+
+    def score(self, member):
+        return self._scores.get(str(member))
+
+    def bottom(self, n):
+        """[member] คะแนนน้อยสุดก่อน ไม่เกิน n ตัว"""
+        with self._lock:
+            return [m for _, m in self._ordered[:n]] if n > 0 else []
+
+    def top(self, n):
+        """[(member, score)] คะแนนมากสุดก่อน"""
+        with self._lock:
+            return [(m, s) for s, m in reversed(self._ordered[-n:])] if n > 0 else []
+
+    def range_by_score(self, min_score, max_score):
+        # รับ "-inf"/"+inf" ได้เหมือน Redis
+        min_score, max_score = float(min_score), float(max_score)
+        with self._lock:
+            lo = bisect.bisect_left(self._ordered, (min_score, ""))
+            return [m for s, m in self._ordered[lo:] if s <= max_score]
+
+    def remove_by_score(self, min_score, max_score):
+        for m in self.range_by_score(min_score, max_score):
+            self.remove(m)
+
+    def count(self, min_score="-inf", max_score="+inf"):
+        if min_score == "-inf" and max_score == "+inf":
+            return len(self._scores)
+        return len(self.range_by_score(min_score, max_score))
+
+    def trim(self, max_size):
+        """เก็บไว้เฉพาะ max_size อันดับคะแนนสูงสุด"""
+        with self._lock:
+            for s, m in self._ordered[:max(0, len(self._ordered) - max_size)]:
+                self._scores.pop(m, None)
+            del self._ordered[:max(0, len(self._ordered) - max_size)]
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+            self._ordered.clear()
+
+
+class RedisSortedSet:
+    def __init__(self, key, client):
+        self.key = KEY_PREFIX + key
+        self.client = client
+
+    def incr(self, member, amount, xx=False):
+        if xx:
+            return self.client.zadd(self.key, {str(member): amount}, xx=True, incr=True)
+        return self.client.zincrby(self.key, amount, str(member))
+
+    def add(self, mapping, nx=False):
+        if mapping:
+            self.client.zadd(self.key, {str(m): float(s) for m, s in mapping.items()}, nx=nx)
+
+    def remove(self, *members):
+        if members:
+            self.client.zrem(self.key, *[str(m) for m in members])
+
+    def score(self, member):
+        return self.client.zscore(self.key, str(member))
+
+    def bottom(self, n):
+        if n <= 0:
+            return []
+        return [m.decode() if isinstance(m, bytes) else m for m in self.client.zrange(self.key, 0, n - 1)]
+
+    def top(self, n):
+        if n <= 0:
+            return []
+        rows = self.client.zrevrange(self.key, 0, n - 1, withscores=True)
+        return [(m.decode() if isinstance(m, bytes) else m, s) for m, s in rows]
+
+    def range_by_score(self, min_score, max_score):
+        rows = self.client.zrangebyscore(self.key, min_score, max_score)
+        return [m.decode() if isinstance(m, bytes) else m for m in rows]
+
+    def remove_by_score(self, min_score, max_score):
+        self.client.zremrangebyscore(self.key, min_score, max_score)
+
+    def count(self, min_score="-inf", max_score="+inf"):
+        return self.client.zcount(self.key, min_score, max_score)
+
+    def trim(self, max_size):
+        self.client.zremrangebyrank(self.key, 0, -(max_size + 1))
+
+    def clear(self):
+        self.client.delete(self.key)
+
+
+_local_sets = {}
+_local_lock = threading.Lock()
+
+
+def backend_name():
+    name = getattr(settings, "FORUM_ZSET_BACKEND", None)
+    if name:
+        return name
+    cache_backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    return "redis" if cache_backend.startswith("django_redis") else "local"
+
+
+def get_sorted_set(key):
+    if backend_name() == "redis":
+        from django_redis import get_redis_connection
+        return RedisSortedSet(key, get_redis_connection("default"))
+    with _local_lock:
+        if key not in _local_sets:
+            _local_sets[key] = LocalSortedSet()
+        return _local_sets[key]
+
+
+def reset_local():
+    """ล้าง LocalSortedSet ทั้งหมด (ใช้ในเทสต์)"""
+    with _local_lock:
+        _local_sets.clear()
@@ -40,11 +40,14 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    "forum.instrument.InstrumentMiddleware",  # ตัวนอกสุด: วัด SQL/cache/render + Server-Timing (forum/instrument.py)
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "accounts.middleware.PeopleMiddleware",  # resolver ชื่อ/รูปโปรไฟล์ต่อ request
+    "accounts.middleware.OnlineNowMiddleware",  # presence: ใครออนไลน์ (accounts/presence.py)
 
     # ✅ allauth 0.63+ ต้องมี
     "allauth.account.middleware.AccountMiddleware",
@@ -57,7 +60,7 @@ ROOT_URLCONF = "mini_forum.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "forum.instrument.DjangoTemplates",  # DjangoTemplates + จับเวลา render
         "DIRS": [BASE_DIR / "templates"],   # << override templates ของ allauth
         "APP_DIRS": True,
         "OPTIONS": {